@@ -1,39 +1,73 @@
+import hashlib
 import json
+import mimetypes
 import os
-import tempfile
-from openai import OpenAI
+import unicodedata
 
-client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from voice_rules import parse_local, rank_names
+from cache import KeyedCache
+from lazy import LazyClient
+import metrics
+
+# One async client for the whole process: a pooled keep-alive connection,
+# per-request timeouts and the SDK's retry with exponential backoff. It is
+# built on first use; importing the SDK costs ~0.3 s of cold start.
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "30"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+
+
+def _create_client():
+    import httpx
+    from openai import AsyncOpenAI
+
+    return AsyncOpenAI(
+        api_key=os.getenv("OPENAI_API_KEY"),
+        timeout=httpx.Timeout(OPENAI_TIMEOUT, connect=5.0),
+        max_retries=OPENAI_MAX_RETRIES,
+        http_client=httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=OPENAI_MAX_CONNECTIONS, max_keepalive_connections=OPENAI_MAX_CONNECTIONS),
+        ),
+    )
+
+
+client = LazyClient(_create_client)
 
 WHISPER_MODEL = "whisper-1"
 PARSER_MODEL = "gpt-4o-mini"
 
+PARSE_CACHE_TTL_SECONDS = int(os.getenv("PARSE_CACHE_TTL_SECONDS", "86400"))
+parse_cache = KeyedCache("parse", PARSE_CACHE_TTL_SECONDS)
 
-async def transcribe_audio(audio_bytes: bytes, filename: str = "audio.webm") -> str:
-    """Transcribe audio using OpenAI Whisper."""
-    suffix = "." + filename.split(".")[-1] if "." in filename else ".webm"
-    with tempfile.NamedTemporaryFile(suffix=suffix, delete=True) as tmp:
-        tmp.write(audio_bytes)
-        tmp.flush()
-        tmp.seek(0)
-        with open(tmp.name, "rb") as audio_file:
-            transcript = client.audio.transcriptions.create(
-                model=WHISPER_MODEL,
-                file=audio_file,
-                language="hi",
-                prompt="यह एक बिज़नेस खर्चे और लेनदेन की रिकॉर्डिंग है। Hindi aur Hinglish mein ho sakta hai. Numbers, rupees, kg, rates sunne ko milenge."
-            )
+# Local rule-based parses at or above this confidence skip the GPT call
+LOCAL_PARSE_MIN_CONFIDENCE = float(os.getenv("LOCAL_PARSE_MIN_CONFIDENCE", "0.85"))
+
+
+async def transcribe_audio(audio_bytes: bytes, filename: str = "audio.webm", content_type: str = None) -> str:
+    """Transcribe audio using OpenAI Whisper.
+
+    The upload is sent straight from memory; Whisper detects the format
+    from the filename extension, so keep it (and the MIME type) intact.
+    """
+    if "." not in filename:
+        filename += ".webm"
+    content_type = content_type or mimetypes.guess_type(filename)[0] or "audio/webm"
+    with metrics.timed(metrics.openai_duration, "whisper", operation="transcribe"):
+        transcript = await client.audio.transcriptions.create(
+            model=WHISPER_MODEL,
+            file=(filename, audio_bytes, content_type),
+            language="hi",
+            prompt="यह एक बिज़नेस खर्चे और लेनदेन की रिकॉर्डिंग है। Hindi aur Hinglish mein ho sakta hai. Numbers, rupees, kg, rates sunne ko milenge."
+        )
     return transcript.text
 
 
-async def parse_voice_command(text: str, categories: list[str], parties: list[str]) -> dict:
-    """Parse transcribed text into structured data using GPT-4o-mini."""
-    system_prompt = f"""You are a business transaction parser for an Indian small business owner.
+# Static part of the parser prompt. It comes first and never changes, so
+# the provider can reuse its cached prefix; the per-user vocabulary is
+# appended after it.
+PARSER_RULES = """You are a business transaction parser for an Indian small business owner.
 Parse the Hindi/Hinglish/English voice input into a structured JSON response.
 
-Available expense categories: {json.dumps(categories)}
-Known party/client names: {json.dumps(parties)}
-
 RULES:
 1. Determine if this is an EXPENSE or a LEDGER (party/client transaction).
 2. For expenses: extract category, amount, description, date context.
@@ -50,7 +84,7 @@ RULES:
 13. Default date is TODAY unless specified otherwise (kal = yesterday, parso = day before).
 
 RESPOND ONLY WITH VALID JSON, no markdown:
-{{
+{
   "type": "expense" | "ledger" | "delete_last" | "correction" | "add_category" | "unknown",
   "category": "matched category name or suggested new one",
   "category_match_found": true/false,
@@ -66,18 +100,80 @@ RESPOND ONLY WITH VALID JSON, no markdown:
   "date_offset_days": 0 for today, -1 for yesterday, etc.,
   "correction_details": "what to correct if type is correction",
   "confidence": 0.0 to 1.0
-}}"""
-
-    response = client.chat.completions.create(
-        model=PARSER_MODEL,
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": text}
-        ],
-        temperature=0.1,
-        response_format={"type": "json_object"}
+}
+"""
+
+# Only the most likely names (by local fuzzy match) go into the prompt
+PROMPT_MAX_CANDIDATES = int(os.getenv("PROMPT_MAX_CANDIDATES", "15"))
+
+stats = {"local_parses": 0, "gpt_calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+
+def _normalize(text: str) -> str:
+    # Drop punctuation only: Devanagari vowel signs and viramas are combining
+    # marks (Mn/Mc) and carry meaning ("पचास" vs "पचीस")
+    text = unicodedata.normalize("NFC", text).casefold()
+    return " ".join("".join(" " if unicodedata.category(ch).startswith("P") else ch for ch in text).split())
+
+
+def _vocab_version(categories: list[str], parties: list[str]) -> str:
+    raw = "\x1f".join(sorted(categories)) + "\x1e" + "\x1f".join(sorted(parties))
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
+
+
+def _parse_cache_key(text: str, categories: list[str], parties: list[str]) -> str:
+    raw = _normalize(text) + "\x1e" + _vocab_version(categories, parties)
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+async def parse_voice_command(text: str, categories: list[str], parties: list[str]) -> dict:
+    """Parse transcribed text into structured data.
+
+    Simple commands are handled by the local rule-based parser; everything
+    else (or anything it is unsure about) goes to GPT-4o-mini. GPT results
+    are memoized on the normalized transcript plus the vocabulary.
+    """
+    local = parse_local(text, categories, parties)
+    if local["confidence"] >= LOCAL_PARSE_MIN_CONFIDENCE:
+        stats["local_parses"] += 1
+        return local
+
+    key = _parse_cache_key(text, categories, parties)
+    cached = await parse_cache.get(key)
+    if cached is not None:
+        cached["raw_text"] = text
+        return cached
+
+    system_prompt = (
+        PARSER_RULES
+        + f"\nAvailable expense categories: {json.dumps(rank_names(text, categories, PROMPT_MAX_CANDIDATES))}"
+        + f"\nKnown party/client names: {json.dumps(rank_names(text, parties, PROMPT_MAX_CANDIDATES))}"
     )
 
+    with metrics.timed(metrics.openai_duration, "gpt", operation="parse"):
+        response = await client.chat.completions.create(
+            model=PARSER_MODEL,
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": text}
+            ],
+            temperature=0.1,
+            response_format={"type": "json_object"}
+        )
+    stats["gpt_calls"] += 1
+    if response.usage:
+        stats["prompt_tokens"] += response.usage.prompt_tokens
+        stats["completion_tokens"] += response.usage.completion_tokens
+        metrics.openai_tokens.inc(response.usage.prompt_tokens, model=PARSER_MODEL, kind="prompt")
+        metrics.openai_tokens.inc(response.usage.completion_tokens, model=PARSER_MODEL, kind="completion")
+
     result = json.loads(response.choices[0].message.content)
+    # The prompt may list only a subset of names; trust exact matches against the full lists
+    if result.get("party_name") and not result.get("party_match_found"):
+        result["party_match_found"] = result["party_name"].lower() in {p.lower() for p in parties}
+    if result.get("category") and not result.get("category_match_found"):
+        result["category_match_found"] = result["category"].lower() in {c.lower() for c in categories}
+    result["parser"] = "gpt"
+    await parse_cache.set(key, result)
     result["raw_text"] = text
     return result
@@ -1,3 +1,7 @@
+import asyncio
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -12,6 +16,15 @@ ACCESS_TOKEN_EXPIRE_HOURS = 72
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# ─── Passwords ───
+# bcrypt costs ~250 ms of CPU per call. It runs on its own small pool (the C
+# code releases the GIL) so a burst of logins never blocks the event loop or
+# takes DB worker threads; past LOGIN_MAX_PENDING waiting logins we answer 429.
+AUTH_POOL_SIZE = int(os.getenv("AUTH_POOL_SIZE", "2"))
+LOGIN_MAX_PENDING = int(os.getenv("LOGIN_MAX_PENDING", "32"))
+_bcrypt_executor = ThreadPoolExecutor(max_workers=AUTH_POOL_SIZE, thread_name_prefix="bcrypt")
+_pending_logins = 0
+
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -21,6 +34,74 @@ def hash_password(password: str) -> str:
     return pwd_context.hash(password)
 
 
+async def _run_bcrypt(fn, *args):
+    global _pending_logins
+    if _pending_logins >= LOGIN_MAX_PENDING:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many logins in progress, try again shortly",
+            headers={"Retry-After": "1"},
+        )
+    _pending_logins += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(_bcrypt_executor, fn, *args)
+    finally:
+        _pending_logins -= 1
+
+
+async def check_password(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bcrypt pool."""
+    return await _run_bcrypt(verify_password, plain_password, hashed_password)
+
+
+# ─── Tokens ───
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "1024"))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", "300"))
+
+
+class TokenCache:
+    """LRU of verified token → user. Entries never outlive the token's own exp."""
+
+    def __init__(self, max_entries: int, ttl: int):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+
+    def get(self, token: str):
+        item = self._data.get(token)
+        if item is not None and item[0] > time.time():
+            self._data.move_to_end(token)
+            self.hits += 1
+            return item[1]
+        if item is not None:
+            del self._data[token]
+        self.misses += 1
+        return None
+
+    def set(self, token: str, user: dict, exp: float):
+        if self.max_entries <= 0:
+            return
+        self._data[token] = (min(time.time() + self.ttl, exp), user)
+        self._data.move_to_end(token)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+            "size": len(self._data),
+        }
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL)
+
+
 def create_access_token(data: dict) -> str:
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_EXPIRE_HOURS)
@@ -28,13 +109,19 @@ def create_access_token(data: dict) -> str:
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+    token = credentials.credentials
+    user = token_cache.get(token)
+    if user is not None:
+        return user
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         user_id = payload.get("user_id")
         username = payload.get("username")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        return {"user_id": user_id, "username": username}
     except JWTError:
         raise HTTPException(status_code=401, detail="Invalid or expired token")
+    user = {"user_id": user_id, "username": username}
+    token_cache.set(token, user, payload.get("exp", float("inf")))
+    return user
@@ -0,0 +1,92 @@
+"""Serialization time and bytes on the wire for a ledger page.
+
+Compares FastAPI's default path (jsonable_encoder + json.dumps), the same
+with orjson as the response class, and orjson on the raw rows (what
+get_ledger now does), then the body size under gzip / brotli.
+
+Usage:
+    python benchmarks/bench_json.py [ROWS]   (default: 10000)
+"""
+import gzip
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+TYPES = ["goods_sold", "payment_received", "payment_made", "goods_returned", "goods_taken"]
+PARTIES = ["Ramesh Traders", "Sharma Ji", "Verma & Sons", "Gupta Hardware", "Anil Cement"]
+
+
+def ledger_page(n: int) -> dict:
+    start = date(2024, 4, 1)
+    items = []
+    for i in range(n):
+        items.append({
+            "id": f"{i:08d}-9c1b-4a7e-8d55-2f4a6c1e{i % 10000:04d}",
+            "date": (start + timedelta(days=i % 365)).isoformat(),
+            "created_at": f"{(start + timedelta(days=i % 365)).isoformat()}T10:{i % 60:02d}:00+00:00",
+            "party_id": f"party-{i % 5}",
+            "entry_type": TYPES[i % 5],
+            "item_name": "Cement bags" if i % 3 == 0 else "",
+            "quantity": (i % 40) + 1 if i % 3 == 0 else None,
+            "unit": "bag" if i % 3 == 0 else "",
+            "rate": 380.0 if i % 3 == 0 else None,
+            "amount": 100 + (i % 977) * 1.25,
+            "description": f"entry {i}",
+            "party_name": PARTIES[i % 5],
+        })
+    return {"items": items, "has_more": True, "next_cursor": "eyJ2IjpbIjIwMjQtMDQtMDEiXX0="}
+
+
+def timed(fn, repeat: int = 7) -> tuple:
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        body = fn()
+        runs.append(time.perf_counter() - t0)
+    return statistics.median(runs) * 1000, body
+
+
+def main(argv):
+    rows = int(argv[0]) if argv else 10000
+    page = ledger_page(rows)
+
+    modes = {
+        "default (jsonable_encoder + json)": lambda: JSONResponse(jsonable_encoder(page)).body,
+        "jsonable_encoder + orjson": lambda: ORJSONResponse(jsonable_encoder(page)).body,
+        "orjson direct": lambda: ORJSONResponse(page).body,
+    }
+    print(f"{rows} ledger rows\n")
+    print(f"{'serializer':36} {'ms':>8} {'bytes':>10}")
+    body = None
+    for name, fn in modes.items():
+        ms, body = timed(fn)
+        print(f"{name:36} {ms:8.1f} {len(body):10,}")
+
+    print(f"\n{'encoding':36} {'ms':>8} {'bytes':>10}")
+    encodings = {
+        "identity": lambda: body,
+        "gzip level 6 (API responses)": lambda: gzip.compress(body, compresslevel=6),
+        "gzip level 9": lambda: gzip.compress(body, compresslevel=9),
+    }
+    if brotli is not None:
+        encodings["brotli quality 5"] = lambda: brotli.compress(body, quality=5)
+    for name, fn in encodings.items():
+        ms, out = timed(fn, repeat=3)
+        print(f"{name:36} {ms:8.1f} {len(out):10,}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,291 @@
+"""Offline load test: the app in-process against in-memory Supabase and OpenAI.
+
+Seeds synthetic users (benchmarks/fakes.py), then drives each scenario with
+a fixed number of requests at a fixed concurrency through the full ASGI
+stack and reports throughput and latency. Save a run with --out and compare
+a later one (another commit, another setting) with --compare.
+
+Usage:
+    python benchmarks/bench_load.py [--rows 10000] [--users 1] [--requests 200]
+        [--concurrency 10] [--scenario dashboard expenses ...]
+        [--background report_expenses] [--out run.json] [--compare base.json]
+
+Scenarios: dashboard, expenses, categories, voice, report_expenses, report_party.
+Reports are rebuilt on every request unless --warm-reports is given.
+--background keeps another scenario running while each one is measured,
+e.g. to check that light endpoints stay fast while reports are built:
+    python benchmarks/bench_load.py --scenario categories --out alone.json
+    python benchmarks/bench_load.py --scenario categories --background report_expenses --compare alone.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fakes
+
+fakes.offline_env()
+# Reports and other files the app writes go to a scratch directory
+os.chdir(tempfile.mkdtemp(prefix="biztracker-bench-"))
+
+import httpx
+
+import auth
+import main as server
+from dates import today_ist, month_start
+
+
+# ─── Scenarios ───
+# Each returns (method, url, request kwargs) for the i-th request of a user
+def dashboard(ctx, user, i):
+    return "GET", "/api/dashboard", {}
+
+
+def expenses(ctx, user, i):
+    # Alternate the first page with a page filtered to this month
+    if i % 2:
+        return "GET", f"/api/expenses?limit=50&date_from={month_start(ctx['today']).isoformat()}", {}
+    return "GET", "/api/expenses?limit=50", {}
+
+
+def categories(ctx, user, i):
+    return "GET", "/api/categories", {}
+
+
+def voice(ctx, user, i):
+    # Different bytes per request: the fake transcribes each to a corpus phrase
+    audio = i.to_bytes(4, "big", signed=True) * 64
+    return "POST", "/api/voice/process", {"files": {"audio": ("clip.webm", audio, "audio/webm")}}
+
+
+def report_expenses(ctx, user, i):
+    return "GET", f"/api/reports/expenses?date_from={ctx['report_from']}&date_to={ctx['today']}", {}
+
+
+def report_party(ctx, user, i):
+    party = user["party_ids"][i % len(user["party_ids"])]
+    return "GET", f"/api/reports/party/{party}?date_from={ctx['report_from']}&date_to={ctx['today']}", {}
+
+
+SCENARIOS = {
+    "dashboard": dashboard,
+    "expenses": expenses,
+    "categories": categories,
+    "voice": voice,
+    "report_expenses": report_expenses,
+    "report_party": report_party,
+}
+REPORT_SCENARIOS = {"report_expenses", "report_party"}
+
+
+# ─── Runner ───
+def _pct(values: list, q: int) -> float:
+    if len(values) < 2:
+        return values[0] * 1000 if values else float("nan")
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1] * 1000
+
+
+async def _send(client, ctx, users, make_request, i):
+    user = users[i % len(users)]
+    method, url, kwargs = make_request(ctx, user, i)
+    t0 = time.perf_counter()
+    r = await client.request(method, url, headers=user["headers"], **kwargs)
+    return time.perf_counter() - t0, r.status_code
+
+
+async def run_background(client, ctx, users, make_request, concurrency: int, done: asyncio.Event) -> dict:
+    """Send requests until ``done`` is set; returns how many completed and failed."""
+    counts = {"requests": 0, "errors": 0}
+
+    async def worker(w):
+        i = w
+        while not done.is_set():
+            _, status = await _send(client, ctx, users, make_request, i)
+            counts["requests"] += 1
+            counts["errors"] += status >= 400
+            i += concurrency
+
+    await asyncio.gather(*[worker(w) for w in range(concurrency)])
+    return counts
+
+
+async def run_scenario(client, ctx, users, make_request, requests: int, concurrency: int, warmup: int) -> dict:
+    async def send(i):
+        return await _send(client, ctx, users, make_request, i)
+
+    for i in range(warmup):
+        await send(-1 - i)
+
+    latencies, errors = [], {}
+    pending = iter(range(requests))
+
+    async def worker():
+        for i in pending:
+            elapsed, status = await send(i)
+            latencies.append(elapsed)
+            if status >= 400:
+                errors[status] = errors.get(status, 0) + 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    wall = time.perf_counter() - t0
+    return {
+        "requests": requests,
+        "errors": sum(errors.values()),
+        "error_statuses": {str(k): v for k, v in sorted(errors.items())},
+        "rps": round(requests / wall, 1),
+        "mean_ms": round(statistics.fmean(latencies) * 1000, 2),
+        "p50_ms": round(_pct(latencies, 50), 2),
+        "p90_ms": round(_pct(latencies, 90), 2),
+        "p99_ms": round(_pct(latencies, 99), 2),
+        "max_ms": round(max(latencies) * 1000, 2),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "describe", "--always", "--dirty"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=30)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+async def run(args) -> dict:
+    store = fakes.FakeSupabase()
+    store.fresh_report_versions = not args.warm_reports
+    ai = fakes.FakeOpenAI(whisper_latency=args.whisper_ms / 1000, gpt_latency=args.gpt_ms / 1000)
+    fakes.install(store, ai)
+
+    today = today_ist()
+    t0 = time.perf_counter()
+    users = fakes.seed(store, users=args.users, expenses=args.rows, ledger=args.ledger_rows or args.rows,
+                       days=args.days, end=today, random_seed=args.seed)
+    seed_seconds = time.perf_counter() - t0
+    for user in users:
+        token = auth.create_access_token({"user_id": user["id"], "username": user["username"]})
+        user["headers"] = {"Authorization": f"Bearer {token}"}
+    ctx = {"today": today, "report_from": (today - timedelta(days=args.report_days - 1)).isoformat()}
+
+    results = {}
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for name in args.scenario:
+            requests = args.report_requests if name in REPORT_SCENARIOS else args.requests
+            if args.background:
+                done = asyncio.Event()
+                background = asyncio.create_task(run_background(
+                    client, ctx, users, SCENARIOS[args.background], args.background_concurrency, done))
+            results[name] = await run_scenario(client, ctx, users, SCENARIOS[name], requests,
+                                               args.concurrency, args.warmup)
+            if args.background:
+                done.set()
+                results[name]["background"] = await background
+            print(_row(name, results[name]), flush=True)
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "users": args.users,
+            "rows": args.rows,
+            "ledger_rows": args.ledger_rows or args.rows,
+            "days": args.days,
+            "concurrency": args.concurrency,
+            "whisper_ms": args.whisper_ms,
+            "gpt_ms": args.gpt_ms,
+            "report_days": args.report_days,
+            "warm_reports": args.warm_reports,
+            "background": args.background,
+            "background_concurrency": args.background_concurrency if args.background else None,
+            "seed_seconds": round(seed_seconds, 2),
+        },
+        "scenarios": results,
+    }
+
+
+# ─── Output ───
+HEADER = f"{'scenario':16} {'req/s':>8} {'mean ms':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'errors':>7}"
+
+
+def _row(name: str, r: dict) -> str:
+    return (f"{name:16} {r['rps']:8.1f} {r['mean_ms']:8.1f} {r['p50_ms']:8.1f} "
+            f"{r['p90_ms']:8.1f} {r['p99_ms']:8.1f} {r['errors']:7}")
+
+
+def _delta(new: float, old: float) -> str:
+    if not old:
+        return "     -"
+    return f"{(new - old) / old * 100:+6.1f}%"
+
+
+def compare(base: dict, current: dict):
+    """Print current vs base per scenario (req/s up and latency down are better)."""
+    print(f"\nvs {base['meta'].get('commit') or 'base'} ({base['meta'].get('timestamp', '')})")
+    keys = ("users", "rows", "ledger_rows", "days", "concurrency", "whisper_ms", "gpt_ms",
+            "report_days", "warm_reports")
+    differing = [k for k in keys if base["meta"].get(k) != current["meta"].get(k)]
+    if differing:
+        print(f"warning: runs differ in {', '.join(differing)}")
+    print(f"{'scenario':16} {'req/s':>8} {'p50':>8} {'p99':>8}")
+    for name, r in current["scenarios"].items():
+        old = base["scenarios"].get(name)
+        if old is None:
+            print(f"{name:16} {'(new)':>8}")
+            continue
+        print(f"{name:16} {_delta(r['rps'], old['rps']):>8} {_delta(r['p50_ms'], old['p50_ms']):>8} "
+              f"{_delta(r['p99_ms'], old['p99_ms']):>8}")
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000, help="expenses per user (1k to 1M)")
+    parser.add_argument("--ledger-rows", type=int, help="ledger entries per user (default: --rows)")
+    parser.add_argument("--users", type=int, default=1)
+    parser.add_argument("--days", type=int, default=730, help="days of history the rows are spread over")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--requests", type=int, default=200, help="requests per scenario")
+    parser.add_argument("--report-requests", type=int, default=20, help="requests per report scenario")
+    parser.add_argument("--report-days", type=int, default=30, help="date range of each report")
+    parser.add_argument("--warm-reports", action="store_true", help="let the report cache answer repeats")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=3, help="unrecorded requests before each scenario")
+    parser.add_argument("--whisper-ms", type=float, default=300, help="simulated transcription latency")
+    parser.add_argument("--gpt-ms", type=float, default=500, help="simulated parser latency")
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--background", choices=list(SCENARIOS),
+                        help="scenario kept running while each --scenario is measured")
+    parser.add_argument("--background-concurrency", type=int, default=2)
+    parser.add_argument("--out", type=Path, help="write the results as JSON")
+    parser.add_argument("--compare", type=Path, help="earlier --out file to compare against")
+    args = parser.parse_args(argv)
+
+    print(f"{args.users} user(s) x {args.rows} expenses / {args.ledger_rows or args.rows} ledger rows, "
+          f"concurrency {args.concurrency}"
+          + (f", {args.background} x{args.background_concurrency} in the background" if args.background else "")
+          + "\n")
+    print(HEADER)
+    result = asyncio.run(run(args))
+    server.report_jobs.shutdown()
+    if args.out:
+        args.out.write_text(json.dumps(result, indent=2) + "\n")
+        print(f"\nwrote {args.out}")
+    if args.compare:
+        compare(json.loads(args.compare.read_text()), result)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
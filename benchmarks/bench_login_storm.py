@@ -0,0 +1,127 @@
+"""API throughput while a burst of logins is running.
+
+Runs the app in-process (httpx ASGITransport, database faked) with LOGINS
+clients logging in back to back and API_CLIENTS clients calling an
+authenticated endpoint, in two modes:
+
+    before   bcrypt on the event loop, JWT decoded on every request
+    after    bcrypt on the auth pool, verified tokens cached
+
+Usage:
+    python benchmarks/bench_login_storm.py [SECONDS] [LOGINS] [API_CLIENTS]   (default: 5 20 20)
+"""
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import fakes
+
+fakes.offline_env()
+
+import httpx
+from fastapi import Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials
+from jose import JWTError, jwt
+
+import auth
+import main as server
+
+PASSWORD = "storm-password"
+
+
+def legacy_current_user(credentials: HTTPAuthorizationCredentials = Depends(auth.security)) -> dict:
+    # get_current_user as it was: sync (threadpool hop) and a full decode per request
+    try:
+        payload = jwt.decode(credentials.credentials, auth.SECRET_KEY, algorithms=[auth.ALGORITHM])
+        return {"user_id": payload["user_id"], "username": payload.get("username")}
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+
+async def legacy_check_password(plain: str, hashed: str) -> bool:
+    return auth.verify_password(plain, hashed)
+
+
+async def run(mode: str, seconds: float, logins: int, api_clients: int) -> dict:
+    user_row = {"id": "u-1", "username": "storm", "display_name": "Storm",
+                "password_hash": auth.hash_password(PASSWORD)}
+
+    async def fake_execute(query):
+        return SimpleNamespace(data=[user_row], count=None)
+
+    server.execute = fake_execute
+    if mode == "before":
+        server.check_password = legacy_check_password
+        server.app.dependency_overrides[auth.get_current_user] = legacy_current_user
+    else:
+        server.check_password = auth.check_password
+        server.app.dependency_overrides.pop(auth.get_current_user, None)
+    auth.token_cache._data.clear()
+
+    token = auth.create_access_token({"user_id": "u-1", "username": "storm"})
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.perf_counter() + seconds
+    api_latencies, login_latencies, rejected = [], [], 0
+
+    transport = httpx.ASGITransport(app=server.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def login_worker():
+            nonlocal rejected
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await client.post("/api/login", json={"username": "storm", "password": PASSWORD})
+                if r.status_code == 429:
+                    rejected += 1
+                    await asyncio.sleep(0.05)
+                    continue
+                assert r.status_code == 200, r.text
+                login_latencies.append(time.perf_counter() - t0)
+
+        async def api_worker():
+            while time.perf_counter() < deadline:
+                t0 = time.perf_counter()
+                r = await client.get("/api/cache/stats", headers=headers)
+                assert r.status_code == 200, r.text
+                api_latencies.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*[login_worker() for _ in range(logins)],
+                             *[api_worker() for _ in range(api_clients)])
+        elapsed = time.perf_counter() - t0
+
+    def pct(values, q):
+        return statistics.quantiles(values, n=100)[q - 1] * 1000 if len(values) > 1 else float("nan")
+
+    return {
+        "mode": mode,
+        "api_rps": len(api_latencies) / elapsed,
+        "api_p50_ms": pct(api_latencies, 50),
+        "api_p99_ms": pct(api_latencies, 99),
+        "logins_per_s": len(login_latencies) / elapsed,
+        "login_p50_ms": pct(login_latencies, 50),
+        "rejected": rejected,
+    }
+
+
+def main(argv):
+    seconds = float(argv[0]) if len(argv) > 0 else 5
+    logins = int(argv[1]) if len(argv) > 1 else 20
+    api_clients = int(argv[2]) if len(argv) > 2 else 20
+    print(f"{seconds:g}s, {logins} login clients, {api_clients} API clients, "
+          f"auth pool {auth.AUTH_POOL_SIZE}\n")
+    print(f"{'mode':8} {'api req/s':>10} {'api p50 ms':>11} {'api p99 ms':>11} "
+          f"{'logins/s':>9} {'login p50 ms':>13} {'429s':>6}")
+    for mode in ("before", "after"):
+        r = asyncio.run(run(mode, seconds, logins, api_clients))
+        print(f"{r['mode']:8} {r['api_rps']:10.0f} {r['api_p50_ms']:11.1f} {r['api_p99_ms']:11.1f} "
+              f"{r['logins_per_s']:9.1f} {r['login_p50_ms']:13.0f} {r['rejected']:6}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
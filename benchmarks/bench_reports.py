@@ -0,0 +1,74 @@
+"""Compare in-memory vs streaming Excel report generation.
+
+Each run happens in a fresh subprocess so peak RSS is measured per mode.
+
+Usage:
+    python benchmarks/bench_reports.py [ROWS ...]   (default: 1000 10000 100000)
+"""
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+CATEGORIES = ["Petrol", "Train Tickets", "Chai Nashta", "Cement", "Labour", "Rent"]
+
+
+def synthetic_expenses(n: int):
+    start = date(2024, 4, 1)
+    for i in range(n):
+        yield {
+            "id": f"{i:08d}",
+            "date": (start + timedelta(days=i % 365)).isoformat(),
+            "category_name": CATEGORIES[i % len(CATEGORIES)],
+            "description": f"entry {i} description text",
+            "amount": str(100 + (i % 977) * 1.25),
+        }
+
+
+def run_one(mode: str, rows: int) -> dict:
+    from legacy_reports import generate_expense_report
+    from reports import write_expense_report
+
+    d_from, d_to = date(2024, 4, 1), date(2025, 3, 31)
+    out = Path(tempfile.mkdtemp()) / "report.xlsx"
+    t0 = time.perf_counter()
+    if mode == "legacy":
+        # Mirrors the old endpoint: whole result set in memory, then BytesIO
+        data = list(synthetic_expenses(rows))
+        out.write_bytes(generate_expense_report(data, d_from, d_to, "Bench"))
+    else:
+        write_expense_report(synthetic_expenses(rows), out, d_from, d_to, "Bench")
+    elapsed = time.perf_counter() - t0
+    peak_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    size = out.stat().st_size
+    out.unlink()
+    return {"mode": mode, "rows": rows, "seconds": round(elapsed, 3),
+            "peak_rss_mb": round(peak_kb / 1024, 1), "file_kb": size // 1024}
+
+
+def main(argv):
+    if argv and argv[0] == "--child":
+        print(json.dumps(run_one(argv[1], int(argv[2]))))
+        return
+    sizes = [int(a) for a in argv] or [1000, 10000, 100000]
+    print(f"{'rows':>8} {'mode':>8} {'seconds':>9} {'peak RSS MB':>12} {'file KB':>8}")
+    for rows in sizes:
+        for mode in ("legacy", "stream"):
+            proc = subprocess.run(
+                [sys.executable, __file__, "--child", mode, str(rows)],
+                capture_output=True, text=True, check=True, cwd=ROOT, env=os.environ,
+            )
+            r = json.loads(proc.stdout)
+            print(f"{r['rows']:>8} {r['mode']:>8} {r['seconds']:>9} {r['peak_rss_mb']:>12} {r['file_kb']:>8}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,91 @@
+-- Search query cost at scale: seeds one user with :rows expenses and :rows
+-- ledger entries (plus a second user of the same size), then times
+-- search_entries() next to the ILIKE scan it replaces. Everything runs in
+-- one transaction that is rolled back, but use a scratch database with
+-- supabase_schema.sql loaded all the same.
+--
+-- Usage:
+--     psql "$SCRATCH_DATABASE_URL" -v rows=1000000 -f benchmarks/bench_search.sql
+
+\if :{?rows}
+\else
+  \set rows 200000
+\endif
+\set ON_ERROR_STOP on
+\timing off
+BEGIN;
+
+-- Seed with the row triggers off, then build the search keys in one pass
+ALTER TABLE expenses DISABLE TRIGGER USER;
+ALTER TABLE ledger_entries DISABLE TRIGGER USER;
+
+CREATE TEMP TABLE bench_users ON COMMIT DROP AS
+SELECT gen_random_uuid() AS id, n FROM generate_series(1, 2) n;
+INSERT INTO users (id, username, password_hash) SELECT id, 'bench_search_' || n, '-' FROM bench_users;
+
+INSERT INTO expense_categories (user_id, name, name_lower)
+SELECT u.id, c, lower(c) FROM bench_users u,
+  unnest(ARRAY['Petrol', 'Train Tickets', 'Chai Nashta', 'Cement', 'बिजली बिल', 'Rent', 'Stationery', 'Labour']) c;
+INSERT INTO parties (user_id, name, name_lower)
+SELECT u.id, p || ' ' || g, lower(p) || ' ' || g FROM bench_users u,
+  unnest(ARRAY['Sharma ji', 'Gupta Traders', 'Ajay Bhaiya', 'रमेश', 'Khan Hardware', 'Verma Cement']) p,
+  generate_series(1, 30) g;
+
+CREATE TEMP TABLE bench_refs ON COMMIT DROP AS
+SELECT u.id AS user_id,
+  (SELECT array_agg(id ORDER BY name) FROM expense_categories WHERE user_id = u.id) AS categories,
+  (SELECT array_agg(id ORDER BY name) FROM parties WHERE user_id = u.id) AS parties
+FROM bench_users u;
+
+INSERT INTO expenses (user_id, category_id, amount, description, raw_voice_text, date)
+SELECT r.user_id, r.categories[1 + g % 8], 10 + g % 1000,
+  (ARRAY['petrol bhara', 'train ticket mumbai', 'chai nashta office', 'cement 50 bags', 'bijli bill',
+         'dukaan kiraya', 'register pen', 'mazdoor ko diye', NULL])[1 + g % 9]
+    || CASE WHEN g % 997 = 0 THEN ' sariya' ELSE '' END,
+  CASE WHEN g % 3 = 0 THEN (ARRAY['पेट्रोल 500 रुपये', 'चाय नाश्ता 150', 'सीमेंट के बोरे'])[1 + g % 3] END,
+  CURRENT_DATE - g % 730
+FROM bench_refs r, generate_series(1, :rows) g;
+
+INSERT INTO ledger_entries (user_id, party_id, entry_type, item_name, amount, description, raw_voice_text, date)
+SELECT r.user_id, r.parties[1 + g % 180], 'goods_sold',
+  (ARRAY['cement', 'pipe', 'rait', 'gitti', 'eent', NULL])[1 + g % 6], 100 + g % 5000,
+  CASE WHEN g % 4 = 0 THEN 'udhaar' END,
+  CASE WHEN g % 7 = 0 THEN 'शर्मा जी को सीमेंट भेजा' END,
+  CURRENT_DATE - g % 730
+FROM bench_refs r, generate_series(1, :rows) g;
+
+\timing on
+SELECT rebuild_entry_search();
+\timing off
+ANALYZE expenses;
+ANALYZE ledger_entries;
+ANALYZE entry_search;
+SELECT id AS bench_user FROM bench_users WHERE n = 1 \gset
+
+\echo
+\echo '== ILIKE scan (before): expenses mentioning sariya'
+\timing on
+SELECT count(*) FROM expenses
+WHERE user_id = :'bench_user' AND (description ILIKE '%sariya%' OR raw_voice_text ILIKE '%sariya%');
+\timing off
+
+\echo '== search_entries: sariya (rare word)'
+\timing on
+SELECT count(*) FROM search_entries(:'bench_user', ARRAY['saria'], 'expenses', 500, 0);
+\timing off
+
+\echo '== search_entries: शर्मा जी सीमेंट (party name + voice text)'
+\timing on
+SELECT source, date, name, item_name, rank FROM search_entries(:'bench_user', ARRAY['siment', 'sarma'], NULL, 5, 0);
+\timing off
+
+\echo '== search_entries: petrol (common word: newest 1000 matches ranked)'
+\timing on
+SELECT count(*) FROM search_entries(:'bench_user', ARRAY['petrol'], NULL, 50, 0);
+\timing off
+
+\echo '== plan: rare word'
+EXPLAIN (ANALYZE, COSTS OFF, SUMMARY ON)
+SELECT * FROM entry_search WHERE search_key LIKE '%saria%' AND user_id = :'bench_user';
+
+ROLLBACK;
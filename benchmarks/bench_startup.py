@@ -0,0 +1,125 @@
+"""Cold-start budget: import time of main and time to first response.
+
+Each run uses a fresh interpreter. "import" is `import main` on its own;
+"first response" is from spawning uvicorn until /healthz answers 200, and
+"index" is the first GET / after that. Exits 1 when a median is over its
+budget, so it can gate CI.
+
+Usage:
+    python benchmarks/bench_startup.py [--runs 5] [--import-budget-ms 1000] [--ttfr-budget-ms 2500]
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fakes
+
+IMPORT_SNIPPET = (
+    "import sys, time; sys.path.insert(0, sys.argv[1]); t = time.perf_counter(); import main; "
+    "print((time.perf_counter() - t) * 1000); "
+    "print(','.join(m for m in ('openai', 'supabase', 'openpyxl', 'httpx') if m in sys.modules))"
+)
+
+
+def _env() -> dict:
+    fakes.offline_env()
+    return dict(os.environ)
+
+
+def measure_import(workdir: str) -> tuple:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET, str(ROOT)], cwd=workdir, env=_env(),
+                         capture_output=True, text=True, check=True).stdout.splitlines()
+    return float(out[0]), out[1] if len(out) > 1 else ""
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _get(url: str) -> int:
+    with urllib.request.urlopen(url, timeout=5) as r:
+        r.read()
+        return r.status
+
+
+def measure_first_response(workdir: str, timeout: float = 30) -> tuple:
+    port = _free_port()
+    base = f"http://127.0.0.1:{port}"
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--app-dir", str(ROOT),
+         "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=_env(), stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    try:
+        while True:
+            if proc.poll() is not None:
+                raise RuntimeError(f"uvicorn exited: {proc.stderr.read().decode()[-2000:]}")
+            if time.perf_counter() - t0 > timeout:
+                raise RuntimeError("no response from /healthz")
+            try:
+                if _get(base + "/healthz") == 200:
+                    break
+            except OSError:
+                time.sleep(0.005)
+        ttfr = (time.perf_counter() - t0) * 1000
+        t1 = time.perf_counter()
+        _get(base + "/")
+        index = (time.perf_counter() - t1) * 1000
+        return ttfr, index
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--import-budget-ms", type=float, default=1000)
+    parser.add_argument("--ttfr-budget-ms", type=float, default=2500)
+    args = parser.parse_args(argv)
+
+    workdir = tempfile.mkdtemp(prefix="biztracker-startup-")
+    imports, ttfrs, indexes, heavy = [], [], [], set()
+    for _ in range(args.runs):
+        ms, loaded = measure_import(workdir)
+        imports.append(ms)
+        heavy.update(filter(None, loaded.split(",")))
+        ttfr, index = measure_first_response(workdir)
+        ttfrs.append(ttfr)
+        indexes.append(index)
+
+    rows = [
+        ("import main", imports, args.import_budget_ms),
+        ("first /healthz", ttfrs, args.ttfr_budget_ms),
+        ("then first /", indexes, None),
+    ]
+    failed = False
+    print(f"{'':16} {'median ms':>10} {'min':>8} {'max':>8} {'budget':>8}")
+    for name, values, budget in rows:
+        median = statistics.median(values)
+        verdict = ""
+        if budget is not None:
+            verdict = "ok" if median <= budget else "OVER"
+            failed |= median > budget
+        print(f"{name:16} {median:10.0f} {min(values):8.0f} {max(values):8.0f} "
+              f"{budget if budget is not None else '':>8} {verdict}")
+    if heavy:
+        print(f"\nimported eagerly by main: {', '.join(sorted(heavy))}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,72 @@
+"""Measure the local voice parser against a labelled corpus.
+
+Reports the hit rate (transcripts handled without GPT), accuracy of those
+hits, and correct fall-backs for transcripts that need GPT.
+
+Usage:
+    python benchmarks/bench_voice_rules.py [--verbose]
+"""
+import json
+import statistics
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from voice_rules import parse_local  # noqa: E402
+from ai_parser import LOCAL_PARSE_MIN_CONFIDENCE  # noqa: E402
+
+CATEGORIES = ["Petrol", "Train Tickets", "Chai Nashta", "Rent", "Bijli Bill", "Labour", "Auto Kiraya"]
+PARTIES = ["Ramesh", "Gupta Ji", "Sharma Ji", "Ajay Ji", "Verma Traders", "Sunil Kumar"]
+
+
+def matches(result: dict, expected: dict) -> bool:
+    for key, value in expected.items():
+        got = result.get(key)
+        if key == "amount":
+            if abs(float(got or 0) - value) > 0.001:
+                return False
+        elif got != value:
+            return False
+    return True
+
+
+def main(verbose: bool = False):
+    corpus = [json.loads(line) for line in (ROOT / "benchmarks" / "voice_corpus.jsonl").open(encoding="utf-8")]
+    hits = correct = wrong = 0
+    fallbacks_expected = fallbacks_ok = 0
+    timings = []
+    for case in corpus:
+        t0 = time.perf_counter()
+        result = parse_local(case["text"], CATEGORIES, PARTIES)
+        timings.append((time.perf_counter() - t0) * 1000)
+        expected = case["expected"]
+        local = result["confidence"] >= LOCAL_PARSE_MIN_CONFIDENCE
+        if expected["type"] == "gpt":
+            fallbacks_expected += 1
+            ok = not local
+            fallbacks_ok += ok
+        else:
+            ok = local and matches(result, expected)
+            hits += local
+            correct += ok
+            wrong += local and not ok
+        if verbose or not ok:
+            mark = "ok " if ok else "BAD"
+            print(f"{mark} {result['confidence']:.2f} {result['type']:12} {case['text']}")
+
+    handled = len(corpus) - fallbacks_expected
+    print()
+    print(f"corpus size            {len(corpus)}")
+    print(f"local hit rate         {hits}/{handled} ({100 * hits / handled:.0f}%) of locally parseable")
+    print(f"accuracy of hits       {correct}/{hits} ({100 * correct / max(hits, 1):.0f}%)")
+    print(f"wrong local answers    {wrong}")
+    print(f"correct GPT fallbacks  {fallbacks_ok}/{fallbacks_expected}")
+    print(f"overall GPT calls saved {hits}/{len(corpus)} ({100 * hits / len(corpus):.0f}%)")
+    print(f"median parse time      {statistics.median(timings):.3f} ms")
+
+
+if __name__ == "__main__":
+    main("--verbose" in sys.argv)
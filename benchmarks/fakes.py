@@ -0,0 +1,784 @@
+"""In-memory stand-ins for the Supabase and OpenAI clients, for offline benchmarks and tests.
+
+FakeSupabase implements the part of the postgrest-py builder API the app
+uses (select with embedded relations, eq/neq/gt/gte/lt/lte/in_/is_/or_
+filters, order, limit, range, count, insert/upsert/update/delete) and the
+RPCs behind the benchmarked endpoints. Each user's rows are kept sorted on
+the same columns as the real indexes, so keyset pages and date ranges cost
+a bisect rather than a scan, daily totals are kept like the rollup
+tables and writes are logged like sync_changes. FakeOpenAI answers from benchmarks/voice_corpus.jsonl after a
+fixed simulated latency.
+
+Call offline_env() before importing the app, then install() the fakes.
+"""
+import asyncio
+import bisect
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta, timezone
+from operator import itemgetter
+from pathlib import Path
+from types import SimpleNamespace
+
+CORPUS = Path(__file__).parent / "voice_corpus.jsonl"
+
+# Sort orders kept per user. Queries ordered by a prefix of one of these
+# (either direction) are answered without sorting.
+INDEXES = {
+    "expenses": [("date", "created_at", "id"), ("created_at",)],
+    "ledger_entries": [("date", "created_at", "id"), ("created_at",)],
+}
+# Embedded selects: (table, relation) -> foreign key column
+RELATIONS = {
+    ("expenses", "expense_categories"): "category_id",
+    ("ledger_entries", "parties"): "party_id",
+}
+DEFAULTS = {
+    "expense_categories": {"is_active": True},
+    "parties": {"is_active": True},
+}
+
+CATEGORIES = ["Petrol", "Train Tickets", "Chai Nashta", "Cement", "Labour", "Rent",
+              "Electricity", "Mobile Recharge", "Stationery", "Transport", "Repairs", "Food"]
+PARTIES = ["Ramesh Traders", "Sharma Ji", "Verma & Sons", "Gupta Hardware", "Anil Cement",
+           "Suresh Kirana", "Patel Brothers", "Rajesh Steel", "Mohan Lal", "Khan Transport"]
+ENTRY_TYPES = ["goods_sold", "payment_received", "payment_made", "goods_returned", "goods_taken"]
+# Matches ranked by search_entries (the newest ones)
+SEARCH_WINDOW = 1000
+# Tables whose writes the log_sync_change trigger records
+SYNC_TABLES = {"expense_categories", "parties", "expenses", "ledger_entries"}
+
+
+def offline_env():
+    """Placeholder credentials so the app's real clients can be constructed
+    without a network (they are replaced by install())."""
+    os.environ.setdefault("SUPABASE_URL", "http://localhost:54321")
+    os.environ.setdefault("SUPABASE_SERVICE_KEY", "eyJhbGciOiJIUzI1NiJ9.e30.offline")
+    os.environ.setdefault("OPENAI_API_KEY", "sk-offline")
+
+
+def install(store, openai_client):
+    """Point every module that holds a client at the fakes."""
+    import ai_parser
+    import db
+    import imports
+    import main
+    import report_jobs
+
+    for module in (db, main, report_jobs, imports):
+        module.supabase = store
+    ai_parser.client = openai_client
+
+
+# ─── Supabase ───
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _sortable(value):
+    return "" if value is None else value
+
+
+def _matches(value, op: str, arg) -> bool:
+    if op == "is":
+        return value is None if arg in (None, "null") else value == arg
+    if op == "in":
+        return str(value) in {str(a) for a in arg}
+    if value is None:
+        return False
+    if isinstance(value, bool):
+        arg = arg if isinstance(arg, bool) else str(arg).lower() == "true"
+    elif isinstance(value, (int, float)):
+        arg = float(arg)
+    else:
+        arg = str(arg)
+    if op == "eq":
+        return value == arg
+    if op == "neq":
+        return value != arg
+    if op == "gt":
+        return value > arg
+    if op == "gte":
+        return value >= arg
+    if op == "lt":
+        return value < arg
+    if op == "lte":
+        return value <= arg
+    raise NotImplementedError(f"filter operator {op!r}")
+
+
+def _split_top(expr: str) -> list:
+    parts, depth, start = [], 0, 0
+    for i, ch in enumerate(expr):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            parts.append(expr[start:i])
+            start = i + 1
+    parts.append(expr[start:])
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _parse_or(expr: str) -> list:
+    """PostgREST or=(...) syntax -> list of AND-groups of (column, op, value)."""
+    groups = []
+    for term in _split_top(expr):
+        if term.startswith("and(") and term.endswith(")"):
+            conds = _split_top(term[4:-1])
+        else:
+            conds = [term]
+        group = []
+        for cond in conds:
+            col, op, value = cond.split(".", 2)
+            if len(value) >= 2 and value[0] == value[-1] == '"':
+                value = value[1:-1]
+            group.append((col, op, value))
+        groups.append(group)
+    return groups
+
+
+def _tuple_bound(groups: list):
+    """Recognise db.keyset_filter output: (columns, op, values) or None."""
+    columns, values, op = [], [], None
+    for i, group in enumerate(groups):
+        if len(group) != i + 1 or any(c[1] != "eq" for c in group[:-1]):
+            return None
+        col, last_op, value = group[-1]
+        if last_op not in ("gt", "lt") or (op and last_op != op):
+            return None
+        if [c[0] for c in group[:-1]] != columns or [c[2] for c in group[:-1]] != values:
+            return None
+        op = last_op
+        columns.append(col)
+        values.append(value)
+    return (tuple(columns), op, tuple(values)) if op else None
+
+
+class _Index:
+    def __init__(self, columns: tuple, rows=()):
+        self.columns = columns
+        pairs = sorted(((self.key(r), r) for r in rows), key=itemgetter(0))
+        self.keys = [k for k, _ in pairs]
+        self.rows = [r for _, r in pairs]
+
+    def key(self, row: dict) -> tuple:
+        return tuple(_sortable(row.get(c)) for c in self.columns)
+
+    def add(self, row: dict):
+        k = self.key(row)
+        i = bisect.bisect_right(self.keys, k)
+        self.keys.insert(i, k)
+        self.rows.insert(i, row)
+
+    def remove(self, row: dict):
+        i = bisect.bisect_left(self.keys, self.key(row))
+        while self.rows[i] is not row:
+            i += 1
+        del self.keys[i]
+        del self.rows[i]
+
+
+class _Partition:
+    """One user's rows of one table."""
+
+    def __init__(self, table: str, rows=()):
+        self.rows = list(rows)
+        self.indexes = [_Index(cols, self.rows) for cols in INDEXES.get(table, ())]
+
+
+class FakeSupabase:
+    ready = True
+
+    def __init__(self):
+        self._parts = defaultdict(dict)    # table -> user_id -> _Partition
+        self._by_id = defaultdict(dict)    # table -> id -> row
+        self._lock = threading.RLock()
+        self.writes = 0
+        # Daily rollups, as maintained by the database triggers
+        self.expense_days = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))  # uid -> (date, category_id)
+        self.ledger_days = defaultdict(lambda: defaultdict(lambda: [0.0, 0]))   # uid -> (party_id, date)
+        # Make report_data_version change on every call so reports are always rebuilt
+        self.fresh_report_versions = False
+        self.rpcs = {
+            "dashboard_totals": self._dashboard_totals,
+            "expense_category_summary": self._expense_category_summary,
+            "report_data_version": self._report_data_version,
+            "search_entries": self._search_entries,
+            "sync_changes_since": self._sync_changes_since,
+            "bulk_update_expenses": lambda p: self._bulk_update("expenses", p),
+            "bulk_update_ledger_entries": lambda p: self._bulk_update("ledger_entries", p),
+        }
+        self._search_keys = {}  # row id -> (searched text, key)
+        # sync_changes: every write is its own transaction unless the thread
+        # making it is inside transaction(); entries show once that commits
+        self.sync_log = []
+        self._seq = 0
+        self._txid = 0
+        self._open_txids = set()
+        self._local = threading.local()  # .tx = (txid, pending log entries)
+
+    def table(self, name: str) -> "_Query":
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict = None) -> "_RPC":
+        return _RPC(self, name, params or {})
+
+    # ── storage ──
+    def load(self, table: str, rows: list):
+        """Bulk insert seeded rows (ids and timestamps already set)."""
+        by_user = defaultdict(list)
+        for row in rows:
+            by_user[row.get("user_id")].append(row)
+            self._by_id[table][row["id"]] = row
+            self._rollup(table, row, 1)
+        for uid, user_rows in by_user.items():
+            part = self._parts[table].get(uid)
+            if part is None:
+                self._parts[table][uid] = _Partition(table, user_rows)
+            else:
+                for row in user_rows:
+                    self._add_to(part, row)
+
+    def _partitions(self, table: str, user_id):
+        if user_id is not None:
+            part = self._parts[table].get(str(user_id))
+            return [part] if part else []
+        return list(self._parts[table].values())
+
+    def _add_to(self, part: _Partition, row: dict):
+        part.rows.append(row)
+        for index in part.indexes:
+            index.add(row)
+
+    def _add(self, table: str, row: dict):
+        uid = row.get("user_id")
+        part = self._parts[table].get(uid)
+        if part is None:
+            part = self._parts[table][uid] = _Partition(table)
+        self._add_to(part, row)
+        self._by_id[table][row["id"]] = row
+        self._rollup(table, row, 1)
+        self.writes += 1
+
+    def _remove(self, table: str, row: dict):
+        part = self._parts[table][row.get("user_id")]
+        del part.rows[next(i for i, r in enumerate(part.rows) if r is row)]
+        for index in part.indexes:
+            index.remove(row)
+        self._by_id[table].pop(row["id"], None)
+        self._rollup(table, row, -1)
+        self.writes += 1
+
+    def _rollup(self, table: str, row: dict, sign: int):
+        if table == "expenses":
+            day = self.expense_days[row["user_id"]][(row["date"], row.get("category_id"))]
+        elif table == "ledger_entries":
+            day = self.ledger_days[row["user_id"]][(row.get("party_id"), row["date"])]
+        else:
+            return
+        day[0] += sign * float(row.get("amount") or 0)
+        day[1] += sign
+
+    # ── change log ──
+    def _log_change(self, table: str, row: dict):
+        if table not in SYNC_TABLES:
+            return
+        self._seq += 1
+        tx = getattr(self._local, "tx", None)
+        if tx is None:
+            self._txid += 1
+            txid, pending = self._txid, self.sync_log
+        else:
+            txid, pending = tx
+        pending.append({"seq": self._seq, "user_id": row.get("user_id"), "table": table,
+                        "id": row["id"], "txid": txid})
+
+    @contextmanager
+    def transaction(self):
+        """Writes this thread makes inside share one txid, taken at the start,
+        and reach the change log on exit: a slow transaction that commits
+        after later ones."""
+        with self._lock:
+            self._txid += 1
+            txid, pending = self._txid, []
+            self._open_txids.add(txid)
+            self._local.tx = (txid, pending)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._local.tx = None
+                self._open_txids.discard(txid)
+                self.sync_log.extend(pending)
+
+    # ── RPCs ──
+    def _dashboard_totals(self, p):
+        today, month, fy = p["p_today"], p["p_month_start"], p["p_fy_start"]
+        totals = {"today_total": 0.0, "month_total": 0.0, "fy_total": 0.0}
+        for (day, _), (total, _) in self.expense_days[p["p_user_id"]].items():
+            if fy <= day <= today:
+                totals["fy_total"] += total
+                if day >= month:
+                    totals["month_total"] += total
+                if day == today:
+                    totals["today_total"] += total
+        return [totals]
+
+    def _expense_category_summary(self, p):
+        sums = defaultdict(lambda: [0.0, 0])
+        for (day, cat), (total, count) in self.expense_days[p["p_user_id"]].items():
+            if p["p_from"] <= day <= p["p_to"]:
+                sums[cat][0] += total
+                sums[cat][1] += count
+        out = []
+        for cat, (total, count) in sums.items():
+            if count > 0:
+                name = self._by_id["expense_categories"].get(cat, {}).get("name", "")
+                out.append({"category_id": cat, "category_name": name, "entry_count": count, "total": total})
+        return sorted(out, key=lambda r: -r["total"])
+
+    def _report_data_version(self, p):
+        if self.fresh_report_versions:
+            return uuid.uuid4().hex
+        if p["p_kind"] == "party":
+            days = [v for (party, day), v in self.ledger_days[p["p_user_id"]].items()
+                    if party == p.get("p_party_id") and p["p_from"] <= day <= p["p_to"]]
+        else:
+            days = [v for (day, _), v in self.expense_days[p["p_user_id"]].items()
+                    if p["p_from"] <= day <= p["p_to"]]
+        return f"{self.writes}/{len(days)}/{sum(c for _, c in days)}"
+
+    def _sync_changes_since(self, p):
+        changes = sorted((c for c in self.sync_log
+                          if c["user_id"] == p["p_user_id"] and c["txid"] >= p["p_xmin"]
+                          and c["seq"] > p["p_after_seq"]), key=itemgetter("seq"))
+        return {
+            # Oldest transaction still running, as pg_snapshot_xmin reports it
+            "xmin": min(self._open_txids, default=self._txid + 1),
+            "changes": [{"seq": c["seq"], "table": c["table"], "id": c["id"],
+                         "data": dict(self._by_id[c["table"]][c["id"]]) if c["id"] in self._by_id[c["table"]] else None}
+                        for c in changes[:p["p_limit"]]],
+        }
+
+    def _bulk_update(self, table: str, p):
+        updated = []
+        for data in p["p_rows"]:
+            row = self._by_id[table].get(str(uuid.UUID(data["id"])))  # ids are cast with ::UUID
+            if row is None or row.get("user_id") != p["p_user_id"]:
+                continue
+            self._remove(table, row)
+            row.update({k: v for k, v in data.items() if k != "id" and v is not None})
+            row["updated_at"] = _now()
+            self._add(table, row)
+            self._log_change(table, row)
+            updated.append(row["id"])
+        return updated
+
+    def _key(self, row_id, fields: tuple) -> str:
+        """hinglish_key() of the schema over ``fields``, cached per row."""
+        cached = self._search_keys.get(row_id)
+        if cached is None or cached[0] != fields:
+            from voice_rules import phonetic_key
+            text = " ".join(f for f in fields if f)
+            key = " ".join(k for k in map(phonetic_key, re.split(r"[\s,.!?।]+", text)) if k)
+            cached = self._search_keys[row_id] = (fields, key)
+        return cached[1]
+
+    def _search_entries(self, p):
+        # Same matching and window as the SQL function, by scanning; the rank is
+        # the share of query keys found as whole words, not trigram similarity
+        keys, uid = p["p_keys"], p["p_user_id"]
+        hits = []
+        for table, source, ref, names in (("expenses", "expenses", "category_id", "expense_categories"),
+                                          ("ledger_entries", "ledger", "party_id", "parties")):
+            if p.get("p_source") not in (None, source):
+                continue
+            for part in self._partitions(table, uid):
+                for row in part.rows:
+                    text = (row.get("description"), row.get("item_name"), row.get("raw_voice_text"))
+                    named = self._by_id[names].get(row.get(ref), {})
+                    key = self._key(row["id"], text) + " " + self._key(named.get("id"), (named.get("name"),))
+                    if all(k in key for k in keys):
+                        words = set(key.split())
+                        rank = sum(k in words for k in keys) / len(keys)
+                        hits.append((rank, row, source, named.get("name")))
+        hits.sort(key=lambda h: (h[1]["date"], h[1]["created_at"], h[1]["id"]), reverse=True)
+        hits = hits[:SEARCH_WINDOW]
+        hits.sort(key=itemgetter(0), reverse=True)  # stable: ties stay newest first
+        out = []
+        for rank, row, source, name in hits[p["p_offset"]:p["p_offset"] + p["p_limit"]]:
+            out.append({
+                "source": source, "id": row["id"], "date": row["date"], "created_at": row["created_at"],
+                "amount": row["amount"], "entry_type": row.get("entry_type"), "item_name": row.get("item_name"),
+                "quantity": row.get("quantity"), "unit": row.get("unit"), "rate": row.get("rate"),
+                "description": row.get("description"), "raw_voice_text": row.get("raw_voice_text"),
+                "category_id": row.get("category_id"), "party_id": row.get("party_id"),
+                "name": name, "rank": rank,
+            })
+        return out
+
+
+class _RPC:
+    def __init__(self, store: FakeSupabase, name: str, params: dict):
+        self.store, self.name, self.params = store, name, params
+        self.path = f"/rpc/{name}"
+        self.http_method = "POST"
+
+    def execute(self):
+        handler = self.store.rpcs.get(self.name)
+        if handler is None:
+            raise NotImplementedError(f"RPC {self.name} is not implemented by FakeSupabase")
+        with self.store._lock:
+            return SimpleNamespace(data=handler(self.params), count=None)
+
+
+class _Query:
+    def __init__(self, store: FakeSupabase, table: str):
+        self.store, self.table = store, table
+        self.path = f"/{table}"
+        self.http_method = "GET"
+        self.op = "select"
+        self.columns = "*"
+        self.filters = []   # (column, op, value)
+        self.or_groups = []
+        self.orders = []    # (column, desc)
+        self.limit_n = None
+        self.offset = 0
+        self.count = None
+        self.head = False
+        self.payload = None
+        self.on_conflict = None
+        self.ignore_duplicates = False
+        self.returning = "representation"
+
+    # ── builder ──
+    def select(self, *columns, count=None, head=False):
+        self.columns = ",".join(columns) or "*"
+        self.count, self.head = count, head
+        return self
+
+    def insert(self, json, count=None, returning="representation", upsert=False, **kwargs):
+        self.op, self.http_method = ("upsert" if upsert else "insert"), "POST"
+        self.payload, self.count, self.returning = json, count, returning
+        return self
+
+    def upsert(self, json, count=None, returning="representation", ignore_duplicates=False,
+               on_conflict="", **kwargs):
+        self.insert(json, count=count, returning=returning, upsert=True)
+        self.on_conflict = [c.strip() for c in on_conflict.split(",") if c.strip()]
+        self.ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, json, count=None, returning="representation"):
+        self.op, self.http_method = "update", "PATCH"
+        self.payload, self.count, self.returning = json, count, returning
+        return self
+
+    def delete(self, count=None, returning="representation"):
+        self.op, self.http_method = "delete", "DELETE"
+        self.count, self.returning = count, returning
+        return self
+
+    def _filter(self, column, op, value):
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, "eq", value)
+
+    def neq(self, column, value):
+        return self._filter(column, "neq", value)
+
+    def gt(self, column, value):
+        return self._filter(column, "gt", value)
+
+    def gte(self, column, value):
+        return self._filter(column, "gte", value)
+
+    def lt(self, column, value):
+        return self._filter(column, "lt", value)
+
+    def lte(self, column, value):
+        return self._filter(column, "lte", value)
+
+    def in_(self, column, values):
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column, value):
+        return self._filter(column, "is", value)
+
+    def or_(self, filters: str, reference_table=None):
+        self.or_groups.append(_parse_or(filters))
+        return self
+
+    def order(self, column, *, desc=False, nullsfirst=None, foreign_table=None):
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, size, *, foreign_table=None):
+        self.limit_n = size
+        return self
+
+    def range(self, start, end, foreign_table=None):
+        self.offset, self.limit_n = start, end - start + 1
+        return self
+
+    # ── execution ──
+    def _accepts(self, row: dict) -> bool:
+        for col, op, value in self.filters:
+            if not _matches(row.get(col), op, value):
+                return False
+        for groups in self.or_groups:
+            if not any(all(_matches(row.get(c), op, v) for c, op, v in group) for group in groups):
+                return False
+        return True
+
+    def _candidates(self):
+        """Rows to filter, in the requested order when an index provides it."""
+        uid = next((v for c, op, v in self.filters if c == "user_id" and op == "eq"), None)
+        parts = self.store._partitions(self.table, uid)
+        if len(parts) == 1 and self.orders and len({d for _, d in self.orders}) == 1:
+            cols = tuple(c for c, _ in self.orders)
+            desc = self.orders[0][1]
+            for index in parts[0].indexes:
+                if index.columns[:len(cols)] == cols:
+                    lo, hi = self._bounds(index)
+                    rng = range(hi - 1, lo - 1, -1) if desc else range(lo, hi)
+                    return (index.rows[i] for i in rng), True
+        rows = (row for part in parts for row in part.rows)
+        return rows, not self.orders
+
+    def _bounds(self, index: _Index) -> tuple:
+        """Slice of ``index`` allowed by range filters on its leading column(s)."""
+        lo, hi = 0, len(index.keys)
+        first = itemgetter(0)
+        for col, op, value in self.filters:
+            if col != index.columns[0]:
+                continue
+            value = str(value)
+            if op in ("eq", "gte"):
+                lo = max(lo, bisect.bisect_left(index.keys, value, key=first))
+            elif op == "gt":
+                lo = max(lo, bisect.bisect_right(index.keys, value, key=first))
+            if op in ("eq", "lte"):
+                hi = min(hi, bisect.bisect_right(index.keys, value, key=first))
+            elif op == "lt":
+                hi = min(hi, bisect.bisect_left(index.keys, value, key=first))
+        for groups in self.or_groups:
+            bound = _tuple_bound(groups)
+            if bound and bound[0] == index.columns:
+                if bound[1] == "gt":
+                    lo = max(lo, bisect.bisect_right(index.keys, bound[2]))
+                else:
+                    hi = min(hi, bisect.bisect_left(index.keys, bound[2]))
+        return lo, max(lo, hi)
+
+    def _matching(self) -> list:
+        rows, ordered = self._candidates()
+        rows = (r for r in rows if self._accepts(r))
+        if not ordered:
+            rows = list(rows)
+            for col, desc in reversed(self.orders):
+                rows.sort(key=lambda r: _sortable(r.get(col)), reverse=desc)
+        return rows
+
+    def _project(self, row: dict) -> dict:
+        out = {}
+        for item in _split_top(self.columns):
+            if "(" in item:
+                rel, cols = item[:-1].split("(", 1)
+                rel = rel.strip()
+                fk = RELATIONS.get((self.table, rel))
+                target = self.store._by_id[rel].get(row.get(fk)) if fk else None
+                if target is None:
+                    out[rel] = None
+                elif cols.strip() == "*":
+                    out[rel] = dict(target)
+                else:
+                    out[rel] = {c.strip(): target.get(c.strip()) for c in cols.split(",")}
+            elif item == "*":
+                out.update(row)
+            else:
+                out[item] = row.get(item)
+        return out
+
+    def _select(self):
+        rows = self._matching()
+        total = None
+        if self.count:
+            rows = list(rows)
+            total = len(rows)
+        if self.head:
+            return SimpleNamespace(data=[], count=total)
+        start, stop = self.offset, None if self.limit_n is None else self.offset + self.limit_n
+        if isinstance(rows, list):
+            page = rows[start:stop]
+        else:
+            page = []
+            for i, row in enumerate(rows):
+                if stop is not None and i >= stop:
+                    break
+                if i >= start:
+                    page.append(row)
+        return SimpleNamespace(data=[self._project(r) for r in page], count=total)
+
+    def _new_row(self, data: dict) -> dict:
+        now = _now()
+        row = {**DEFAULTS.get(self.table, {}), "created_at": now, "updated_at": now, **data}
+        row.setdefault("id", str(uuid.uuid4()))
+        return row
+
+    def _write(self):
+        store = self.store
+        changed = []
+        if self.op in ("insert", "upsert"):
+            items = self.payload if isinstance(self.payload, list) else [self.payload]
+            for data in items:
+                existing = None
+                if self.on_conflict:
+                    key = tuple(str(data.get(c)) for c in self.on_conflict)
+                    uid = data.get("user_id")
+                    existing = next((r for part in store._partitions(self.table, uid) for r in part.rows
+                                     if tuple(str(r.get(c)) for c in self.on_conflict) == key), None)
+                if existing is not None:
+                    if not self.ignore_duplicates:
+                        changed.append(self._update_row(existing, data))
+                    continue
+                row = self._new_row(data)
+                store._add(self.table, row)
+                changed.append(row)
+        elif self.op == "update":
+            for row in list(self._matching()):
+                changed.append(self._update_row(row, self.payload))
+        elif self.op == "delete":
+            for row in list(self._matching()):
+                store._remove(self.table, row)
+                changed.append(row)
+        for row in changed:
+            store._log_change(self.table, row)
+        data = [] if self.returning == "minimal" else [dict(r) for r in changed]
+        return SimpleNamespace(data=data, count=len(changed) if self.count else None)
+
+    def _update_row(self, row: dict, data: dict) -> dict:
+        self.store._remove(self.table, row)
+        row.update(data)
+        row["updated_at"] = _now()
+        self.store._add(self.table, row)
+        return row
+
+    def execute(self):
+        with self.store._lock:
+            if self.op == "select":
+                return self._select()
+            return self._write()
+
+
+# ─── OpenAI ───
+class FakeOpenAI:
+    """Deterministic client.audio.transcriptions / client.chat.completions.
+
+    A clip is transcribed to a corpus phrase chosen by the hash of its bytes;
+    the parser returns that phrase's expected result.
+    """
+
+    ready = True
+
+    def __init__(self, whisper_latency: float = 0.3, gpt_latency: float = 0.5):
+        self.whisper_latency = whisper_latency
+        self.gpt_latency = gpt_latency
+        self.corpus = [json.loads(line) for line in CORPUS.read_text(encoding="utf-8").splitlines() if line.strip()]
+        self._expected = {c["text"]: c.get("expected", {}) for c in self.corpus}
+        self.audio = SimpleNamespace(transcriptions=SimpleNamespace(create=self._transcribe))
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._complete))
+
+    async def _transcribe(self, *, model, file, **kwargs):
+        await asyncio.sleep(self.whisper_latency)
+        data = file[1]
+        i = int(hashlib.sha1(data).hexdigest(), 16) % len(self.corpus)
+        return SimpleNamespace(text=self.corpus[i]["text"])
+
+    async def _complete(self, *, model, messages, **kwargs):
+        await asyncio.sleep(self.gpt_latency)
+        text = messages[-1]["content"]
+        result = {
+            "type": "unknown", "category": "", "category_match_found": False,
+            "party_name": "", "party_match_found": False, "entry_type": None,
+            "item_name": "", "quantity": None, "unit": None, "rate": None, "amount": 0,
+            "description": text, "date_offset_days": 0, "confidence": 0.9,
+        }
+        result.update(self._expected.get(text, {}))
+        content = json.dumps(result, ensure_ascii=False)
+        usage = SimpleNamespace(
+            prompt_tokens=sum(len(m["content"]) for m in messages) // 4,
+            completion_tokens=len(content) // 4,
+        )
+        message = SimpleNamespace(content=content)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+# ─── Synthetic data ───
+def _uuid(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def seed(store: FakeSupabase, users: int = 1, expenses: int = 10000, ledger: int = 10000,
+         days: int = 730, end: date = None, random_seed: int = 1) -> list:
+    """Fill ``store`` with ``users`` users, each holding ``expenses`` expenses
+    and ``ledger`` ledger entries spread over the ``days`` days up to ``end``.
+    Returns the users as {"id", "username", "category_ids", "party_ids"}."""
+    rng = random.Random(random_seed)
+    end = end or date.today()
+    day_strs = [(end - timedelta(days=d)).isoformat() for d in range(days)]
+    out = []
+    for u in range(users):
+        uid = _uuid(rng)
+        username = f"bench{u}"
+        store.load("users", [{"id": uid, "username": username, "display_name": f"Bench {u}",
+                              "password_hash": "-", "created_at": day_strs[-1]}])
+        cats = [{"id": _uuid(rng), "user_id": uid, "name": n, "name_lower": n.lower(),
+                 "is_active": True, "created_at": day_strs[-1]} for n in CATEGORIES]
+        parties = [{"id": _uuid(rng), "user_id": uid, "name": n, "name_lower": n.lower(),
+                    "phone": "", "notes": "", "is_active": True, "created_at": day_strs[-1]}
+                   for n in PARTIES]
+        store.load("expense_categories", cats)
+        store.load("parties", parties)
+
+        rows = []
+        for i in range(expenses):
+            day = rng.choice(day_strs)
+            created = f"{day}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{i % 1000000:06d}+00:00"
+            rows.append({
+                "id": _uuid(rng), "user_id": uid, "category_id": rng.choice(cats)["id"],
+                "amount": round(rng.uniform(10, 5000), 2), "description": f"entry {i}",
+                "raw_voice_text": "", "date": day, "created_at": created, "updated_at": created,
+            })
+        store.load("expenses", rows)
+
+        rows = []
+        for i in range(ledger):
+            day = rng.choice(day_strs)
+            created = f"{day}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:{rng.randrange(60):02d}.{i % 1000000:06d}+00:00"
+            goods = i % 3 == 0
+            qty = rng.randrange(1, 50) if goods else None
+            rate = round(rng.uniform(50, 500), 2) if goods else None
+            rows.append({
+                "id": _uuid(rng), "user_id": uid, "party_id": rng.choice(parties)["id"],
+                "entry_type": rng.choice(ENTRY_TYPES), "item_name": "Cement bags" if goods else "",
+                "quantity": qty, "unit": "bag" if goods else "", "rate": rate,
+                "amount": round(qty * rate, 2) if goods else round(rng.uniform(100, 20000), 2),
+                "description": f"ledger {i}", "raw_voice_text": "", "date": day,
+                "created_at": created, "updated_at": created,
+            })
+        store.load("ledger_entries", rows)
+        out.append({"id": uid, "username": username,
+                    "category_ids": [c["id"] for c in cats], "party_ids": [p["id"] for p in parties]})
+    return out
@@ -0,0 +1,173 @@
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+
+# Small key/value store used for per-user caches. In-process by default;
+# set REDIS_URL (and install `redis`) to share it between uvicorn workers.
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2000"))
+VOCAB_TTL_SECONDS = int(os.getenv("VOCAB_TTL_SECONDS", "600"))
+
+
+class MemoryBackend:
+    """LRU + TTL dict. Counters (incr) are kept separately and never evicted."""
+
+    name = "memory"
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES):
+        # Counters restart at zero with the process; the epoch tells them apart
+        self.epoch = uuid.uuid4().hex[:8]
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._counters = {}
+
+    async def mget(self, keys: list) -> list:
+        now = time.monotonic()
+        out = []
+        for key in keys:
+            if key in self._counters:
+                out.append(str(self._counters[key]))
+                continue
+            item = self._data.get(key)
+            if item is None or item[0] < now:
+                self._data.pop(key, None)
+                out.append(None)
+            else:
+                self._data.move_to_end(key)
+                out.append(item[1])
+        return out
+
+    async def setex(self, key: str, ttl: int, value: str):
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    async def incr(self, key: str) -> int:
+        self._counters[key] = self._counters.get(key, 0) + 1
+        return self._counters[key]
+
+    async def delete(self, key: str):
+        self._data.pop(key, None)
+
+
+class RedisBackend:
+    name = "redis"
+    epoch = "redis"
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+        self._redis = redis.from_url(url, decode_responses=True)
+
+    async def mget(self, keys: list) -> list:
+        return await self._redis.mget(keys)
+
+    async def setex(self, key: str, ttl: int, value: str):
+        await self._redis.setex(key, ttl, value)
+
+    async def incr(self, key: str) -> int:
+        return await self._redis.incr(key)
+
+    async def delete(self, key: str):
+        await self._redis.delete(key)
+
+
+def _make_backend():
+    url = os.getenv("REDIS_URL")
+    if url:
+        try:
+            return RedisBackend(url)
+        except ImportError:
+            pass
+    return MemoryBackend()
+
+
+backend = _make_backend()
+
+
+class _CountingCache:
+    def __init__(self, prefix: str, ttl: int):
+        self.prefix = prefix
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 3) if total else None,
+        }
+
+
+class VersionedCache(_CountingCache):
+    """Per-user cached values guarded by a generation counter.
+
+    ``invalidate`` bumps the generation, so a value computed from a read
+    that raced with a write is never served, and other workers sharing the
+    backend see the change on their next ``get``.
+    """
+
+    def _keys(self, user_id: str, kind: str):
+        base = f"{self.prefix}:{user_id}:{kind}"
+        return base, base + ":gen"
+
+    async def get(self, user_id: str, kind: str):
+        """Return (value, generation); value is None on a miss."""
+        key, gen_key = self._keys(user_id, kind)
+        raw, gen = await backend.mget([key, gen_key])
+        gen = int(gen or 0)
+        if raw is not None:
+            entry = json.loads(raw)
+            if entry["gen"] == gen:
+                self.hits += 1
+                return entry["value"], gen
+        self.misses += 1
+        return None, gen
+
+    async def set(self, user_id: str, kind: str, value, gen: int):
+        key, _ = self._keys(user_id, kind)
+        await backend.setex(key, self.ttl, json.dumps({"gen": gen, "value": value}))
+
+    async def invalidate(self, user_id: str, kind: str):
+        key, gen_key = self._keys(user_id, kind)
+        await backend.incr(gen_key)
+        await backend.delete(key)
+
+
+class KeyedCache(_CountingCache):
+    """Plain TTL cache of JSON values under a prefix."""
+
+    async def get(self, key: str):
+        (raw,) = await backend.mget([f"{self.prefix}:{key}"])
+        if raw is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return json.loads(raw)
+
+    async def set(self, key: str, value):
+        await backend.setex(f"{self.prefix}:{key}", self.ttl, json.dumps(value))
+
+
+# Active categories / parties per user, as returned by the list endpoints
+vocab_cache = VersionedCache("vocab", VOCAB_TTL_SECONDS)
+
+
+class DataVersions:
+    """Per-user counter bumped after every write; read endpoints derive ETags from it."""
+
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+
+    async def get(self, user_id: str) -> str:
+        (value,) = await backend.mget([f"{self.prefix}:{user_id}"])
+        return f"{backend.epoch}.{value or 0}"
+
+    async def bump(self, user_id: str):
+        await backend.incr(f"{self.prefix}:{user_id}")
+
+
+data_versions = DataVersions("dataver")
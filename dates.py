@@ -0,0 +1,17 @@
+from datetime import date, datetime, timedelta
+
+# All business dates are IST; the financial year starts on April 1.
+IST_OFFSET = timedelta(hours=5, minutes=30)
+
+
+def today_ist() -> date:
+    return (datetime.utcnow() + IST_OFFSET).date()
+
+
+def month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def fy_start(d: date) -> date:
+    """April 1 of the financial year containing ``d``."""
+    return date(d.year if d.month >= 4 else d.year - 1, 4, 1)
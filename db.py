@@ -0,0 +1,82 @@
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics
+from lazy import LazyClient
+
+# ─── Supabase client ───
+SUPABASE_URL = os.getenv("SUPABASE_URL")
+SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
+
+
+def _create_client():
+    from supabase import create_client
+    return create_client(SUPABASE_URL, SUPABASE_KEY)
+
+
+# Built on first use (the SDK import alone is ~0.2 s of cold start)
+supabase = LazyClient(_create_client)
+
+# The supabase client is synchronous; queries run on a bounded pool of
+# worker threads so a slow PostgREST round trip never stalls the event loop.
+# The underlying httpx session keeps connections alive across calls.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "8"))
+_executor = ThreadPoolExecutor(max_workers=DB_POOL_SIZE, thread_name_prefix="supabase")
+
+
+async def execute(query):
+    """Run a PostgREST query builder on the DB pool and return its response."""
+    loop = asyncio.get_running_loop()
+    with metrics.timed(metrics.db_duration, "db", **metrics.query_labels(query)):
+        return await loop.run_in_executor(_executor, query.execute)
+
+
+def execute_sync(query):
+    """query.execute() for code already running off the event loop, timed like execute()."""
+    with metrics.timed(metrics.db_duration, **metrics.query_labels(query)):
+        return query.execute()
+
+
+async def run_sync(fn, *args):
+    """Run a blocking callable that makes its own execute_sync() queries on
+    the DB pool, so they count against DB_POOL_SIZE like execute() does."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_executor, fn, *args)
+
+
+# ─── Keyset paging ───
+REPORT_PAGE_SIZE = int(os.getenv("DB_PAGE_SIZE", "1000"))
+
+
+def keyset_filter(query, columns: tuple, values: list, desc: bool = False):
+    """Restrict ``query`` to rows strictly after ``values`` in ``columns`` order."""
+    op = "lt" if desc else "gt"
+    quoted = [f'"{v}"' for v in values]
+    clauses = []
+    for i, col in enumerate(columns):
+        terms = [f"{c}.eq.{v}" for c, v in zip(columns[:i], quoted[:i])]
+        terms.append(f"{col}.{op}.{quoted[i]}")
+        clauses.append(terms[0] if len(terms) == 1 else f"and({','.join(terms)})")
+    return query.or_(",".join(clauses))
+
+
+def iter_rows(make_query, columns: tuple = ("date", "created_at", "id"), page_size: int = REPORT_PAGE_SIZE):
+    """Yield rows page by page in ascending ``columns`` order.
+
+    ``make_query`` returns a fresh filtered builder for each page (builders
+    accumulate filters, so one cannot be reused). Blocking: call from a
+    worker thread, never from the event loop.
+    """
+    last = None
+    while True:
+        q = make_query()
+        if last is not None:
+            q = keyset_filter(q, columns, [last[c] for c in columns])
+        for col in columns:
+            q = q.order(col)
+        rows = execute_sync(q.limit(page_size)).data
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last = rows[-1]
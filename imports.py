@@ -0,0 +1,398 @@
+import asyncio
+import csv
+import hashlib
+import os
+import re
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from functools import lru_cache
+
+from db import supabase, execute_sync, iter_rows
+from cache import vocab_cache, data_versions
+
+# Spreadsheet imports of historical expenses / ledger entries. The upload is
+# spooled to a temp file, then a worker thread streams it row by row
+# (csv module, or openpyxl in read-only mode) and inserts in batches, so
+# memory does not grow with the file. Job records live in memory per process.
+IMPORT_MAX_MB = int(os.getenv("IMPORT_MAX_MB", "50"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "500"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+IMPORT_MAX_JOBS_PER_USER = 2
+IMPORT_JOB_TTL_MINUTES = 60
+MAX_ERROR_SAMPLES = 20
+
+_executor = ThreadPoolExecutor(max_workers=IMPORT_WORKERS, thread_name_prefix="import")
+_jobs: dict = {}
+
+FIELDS = {
+    "expenses": ["date", "amount", "category_name", "description"],
+    "ledger": ["date", "amount", "party_name", "entry_type", "item_name",
+               "quantity", "unit", "rate", "description"],
+}
+REQUIRED = {
+    "expenses": {"date", "amount", "category_name"},
+    "ledger": {"date", "amount", "party_name", "entry_type"},
+}
+# Header spellings recognised without an explicit mapping
+ALIASES = {
+    "date": ["date", "txn date", "entry date", "dated", "tarikh"],
+    "amount": ["amount", "amt", "total", "value", "amount rs", "rs", "rupees"],
+    "category_name": ["category", "category name", "head", "expense head", "expense type"],
+    "party_name": ["party", "party name", "customer", "client", "supplier", "name"],
+    "entry_type": ["type", "entry type", "transaction type", "txn type"],
+    "item_name": ["item", "item name", "goods", "product"],
+    "quantity": ["quantity", "qty"],
+    "unit": ["unit", "uom"],
+    "rate": ["rate", "price"],
+    "description": ["description", "notes", "remarks", "narration", "details"],
+}
+DATE_FORMATS = ["%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d/%m/%y", "%d-%b-%Y", "%d %b %Y"]
+
+
+@lru_cache(maxsize=1)
+def _entry_types() -> dict:
+    """Label -> entry type: "Goods Sold", "goods sold" and "goods_sold" all map to goods_sold."""
+    from reports import TYPE_LABELS  # deferred: reports pulls in openpyxl
+    return {label.lower(): key for key, label in TYPE_LABELS.items()}
+
+
+class ImportCancelled(Exception):
+    pass
+
+
+# ─── Upload ───
+def save_upload(fileobj, filename: str) -> tuple:
+    """Copy an upload to a temp file. Returns (path, sha256 hex). Blocking."""
+    suffix = os.path.splitext(filename or "")[1].lower()
+    if suffix not in (".csv", ".xlsx"):
+        raise ValueError("Upload a .csv or .xlsx file")
+    digest = hashlib.sha256()
+    size = 0
+    fd, path = tempfile.mkstemp(suffix=suffix, prefix="import-")
+    with os.fdopen(fd, "wb") as out:
+        while chunk := fileobj.read(1024 * 1024):
+            size += len(chunk)
+            if size > IMPORT_MAX_MB * 1024 * 1024:
+                out.close()
+                os.unlink(path)
+                raise ValueError(f"File larger than {IMPORT_MAX_MB} MB")
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
+
+
+# ─── Reading ───
+def _count_lines(path: str) -> int:
+    count = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(1024 * 1024):
+            count += chunk.count(b"\n")
+    return count
+
+
+def _read_rows(path: str, job: dict):
+    """Yield the header, then each row as a tuple of cell values."""
+    if path.endswith(".csv"):
+        job["rows_total"] = max(_count_lines(path) - 1, 0)
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            yield from csv.reader(f)
+        return
+
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        if ws.max_row:
+            job["rows_total"] = ws.max_row - 1
+        yield from ws.iter_rows(values_only=True)
+    finally:
+        wb.close()
+
+
+def _norm_header(value) -> str:
+    return re.sub(r"[^a-z0-9]+", " ", str(value or "").lower()).strip()
+
+
+def map_columns(header: list, kind: str, mapping: dict = None) -> dict:
+    """Field → column index, from an explicit {field: header} mapping or ALIASES."""
+    positions = {_norm_header(h): i for i, h in enumerate(header) if h is not None}
+    columns = {}
+    for field in FIELDS[kind]:
+        if mapping and field in mapping:
+            i = positions.get(_norm_header(mapping[field]))
+            if i is None:
+                raise ValueError(f"Column '{mapping[field]}' not found for {field}")
+            columns[field] = i
+            continue
+        for alias in ALIASES[field]:
+            if alias in positions:
+                columns[field] = positions[alias]
+                break
+    missing = REQUIRED[kind] - columns.keys()
+    if missing:
+        raise ValueError(f"No column for: {', '.join(sorted(missing))}")
+    return columns
+
+
+# ─── Converting ───
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def _number(value, field: str):
+    if value is None or value == "":
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(re.sub(r"[,₹\s]|rs\.?", "", str(value).lower()))
+    except ValueError:
+        raise ValueError(f"Invalid {field}: {value}")
+
+
+def _date(value) -> str:
+    if isinstance(value, datetime):
+        return value.date().isoformat()
+    if isinstance(value, date):
+        return value.isoformat()
+    text = _text(value)
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, fmt).date().isoformat()
+        except ValueError:
+            pass
+    raise ValueError(f"Invalid date: {text or 'empty'}")
+
+
+def convert_row(values: tuple, columns: dict, kind: str) -> dict:
+    """Cells → a row for the entry table, with the party/category still as a name."""
+    cell = {f: values[i] if i < len(values) else None for f, i in columns.items()}
+    amount = _number(cell["amount"], "amount")
+    if amount is None:
+        raise ValueError("Missing amount")
+    row = {
+        "date": _date(cell["date"]),
+        "amount": amount,
+        "description": _text(cell.get("description")),
+    }
+    name_field = "category_name" if kind == "expenses" else "party_name"
+    name = re.sub(r"\s+", " ", _text(cell[name_field]))
+    if not name:
+        raise ValueError(f"Missing {name_field}")
+    row["_name"] = name
+
+    if kind == "ledger":
+        entry_type = _entry_types().get(_text(cell["entry_type"]).lower().replace("_", " "))
+        if entry_type is None:
+            raise ValueError(f"Invalid entry_type: {_text(cell['entry_type']) or 'empty'}")
+        row.update(
+            entry_type=entry_type,
+            item_name=_text(cell.get("item_name")),
+            quantity=_number(cell.get("quantity"), "quantity"),
+            unit=_text(cell.get("unit")),
+            rate=_number(cell.get("rate"), "rate"),
+        )
+    return row
+
+
+# ─── Writing ───
+def _name_table(kind: str) -> str:
+    return "expense_categories" if kind == "expenses" else "parties"
+
+
+def _load_names(uid: str, table: str) -> tuple:
+    """(name_lower → id, set of inactive name_lower) for every party/category
+    the user has. Deleted ones are included because name_lower is unique
+    across active and inactive rows; rows that use them reactivate them."""
+    def make_query():
+        return supabase.table(table).select("id, name_lower, is_active").eq("user_id", uid)
+    names, inactive = {}, set()
+    for r in iter_rows(make_query, columns=("id",)):
+        names[r["name_lower"]] = r["id"]
+        if not r["is_active"]:
+            inactive.add(r["name_lower"])
+    return names, inactive
+
+
+def _flush(job: dict, spec: dict, batch: list, names: tuple, loop):
+    uid = spec["user_id"]
+    table = _name_table(spec["kind"])
+    names, inactive = names
+    missing = {}
+    for row in batch:
+        missing.setdefault(row["_name"].lower(), row["_name"])
+    revived = [k for k in missing if k in inactive]
+    if revived:
+        execute_sync(supabase.table(table).update({"is_active": True})
+                     .eq("user_id", uid).in_("id", [names[k] for k in revived]))
+        inactive.difference_update(revived)
+        job["names_reactivated"] += len(revived)
+        asyncio.run_coroutine_threadsafe(vocab_cache.invalidate(uid, table), loop).result()
+    missing = {k: v for k, v in missing.items() if k not in names}
+    if missing:
+        created = execute_sync(supabase.table(table).upsert(
+            [{"user_id": uid, "name": name, "name_lower": lower} for lower, name in missing.items()],
+            on_conflict="user_id,name_lower",
+        ))
+        names.update({r["name_lower"]: r["id"] for r in created.data})
+        job["names_created"] += len(missing)
+        asyncio.run_coroutine_threadsafe(vocab_cache.invalidate(uid, table), loop).result()
+
+    ref_field = "category_id" if spec["kind"] == "expenses" else "party_id"
+    rows = []
+    for row in batch:
+        row = dict(row)
+        row[ref_field] = names[row.pop("_name").lower()]
+        row["user_id"] = uid
+        rows.append(row)
+
+    # client_ref is derived from the file hash and row number, so importing
+    # the same file again skips rows that are already in
+    result = execute_sync(supabase.table(spec["table"]).upsert(
+        rows, on_conflict="user_id,client_ref", ignore_duplicates=True,
+        returning="minimal", count="exact",
+    ))
+    inserted = result.count if result.count is not None else len(rows)
+    job["inserted"] += inserted
+    job["duplicates"] += len(rows) - inserted
+    asyncio.run_coroutine_threadsafe(data_versions.bump(uid), loop).result()
+
+
+def _record_error(job: dict, rownum: int, message: str):
+    job["failed"] += 1
+    if len(job["errors"]) < MAX_ERROR_SAMPLES:
+        job["errors"].append({"row": rownum, "error": message})
+
+
+def run_import(job: dict, spec: dict, loop):
+    """Stream the file into the database. Blocking; runs on the import pool."""
+    rows = _read_rows(spec["path"], job)
+    try:
+        header = next(rows, None)
+        if header is None:
+            raise ValueError("File is empty")
+        columns = map_columns(list(header), spec["kind"], spec["mapping"])
+        names = _load_names(spec["user_id"], _name_table(spec["kind"]))
+        ref_prefix = f"imp:{spec['sha256'][:16]}:"
+
+        batch = []
+        for rownum, values in enumerate(rows, 2):
+            if job["cancel"]:
+                raise ImportCancelled()
+            job["rows_done"] += 1
+            if all(v is None or _text(v) == "" for v in values):
+                continue
+            try:
+                row = convert_row(values, columns, spec["kind"])
+            except ValueError as e:
+                _record_error(job, rownum, str(e))
+                continue
+            row["client_ref"] = f"{ref_prefix}{rownum}"
+            batch.append(row)
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                _flush(job, spec, batch, names, loop)
+                batch = []
+        if batch:
+            _flush(job, spec, batch, names, loop)
+    finally:
+        rows.close()
+
+
+# ─── Jobs ───
+def _public(job: dict) -> dict:
+    out = {k: job[k] for k in ("rows_done", "rows_total", "inserted", "duplicates",
+                               "failed", "names_created", "names_reactivated", "errors", "status", "error")}
+    out["job_id"] = job["id"]
+    if job["rows_total"]:
+        out["percent"] = min(100, round(100 * job["rows_done"] / job["rows_total"]))
+    if job["status"] == "done":
+        out["percent"] = 100
+    return out
+
+
+async def _watch(job: dict, spec: dict, future):
+    try:
+        await future
+        job["status"] = "done"
+    except ImportCancelled:
+        job["status"] = "cancelled"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = time.time()
+        os.unlink(spec["path"])
+
+
+def cleanup():
+    cutoff = time.time() - IMPORT_JOB_TTL_MINUTES * 60
+    for job_id, job in list(_jobs.items()):
+        if job.get("finished_at") and job["finished_at"] < cutoff:
+            del _jobs[job_id]
+
+
+def active_jobs(user_id: str) -> int:
+    cleanup()
+    return sum(1 for j in _jobs.values()
+               if j["user_id"] == user_id and j["status"] in ("queued", "running"))
+
+
+async def submit(user_id: str, kind: str, path: str, sha256: str, mapping: dict = None) -> dict:
+    spec = {
+        "user_id": user_id,
+        "kind": kind,
+        "table": "expenses" if kind == "expenses" else "ledger_entries",
+        "path": path,
+        "sha256": sha256,
+        "mapping": mapping,
+    }
+    job = {
+        "id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "status": "queued",
+        "rows_done": 0,
+        "rows_total": None,
+        "inserted": 0,
+        "duplicates": 0,
+        "failed": 0,
+        "names_created": 0,
+        "names_reactivated": 0,
+        "errors": [],
+        "error": None,
+        "cancel": False,
+        "finished_at": None,
+    }
+    _jobs[job["id"]] = job
+    loop = asyncio.get_running_loop()
+
+    def run():
+        job["status"] = "running"
+        run_import(job, spec, loop)
+
+    future = loop.run_in_executor(_executor, run)
+    asyncio.create_task(_watch(job, spec, future))
+    return _public(job)
+
+
+def get(job_id: str, user_id: str) -> dict:
+    cleanup()
+    job = _jobs.get(job_id)
+    if job is None or job["user_id"] != user_id:
+        return None
+    return _public(job)
+
+
+def cancel(job_id: str, user_id: str) -> dict:
+    job = _jobs.get(job_id)
+    if job is None or job["user_id"] != user_id:
+        return None
+    if job["status"] in ("queued", "running"):
+        job["cancel"] = True
+    return _public(job)
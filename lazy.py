@@ -0,0 +1,29 @@
+import threading
+
+
+class LazyClient:
+    """Stands in for an SDK client until first use.
+
+    ``factory`` (which should do its own heavy imports) runs on the first
+    attribute access, once, even with several threads racing for it; after
+    that attribute access goes straight to the real client.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self) -> bool:
+        return self._client is not None
+
+    def get(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
@@ -1,30 +1,112 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
 import os
+import re
+import time
 import uuid
-from datetime import date, datetime, timedelta
+from contextlib import asynccontextmanager
+from datetime import date
 from pathlib import Path
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Query
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, Response
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Depends, Query, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import BaseModel, ValidationError
 from typing import Optional
-from supabase import create_client, Client
-
-from auth import verify_password, hash_password, create_access_token, get_current_user
-from ai_parser import transcribe_audio, parse_voice_command
-from reports import generate_expense_report, generate_party_report
-
-# ─── Supabase client ───
-SUPABASE_URL = os.getenv("SUPABASE_URL")
-SUPABASE_KEY = os.getenv("SUPABASE_SERVICE_KEY")
-supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
-
-app = FastAPI(title="Business Tracker API")
 
+from auth import check_password, create_access_token, get_current_user, token_cache
+from ai_parser import transcribe_audio, parse_voice_command, parse_cache, stats as parser_stats
+from db import supabase, execute, keyset_filter
+from dates import today_ist, month_start, fy_start
+import ai_parser
+import db
+import report_cache
+import report_jobs
+import imports
+import static_assets
+import metrics
+import voice_rules
+from cache import vocab_cache, data_versions, backend as cache_backend
+
+# orjson is optional; it serializes large lists several times faster
+try:
+    import orjson  # noqa: F401
+    from fastapi.responses import ORJSONResponse as FastJSONResponse
+except ImportError:
+    FastJSONResponse = JSONResponse
+
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1000"))
+
+
+# ─── Lifespan ───
+# Importing this module does no SDK or network work: the Supabase and OpenAI
+# clients are built on first use. Once the server is listening they are
+# warmed in the background along with the static file manifest, so /healthz
+# answers straight away and the first real request usually finds them ready.
+STARTED_AT = time.monotonic()
+
+
+async def _warm_up():
+    loop = asyncio.get_running_loop()
+    for warm in (db.supabase.get, ai_parser.client.get, static_assets.manifest):
+        try:
+            await loop.run_in_executor(None, warm)
+        except Exception:
+            pass  # retried (and reported) by the first request that needs it
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    warm = asyncio.create_task(_warm_up())
+    yield
+    warm.cancel()
+    report_jobs.shutdown()
+
+
+class UploadLimitMiddleware:
+    """Reject oversized uploads with 413 before FastAPI parses (and spools to
+    disk) the multipart body; limits come from _upload_limit."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = _upload_limit(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await FastJSONResponse({"detail": "Upload too large"}, status_code=413)(scope, receive, send)
+            return
+
+        # Chunked uploads carry no Content-Length: count as the body arrives
+        received = 0
+
+        async def receive_limited():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail="Upload too large")
+            return message
+
+        await self.app(scope, receive_limited, send)
+
+
+app = FastAPI(title="Business Tracker API", default_response_class=FastJSONResponse, lifespan=lifespan)
+
+# Innermost, so its 413s still get CORS headers and metrics
+app.add_middleware(UploadLimitMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -32,10 +114,13 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Small bodies aren't worth the CPU; level 6 is most of level 9's ratio at
+# a fraction of the cost. Precompressed static files and reports carry
+# their own Content-Encoding and pass through untouched.
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=6)
+# Added last so it is outermost: route latency includes compression
+app.add_middleware(metrics.MetricsMiddleware)
 
-# Ensure reports directory exists
-REPORTS_DIR = Path("generated_reports")
-REPORTS_DIR.mkdir(exist_ok=True)
 
 
 # ─── Pydantic Models ───
@@ -76,6 +161,12 @@ class ExpenseUpdate(BaseModel):
     description: Optional[str] = None
     date: Optional[str] = None
 
+class ReportJobCreate(BaseModel):
+    kind: str  # "expenses" | "party"
+    date_from: str
+    date_to: str
+    party_id: Optional[str] = None
+
 class LedgerUpdate(BaseModel):
     party_id: Optional[str] = None
     entry_type: Optional[str] = None
@@ -87,37 +178,197 @@ class LedgerUpdate(BaseModel):
     description: Optional[str] = None
     date: Optional[str] = None
 
+class ExpenseBulkCreate(ExpenseCreate):
+    client_ref: str  # idempotency key, unique per user
+
+class LedgerBulkCreate(LedgerCreate):
+    client_ref: str
+
+class ExpenseBulkUpdate(ExpenseUpdate):
+    id: str
+
+class LedgerBulkUpdate(LedgerUpdate):
+    id: str
+
+class BulkRequest(BaseModel):
+    # Items are validated one by one so a bad item only fails itself
+    create: list = []
+    update: list = []
+    delete: list[str] = []
+
+
+# ─── ETags ───
+# Every write bumps the user's data version. Read endpoints tag responses
+# with it and answer a matching If-None-Match with 304 before querying.
+# In-memory versions are per process: with several workers, one that missed
+# a write would keep answering 304 with stale data, so tags need Redis then.
+# uvicorn takes its worker count from WEB_CONCURRENCY.
+ETAGS_ENABLED = cache_backend.name == "redis" or int(os.getenv("WEB_CONCURRENCY", "1")) <= 1
+
+
+async def _etag(uid: str) -> str:
+    version = await data_versions.get(uid)
+    # The IST date is part of the tag: "today" figures roll over at midnight
+    raw = f"{uid}:{version}:{today_ist()}"
+    return '"' + hashlib.sha1(raw.encode()).hexdigest()[:20] + '"'
+
+
+async def versioned_user(request: Request, response: Response, user=Depends(get_current_user)):
+    """get_current_user for read endpoints, plus the conditional GET check."""
+    if not ETAGS_ENABLED:
+        return user
+    etag = await _etag(user["user_id"])
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    sent = {t.strip().removeprefix("W/") for t in request.headers.get("if-none-match", "").split(",")}
+    if etag in sent:
+        raise HTTPException(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return user
+
+
+async def writing_user(user=Depends(get_current_user)):
+    """get_current_user for write endpoints; bumps the data version once the write is done."""
+    try:
+        yield user
+    finally:
+        await data_versions.bump(user["user_id"])
+
+
+def _json(content, response: Response) -> Response:
+    """Serialize straight to bytes, skipping FastAPI's jsonable_encoder pass
+    (slow on large lists). Headers set by dependencies are carried over."""
+    out = FastJSONResponse(content)
+    for key, value in response.headers.items():
+        if key not in ("content-length", "content-type"):
+            out.headers[key] = value
+    return out
+
+
+# ─── Pagination ───
+# List endpoints page with a keyset on (date, created_at, id), newest first.
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+KEYSET_COLUMNS = ("date", "created_at", "id")
+
+EXPENSE_FIELDS = {
+    "id", "user_id", "category_id", "amount", "description", "raw_voice_text", "date", "created_at",
+}
+LEDGER_FIELDS = {
+    "id", "user_id", "party_id", "entry_type", "item_name", "quantity", "unit", "rate",
+    "amount", "description", "raw_voice_text", "date", "created_at",
+}
+
+
+def _select_columns(fields: Optional[str], allowed: set, join: str) -> str:
+    """Build a select list from a comma-separated ``fields`` param.
+
+    Keyset columns are always included so the next cursor can be built.
+    """
+    if not fields:
+        return f"*, {join}"
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    columns = list(KEYSET_COLUMNS) + [f for f in requested if f not in KEYSET_COLUMNS]
+    return ", ".join(columns + [join])
+
+
+def _encode_cursor(row: dict) -> str:
+    raw = json.dumps([row[c] for c in KEYSET_COLUMNS], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> list:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if (not isinstance(values, list) or len(values) != len(KEYSET_COLUMNS)
+            or not all(isinstance(v, str) and '"' not in v for v in values)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def _paginate(q, cursor: Optional[str], limit: int):
+    """Apply keyset filter, ordering and limit (+1 row to detect another page)."""
+    if cursor:
+        q = keyset_filter(q, KEYSET_COLUMNS, _decode_cursor(cursor), desc=True)
+    for col in KEYSET_COLUMNS:
+        q = q.order(col, desc=True)
+    return q.limit(limit + 1)
+
+
+def _page(rows: list, limit: int) -> dict:
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    return {
+        "items": items,
+        "has_more": has_more,
+        "next_cursor": _encode_cursor(items[-1]) if has_more else None,
+    }
+
+
+# ─── Health ───
+@app.get("/healthz", include_in_schema=False)
+async def healthz():
+    """Liveness check; answers before the external clients are warm."""
+    return {
+        "status": "ok",
+        "uptime_seconds": round(time.monotonic() - STARTED_AT, 1),
+        "clients": {"supabase": db.supabase.ready, "openai": ai_parser.client.ready},
+    }
+
 
 # ─── Auth ───
 @app.post("/api/login")
 async def login(req: LoginRequest):
-    result = supabase.table("users").select("*").eq("username", req.username).execute()
+    result = await execute(supabase.table("users").select("*").eq("username", req.username))
     if not result.data:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     user = result.data[0]
-    if not verify_password(req.password, user["password_hash"]):
+    if not await check_password(req.password, user["password_hash"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     token = create_access_token({"user_id": user["id"], "username": user["username"]})
     return {"token": token, "user_id": user["id"], "display_name": user.get("display_name", user["username"])}
 
 
 # ─── Voice Processing ───
+MAX_AUDIO_BYTES = int(os.getenv("MAX_AUDIO_BYTES", str(10 * 1024 * 1024)))
+AUDIO_CHUNK_BYTES = 64 * 1024
+# Multipart boundary and part headers on top of each clip
+MULTIPART_PART_OVERHEAD = 16 * 1024
+
+
+async def _read_audio(audio: UploadFile) -> bytes:
+    """Read an upload in chunks, rejecting it as soon as it exceeds MAX_AUDIO_BYTES."""
+    if audio.size is not None and audio.size > MAX_AUDIO_BYTES:
+        raise HTTPException(status_code=413, detail="Audio too large")
+    buf = bytearray()
+    while chunk := await audio.read(AUDIO_CHUNK_BYTES):
+        buf += chunk
+        if len(buf) > MAX_AUDIO_BYTES:
+            raise HTTPException(status_code=413, detail="Audio too large")
+    if len(buf) < 100:
+        raise HTTPException(status_code=400, detail="Audio too short")
+    return bytes(buf)
+
+
 @app.post("/api/voice/process")
 async def process_voice(audio: UploadFile = File(...), user=Depends(get_current_user)):
-    audio_bytes = await audio.read()
-    if len(audio_bytes) < 100:
-        raise HTTPException(status_code=400, detail="Audio too short")
+    audio_bytes = await _read_audio(audio)
 
-    # Get user's categories and parties for context
+    # Vocabulary lookups don't depend on the audio; run them alongside Whisper
     uid = user["user_id"]
-    cats = supabase.table("expense_categories").select("name").eq("user_id", uid).eq("is_active", True).execute()
-    parties = supabase.table("parties").select("name").eq("user_id", uid).eq("is_active", True).execute()
-
-    category_names = [c["name"] for c in cats.data]
-    party_names = [p["name"] for p in parties.data]
+    cats, parties, text = await asyncio.gather(
+        _vocab(uid, "expense_categories"),
+        _vocab(uid, "parties"),
+        transcribe_audio(audio_bytes, audio.filename or "audio.webm", audio.content_type),
+    )
 
-    # Transcribe
-    text = await transcribe_audio(audio_bytes, audio.filename or "audio.webm")
+    category_names = [c["name"] for c in cats]
+    party_names = [p["name"] for p in parties]
 
     # Parse
     parsed = await parse_voice_command(text, category_names, party_names)
@@ -126,41 +377,193 @@ async def process_voice(audio: UploadFile = File(...), user=Depends(get_current_
     return parsed
 
 
+# Batch upload for notes recorded offline: vocabulary is fetched once and
+# clips are transcribed/parsed concurrently with a bounded fan-out.
+VOICE_BATCH_MAX_FILES = int(os.getenv("VOICE_BATCH_MAX_FILES", "100"))
+VOICE_BATCH_CONCURRENCY = int(os.getenv("VOICE_BATCH_CONCURRENCY", "8"))
+# Clips are held in memory until processed, so the batch as a whole is capped
+VOICE_BATCH_MAX_BYTES = int(os.getenv("VOICE_BATCH_MAX_BYTES", str(50 * 1024 * 1024)))
+
+
+def _upload_limit(path: str) -> Optional[int]:
+    """Largest request body UploadLimitMiddleware lets through to ``path``."""
+    if path == "/api/voice/process":
+        return MAX_AUDIO_BYTES + MULTIPART_PART_OVERHEAD
+    if path == "/api/voice/batch":
+        return VOICE_BATCH_MAX_BYTES + VOICE_BATCH_MAX_FILES * MULTIPART_PART_OVERHEAD
+    if path == "/api/imports":
+        # The file part plus the kind / mapping fields
+        return imports.IMPORT_MAX_MB * 1024 * 1024 + 3 * MULTIPART_PART_OVERHEAD
+    return None
+
+
+@app.post("/api/voice/batch")
+async def process_voice_batch(
+    audios: list[UploadFile] = File(...), stream: bool = Query(False),
+    user=Depends(get_current_user)
+):
+    if len(audios) > VOICE_BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {VOICE_BATCH_MAX_FILES} clips per batch")
+
+    uid = user["user_id"]
+    cats, parties = await asyncio.gather(_vocab(uid, "expense_categories"), _vocab(uid, "parties"))
+    category_names = [c["name"] for c in cats]
+    party_names = [p["name"] for p in parties]
+    sem = asyncio.Semaphore(VOICE_BATCH_CONCURRENCY)
+
+    # Read every clip up front: the uploads are closed once this handler
+    # returns, before a streamed response has been consumed.
+    clips, total = [], 0
+    for audio in audios:
+        try:
+            audio_bytes = await _read_audio(audio)
+        except HTTPException as e:
+            clips.append((audio.filename, audio.content_type, None, e.detail))
+            continue
+        total += len(audio_bytes)
+        if total > VOICE_BATCH_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Batch too large")
+        clips.append((audio.filename, audio.content_type, audio_bytes, None))
+
+    async def process(index: int, filename: Optional[str], content_type: Optional[str],
+                      audio_bytes: Optional[bytes], error: Optional[str]) -> dict:
+        item = {"index": index, "filename": filename}
+        if error is not None:
+            item.update(ok=False, error=error)
+            return item
+        async with sem:
+            try:
+                text = await transcribe_audio(audio_bytes, filename or "audio.webm", content_type)
+                parsed = await parse_voice_command(text, category_names, party_names)
+                parsed["transcribed_text"] = text
+                item.update(ok=True, result=parsed)
+            except HTTPException as e:
+                item.update(ok=False, error=e.detail)
+            except Exception as e:
+                item.update(ok=False, error=str(e))
+        return item
+
+    tasks = [asyncio.create_task(process(i, *clip)) for i, clip in enumerate(clips)]
+
+    if stream:
+        # One JSON object per line, in completion order
+        async def results():
+            try:
+                for done in asyncio.as_completed(tasks):
+                    yield json.dumps(await done) + "\n"
+            finally:
+                # Client went away: don't pay for clips nobody will read
+                for task in tasks:
+                    task.cancel()
+        # GZipMiddleware would hold every line back until the last clip is done
+        return StreamingResponse(results(), media_type="application/x-ndjson",
+                                 headers={"Content-Encoding": "identity"})
+
+    return {"results": await asyncio.gather(*tasks)}
+
+
+# ─── Vocabulary (categories + parties) ───
+# Active categories and parties change rarely; they are cached per user and
+# invalidated by the create/delete endpoints below.
+async def _vocab(uid: str, table: str) -> list:
+    rows, gen = await vocab_cache.get(uid, table)
+    if rows is None:
+        result = await execute(supabase.table(table)
+            .select("*").eq("user_id", uid).eq("is_active", True)
+            .order("name"))
+        rows = result.data
+        await vocab_cache.set(uid, table, rows, gen)
+    return rows
+
+
+@app.get("/api/cache/stats")
+async def cache_stats(user=Depends(get_current_user)):
+    return {
+        "backend": cache_backend.name,
+        "vocab": vocab_cache.stats(),
+        "parse": parse_cache.stats(),
+        "parser": parser_stats,
+        "tokens": token_cache.stats(),
+    }
+
+
+# ─── Metrics ───
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+
+def _cache_counts(field: str):
+    def read():
+        counts = {(name,): c.stats()[field] for name, c in
+                  (("vocab", vocab_cache), ("parse", parse_cache), ("token", token_cache))}
+        counts[("report",)] = report_cache.stats[field]
+        return counts
+    return read
+
+
+metrics.CounterFunc("cache_hits_total", "Cache hits.", ("cache",), _cache_counts("hits"))
+metrics.CounterFunc("cache_misses_total", "Cache misses.", ("cache",), _cache_counts("misses"))
+metrics.CounterFunc("voice_parses_total", "Voice commands parsed, by parser.", ("parser",), lambda: {
+    ("local",): parser_stats["local_parses"],
+    ("gpt",): parser_stats["gpt_calls"],
+})
+
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics(request: Request):
+    """Prometheus text format. Protected by METRICS_TOKEN (Bearer) when it is set."""
+    if METRICS_TOKEN and not hmac.compare_digest(
+        request.headers.get("authorization", ""), f"Bearer {METRICS_TOKEN}"
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ─── Categories ───
 @app.get("/api/categories")
-async def get_categories(user=Depends(get_current_user)):
-    result = supabase.table("expense_categories") \
-        .select("*").eq("user_id", user["user_id"]).eq("is_active", True) \
-        .order("name").execute()
-    return result.data
+async def get_categories(user=Depends(versioned_user)):
+    return await _vocab(user["user_id"], "expense_categories")
 
 @app.post("/api/categories")
-async def create_category(cat: CategoryCreate, user=Depends(get_current_user)):
+async def create_category(cat: CategoryCreate, user=Depends(writing_user)):
     data = {
         "user_id": user["user_id"],
         "name": cat.name.strip(),
         "name_lower": cat.name.strip().lower()
     }
-    result = supabase.table("expense_categories").insert(data).execute()
+    result = await execute(supabase.table("expense_categories").insert(data))
+    await vocab_cache.invalidate(user["user_id"], "expense_categories")
     return result.data[0]
 
 @app.delete("/api/categories/{cat_id}")
-async def delete_category(cat_id: str, user=Depends(get_current_user)):
-    supabase.table("expense_categories") \
-        .update({"is_active": False}).eq("id", cat_id).eq("user_id", user["user_id"]).execute()
+async def delete_category(cat_id: str, user=Depends(writing_user)):
+    await execute(supabase.table("expense_categories")
+        .update({"is_active": False}).eq("id", cat_id).eq("user_id", user["user_id"]))
+    await vocab_cache.invalidate(user["user_id"], "expense_categories")
     return {"ok": True}
 
 
 # ─── Parties ───
 @app.get("/api/parties")
-async def get_parties(user=Depends(get_current_user)):
-    result = supabase.table("parties") \
-        .select("*").eq("user_id", user["user_id"]).eq("is_active", True) \
-        .order("name").execute()
+async def get_parties(user=Depends(versioned_user)):
+    return await _vocab(user["user_id"], "parties")
+
+@app.get("/api/parties/balances")
+async def get_party_balances(
+    date_from: str = Query(None), date_to: str = Query(None), party_id: str = Query(None),
+    user=Depends(versioned_user)
+):
+    """Payable / receivable / balance per party, largest outstanding first.
+
+    With a date range, payable and receivable cover the range, ``opening`` is
+    the balance before it and ``balance`` the balance at its end.
+    """
+    result = await execute(supabase.rpc("party_balance_list", {
+        "p_user_id": user["user_id"], "p_from": date_from, "p_to": date_to, "p_party_id": party_id,
+    }))
     return result.data
 
 @app.post("/api/parties")
-async def create_party(party: PartyCreate, user=Depends(get_current_user)):
+async def create_party(party: PartyCreate, user=Depends(writing_user)):
     data = {
         "user_id": user["user_id"],
         "name": party.name.strip(),
@@ -168,13 +571,15 @@ async def create_party(party: PartyCreate, user=Depends(get_current_user)):
         "phone": party.phone,
         "notes": party.notes
     }
-    result = supabase.table("parties").insert(data).execute()
+    result = await execute(supabase.table("parties").insert(data))
+    await vocab_cache.invalidate(user["user_id"], "parties")
     return result.data[0]
 
 @app.delete("/api/parties/{party_id}")
-async def delete_party(party_id: str, user=Depends(get_current_user)):
-    supabase.table("parties") \
-        .update({"is_active": False}).eq("id", party_id).eq("user_id", user["user_id"]).execute()
+async def delete_party(party_id: str, user=Depends(writing_user)):
+    await execute(supabase.table("parties")
+        .update({"is_active": False}).eq("id", party_id).eq("user_id", user["user_id"]))
+    await vocab_cache.invalidate(user["user_id"], "parties")
     return {"ok": True}
 
 
@@ -183,11 +588,12 @@ async def delete_party(party_id: str, user=Depends(get_current_user)):
 async def get_expenses(
     date_from: str = Query(None), date_to: str = Query(None),
     category_id: str = Query(None),
-    user=Depends(get_current_user)
+    cursor: str = Query(None), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = Query(None),
+    response: Response = None, user=Depends(versioned_user)
 ):
-    q = supabase.table("expenses").select(
-        "*, expense_categories(name)"
-    ).eq("user_id", user["user_id"])
+    columns = _select_columns(fields, EXPENSE_FIELDS, "expense_categories(name)")
+    q = supabase.table("expenses").select(columns).eq("user_id", user["user_id"])
 
     if date_from:
         q = q.gte("date", date_from)
@@ -196,17 +602,17 @@ async def get_expenses(
     if category_id:
         q = q.eq("category_id", category_id)
 
-    result = q.order("date", desc=True).execute()
+    result = await execute(_paginate(q, cursor, limit))
 
     # Flatten category name
     for r in result.data:
         cat = r.pop("expense_categories", None)
         r["category_name"] = cat["name"] if cat else ""
 
-    return result.data
+    return _json(_page(result.data, limit), response)
 
 @app.post("/api/expenses")
-async def create_expense(exp: ExpenseCreate, user=Depends(get_current_user)):
+async def create_expense(exp: ExpenseCreate, user=Depends(writing_user)):
     data = {
         "user_id": user["user_id"],
         "category_id": exp.category_id,
@@ -215,20 +621,20 @@ async def create_expense(exp: ExpenseCreate, user=Depends(get_current_user)):
         "raw_voice_text": exp.raw_voice_text,
         "date": exp.date
     }
-    result = supabase.table("expenses").insert(data).execute()
+    result = await execute(supabase.table("expenses").insert(data))
     return result.data[0]
 
 @app.put("/api/expenses/{exp_id}")
-async def update_expense(exp_id: str, exp: ExpenseUpdate, user=Depends(get_current_user)):
+async def update_expense(exp_id: str, exp: ExpenseUpdate, user=Depends(writing_user)):
     data = {k: v for k, v in exp.model_dump().items() if v is not None}
-    result = supabase.table("expenses") \
-        .update(data).eq("id", exp_id).eq("user_id", user["user_id"]).execute()
+    result = await execute(supabase.table("expenses")
+        .update(data).eq("id", exp_id).eq("user_id", user["user_id"]))
     return result.data[0] if result.data else {"ok": True}
 
 @app.delete("/api/expenses/{exp_id}")
-async def delete_expense(exp_id: str, user=Depends(get_current_user)):
-    supabase.table("expenses") \
-        .delete().eq("id", exp_id).eq("user_id", user["user_id"]).execute()
+async def delete_expense(exp_id: str, user=Depends(writing_user)):
+    await execute(supabase.table("expenses")
+        .delete().eq("id", exp_id).eq("user_id", user["user_id"]))
     return {"ok": True}
 
 
@@ -236,11 +642,12 @@ async def delete_expense(exp_id: str, user=Depends(get_current_user)):
 @app.get("/api/ledger")
 async def get_ledger(
     party_id: str = Query(None), date_from: str = Query(None), date_to: str = Query(None),
-    user=Depends(get_current_user)
+    cursor: str = Query(None), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    fields: str = Query(None),
+    response: Response = None, user=Depends(versioned_user)
 ):
-    q = supabase.table("ledger_entries").select(
-        "*, parties(name)"
-    ).eq("user_id", user["user_id"])
+    columns = _select_columns(fields, LEDGER_FIELDS, "parties(name)")
+    q = supabase.table("ledger_entries").select(columns).eq("user_id", user["user_id"])
 
     if party_id:
         q = q.eq("party_id", party_id)
@@ -249,16 +656,16 @@ async def get_ledger(
     if date_to:
         q = q.lte("date", date_to)
 
-    result = q.order("date", desc=True).execute()
+    result = await execute(_paginate(q, cursor, limit))
 
     for r in result.data:
         p = r.pop("parties", None)
         r["party_name"] = p["name"] if p else ""
 
-    return result.data
+    return _json(_page(result.data, limit), response)
 
 @app.post("/api/ledger")
-async def create_ledger(entry: LedgerCreate, user=Depends(get_current_user)):
+async def create_ledger(entry: LedgerCreate, user=Depends(writing_user)):
     data = {
         "user_id": user["user_id"],
         "party_id": entry.party_id,
@@ -272,52 +679,223 @@ async def create_ledger(entry: LedgerCreate, user=Depends(get_current_user)):
         "raw_voice_text": entry.raw_voice_text,
         "date": entry.date
     }
-    result = supabase.table("ledger_entries").insert(data).execute()
+    result = await execute(supabase.table("ledger_entries").insert(data))
     return result.data[0]
 
 @app.put("/api/ledger/{entry_id}")
-async def update_ledger(entry_id: str, entry: LedgerUpdate, user=Depends(get_current_user)):
+async def update_ledger(entry_id: str, entry: LedgerUpdate, user=Depends(writing_user)):
     data = {k: v for k, v in entry.model_dump().items() if v is not None}
-    result = supabase.table("ledger_entries") \
-        .update(data).eq("id", entry_id).eq("user_id", user["user_id"]).execute()
+    result = await execute(supabase.table("ledger_entries")
+        .update(data).eq("id", entry_id).eq("user_id", user["user_id"]))
     return result.data[0] if result.data else {"ok": True}
 
 @app.delete("/api/ledger/{entry_id}")
-async def delete_ledger(entry_id: str, user=Depends(get_current_user)):
-    supabase.table("ledger_entries") \
-        .delete().eq("id", entry_id).eq("user_id", user["user_id"]).execute()
+async def delete_ledger(entry_id: str, user=Depends(writing_user)):
+    await execute(supabase.table("ledger_entries")
+        .delete().eq("id", entry_id).eq("user_id", user["user_id"]))
     return {"ok": True}
 
 
-# ─── Reports ───
-@app.get("/api/reports/expenses")
-async def expense_report(
-    date_from: str = Query(...), date_to: str = Query(...),
+# ─── Bulk writes ───
+# Offline sync and imports send many entries at once. Each operation kind is
+# written with a single PostgREST call; creates carry a client_ref so a
+# retried request returns the rows it already made instead of duplicating them.
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "500"))
+LEDGER_ENTRY_TYPES = {"goods_sold", "payment_received", "payment_made", "goods_returned", "goods_taken"}
+CLIENT_REF_RE = re.compile(r"[A-Za-z0-9._:-]{1,64}")
+
+
+def _canonical_uuid(value: str, field: str) -> str:
+    """Lowercase hyphenated form, so ids compare equal to what the database returns."""
+    try:
+        return str(uuid.UUID(value))
+    except (TypeError, ValueError, AttributeError):
+        raise ValueError(f"Invalid {field}")
+
+
+def _validate_item(model, raw, ref_field: str) -> BaseModel:
+    item = model.model_validate(raw)
+    if getattr(item, "id", None) is not None:
+        item.id = _canonical_uuid(item.id, "id")
+    if getattr(item, ref_field, None) is not None:
+        setattr(item, ref_field, _canonical_uuid(getattr(item, ref_field), ref_field))
+    if getattr(item, "date", None) is not None:
+        date.fromisoformat(item.date)
+    if getattr(item, "entry_type", None) is not None and item.entry_type not in LEDGER_ENTRY_TYPES:
+        raise ValueError("Invalid entry_type")
+    if getattr(item, "client_ref", None) is not None and not CLIENT_REF_RE.fullmatch(item.client_ref):
+        raise ValueError("client_ref must be 1-64 letters, digits or ._:-")
+    return item
+
+
+def _bulk_validate(items: list, model, ref_field: str, key: str):
+    """Return (valid [(index, item)], results) with failures already recorded."""
+    valid, results = [], []
+    seen = set()
+    for i, raw in enumerate(items):
+        result = {"index": i}
+        results.append(result)
+        if isinstance(raw, dict) and raw.get(key) is not None:
+            result[key] = raw[key]
+        try:
+            item = _validate_item(model, raw, ref_field)
+        except ValidationError as e:
+            err = e.errors()[0]
+            result.update(status="error", error=f"{'.'.join(map(str, err['loc'])) or 'item'}: {err['msg']}")
+            continue
+        except ValueError as e:
+            result.update(status="error", error=str(e))
+            continue
+        if getattr(item, key) in seen:
+            result.update(status="error", error=f"Repeated {key} in batch")
+            continue
+        seen.add(getattr(item, key))
+        valid.append((i, item))
+    return valid, results
+
+
+async def _bulk_write(table: str, ref_table: str, ref_field: str,
+                      create_model, update_model, body: BulkRequest, uid: str) -> dict:
+    if len(body.create) + len(body.update) + len(body.delete) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+
+    creates, create_results = _bulk_validate(body.create, create_model, ref_field, "client_ref")
+    updates, update_results = _bulk_validate(body.update, update_model, ref_field, "id")
+    deletes, delete_results = _bulk_validate([{"id": d} for d in body.delete], update_model, ref_field, "id")
+
+    # Referenced categories / parties must belong to the user: one lookup
+    ref_ids = {getattr(item, ref_field) for _, item in creates + updates} - {None}
+    if ref_ids:
+        owned = await execute(supabase.table(ref_table).select("id")
+            .eq("user_id", uid).in_("id", list(ref_ids)))
+        unknown = ref_ids - {_canonical_uuid(r["id"], ref_field) for r in owned.data}
+        if unknown:
+            for batch, results in ((creates, create_results), (updates, update_results)):
+                for i, item in list(batch):
+                    if getattr(item, ref_field) in unknown:
+                        results[i].update(status="error", error=f"Unknown {ref_field}")
+                        batch.remove((i, item))
+
+    if creates:
+        rows = [{"user_id": uid, **item.model_dump()} for _, item in creates]
+        try:
+            result = await execute(supabase.table(table)
+                .upsert(rows, on_conflict="user_id,client_ref", ignore_duplicates=True))
+            created = {r["client_ref"]: r for r in result.data}
+            # Rows skipped by the upsert were written by an earlier attempt
+            existing = {}
+            missing = [item.client_ref for _, item in creates if item.client_ref not in created]
+            if missing:
+                found = await execute(supabase.table(table).select("id, client_ref")
+                    .eq("user_id", uid).in_("client_ref", missing))
+                existing = {r["client_ref"]: r["id"] for r in found.data}
+            for i, item in creates:
+                if item.client_ref in created:
+                    create_results[i].update(status="created", id=created[item.client_ref]["id"],
+                                             row=created[item.client_ref])
+                else:
+                    create_results[i].update(status="duplicate", id=existing.get(item.client_ref))
+        except Exception as e:
+            for i, _ in creates:
+                create_results[i].update(status="error", error=str(e))
+
+    if updates:
+        rows = [{k: v for k, v in item.model_dump().items() if v is not None} for _, item in updates]
+        try:
+            result = await execute(supabase.rpc(f"bulk_update_{table}", {"p_user_id": uid, "p_rows": rows}))
+            done = {_canonical_uuid(str(r), "id") for r in result.data}
+            for i, item in updates:
+                update_results[i]["status"] = "updated" if item.id in done else "not_found"
+        except Exception as e:
+            for i, _ in updates:
+                update_results[i].update(status="error", error=str(e))
+
+    if deletes:
+        try:
+            result = await execute(supabase.table(table).delete()
+                .eq("user_id", uid).in_("id", [item.id for _, item in deletes]))
+            done = {_canonical_uuid(r["id"], "id") for r in result.data}
+            for i, item in deletes:
+                delete_results[i]["status"] = "deleted" if item.id in done else "not_found"
+        except Exception as e:
+            for i, _ in deletes:
+                delete_results[i].update(status="error", error=str(e))
+
+    return {"create": create_results, "update": update_results, "delete": delete_results}
+
+
+@app.post("/api/expenses/bulk")
+async def bulk_expenses(body: BulkRequest, user=Depends(writing_user)):
+    return await _bulk_write("expenses", "expense_categories", "category_id",
+                             ExpenseBulkCreate, ExpenseBulkUpdate, body, user["user_id"])
+
+@app.post("/api/ledger/bulk")
+async def bulk_ledger(body: BulkRequest, user=Depends(writing_user)):
+    return await _bulk_write("ledger_entries", "parties", "party_id",
+                             LedgerBulkCreate, LedgerBulkUpdate, body, user["user_id"])
+
+
+# ─── Spreadsheet import ───
+@app.post("/api/imports")
+async def create_import(
+    file: UploadFile = File(...), kind: str = Form(...), mapping: str = Form(None),
     user=Depends(get_current_user)
 ):
-    expenses = supabase.table("expenses").select(
-        "*, expense_categories(name)"
-    ).eq("user_id", user["user_id"]) \
-     .gte("date", date_from).lte("date", date_to) \
-     .order("date").execute()
-
-    for r in expenses.data:
-        cat = r.pop("expense_categories", None)
-        r["category_name"] = cat["name"] if cat else ""
-
-    d_from = date.fromisoformat(date_from)
-    d_to = date.fromisoformat(date_to)
+    """Start a background import. ``mapping`` is optional JSON {field: column header}."""
+    if kind not in ("expenses", "ledger"):
+        raise HTTPException(status_code=400, detail="kind must be 'expenses' or 'ledger'")
+    try:
+        mapping = json.loads(mapping) if mapping else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="mapping must be JSON")
+    if mapping is not None and not isinstance(mapping, dict):
+        raise HTTPException(status_code=400, detail="mapping must be a JSON object")
+    if imports.active_jobs(user["user_id"]) >= imports.IMPORT_MAX_JOBS_PER_USER:
+        raise HTTPException(status_code=429, detail="An import is already running")
+
+    try:
+        path, sha256 = await run_in_threadpool(imports.save_upload, file.file, file.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await imports.submit(user["user_id"], kind, path, sha256, mapping)
+
+@app.get("/api/imports/{job_id}")
+async def get_import(job_id: str, user=Depends(get_current_user)):
+    job = imports.get(job_id, user["user_id"])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job
+
+@app.delete("/api/imports/{job_id}")
+async def cancel_import(job_id: str, user=Depends(get_current_user)):
+    job = imports.cancel(job_id, user["user_id"])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Import not found")
+    return job
 
-    user_info = supabase.table("users").select("display_name").eq("id", user["user_id"]).execute()
-    name = user_info.data[0].get("display_name", "") if user_info.data else ""
 
-    excel_bytes = generate_expense_report(expenses.data, d_from, d_to, name)
+# ─── Reports ───
+# Reports are streamed: rows are paged from Supabase by a generator and
+# appended to a write-only workbook on disk, so memory stays flat.
+async def _inline_report(spec: dict) -> dict:
+    path = Path(spec["path"])
+    if not report_cache.lookup(path):
+        # Paging + openpyxl are blocking; keep them off the event loop, on the
+        # DB pool since the build issues Supabase queries
+        with metrics.timed(metrics.report_duration, "report", kind=spec["kind"], mode="inline"):
+            rows = await db.run_sync(report_jobs.build_report, spec)
+        metrics.report_rows.observe(rows, kind=spec["kind"])
+        await run_in_threadpool(report_cache.evict)
+    return {"download_url": report_cache.download_url(path), "filename": spec["filename"]}
 
-    filename = f"expenses_{date_from}_to_{date_to}.xlsx"
-    filepath = REPORTS_DIR / filename
-    filepath.write_bytes(excel_bytes)
 
-    return {"download_url": f"/reports/{filename}", "filename": filename}
+@app.get("/api/reports/expenses")
+async def expense_report(
+    date_from: str = Query(...), date_to: str = Query(...),
+    user=Depends(get_current_user)
+):
+    spec = await report_jobs.prepare(user["user_id"], "expenses", date_from, date_to)
+    return await _inline_report(spec)
 
 
 @app.get("/api/reports/party/{party_id}")
@@ -325,80 +903,85 @@ async def party_report(
     party_id: str, date_from: str = Query(...), date_to: str = Query(...),
     user=Depends(get_current_user)
 ):
-    entries = supabase.table("ledger_entries").select("*") \
-        .eq("user_id", user["user_id"]).eq("party_id", party_id) \
-        .gte("date", date_from).lte("date", date_to) \
-        .order("date").execute()
-
-    party = supabase.table("parties").select("name").eq("id", party_id).execute()
-    party_name = party.data[0]["name"] if party.data else "Unknown"
-
-    d_from = date.fromisoformat(date_from)
-    d_to = date.fromisoformat(date_to)
-
-    excel_bytes = generate_party_report(party_name, entries.data, d_from, d_to)
-
-    safe_name = party_name.replace(" ", "_")
-    filename = f"ledger_{safe_name}_{date_from}_to_{date_to}.xlsx"
-    filepath = REPORTS_DIR / filename
-    filepath.write_bytes(excel_bytes)
-
-    return {"download_url": f"/reports/{filename}", "filename": filename}
+    spec = await report_jobs.prepare(user["user_id"], "party", date_from, date_to, party_id)
+    return await _inline_report(spec)
+
+
+# Background jobs: submit, poll, then download from /reports/...
+@app.post("/api/reports/jobs")
+async def create_report_job(req: ReportJobCreate, user=Depends(get_current_user)):
+    if req.kind not in ("expenses", "party"):
+        raise HTTPException(status_code=400, detail="kind must be 'expenses' or 'party'")
+    if req.kind == "party" and not req.party_id:
+        raise HTTPException(status_code=400, detail="party_id is required for party reports")
+    spec = await report_jobs.prepare(user["user_id"], req.kind, req.date_from, req.date_to, req.party_id)
+    job = await report_jobs.submit(spec)
+    if job is None:
+        raise HTTPException(status_code=429, detail="Too many report jobs in progress")
+    return job
+
+@app.get("/api/reports/jobs/{job_id}")
+async def get_report_job(job_id: str, user=Depends(get_current_user)):
+    job = report_jobs.get(job_id, user["user_id"])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.delete("/api/reports/jobs/{job_id}")
+async def cancel_report_job(job_id: str, user=Depends(get_current_user)):
+    job = report_jobs.cancel(job_id, user["user_id"])
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
 
 
 # ─── Serve report files ───
-@app.get("/reports/{filename}")
-async def download_report(filename: str):
-    filepath = REPORTS_DIR / filename
-    if not filepath.exists():
+@app.get("/reports/{path:path}")
+async def download_report(path: str):
+    filepath = report_cache.resolve(path)
+    if filepath is None:
         raise HTTPException(status_code=404, detail="Report not found")
     return FileResponse(
         filepath,
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        filename=filename
+        filename=filepath.name,
+        # .xlsx is already zip-compressed; keeps GZipMiddleware off it
+        headers={"Content-Encoding": "identity"},
     )
 
 
 # ─── Dashboard stats ───
 @app.get("/api/dashboard")
-async def dashboard(user=Depends(get_current_user)):
+async def dashboard(user=Depends(versioned_user)):
     uid = user["user_id"]
-    today = datetime.utcnow() + timedelta(hours=5, minutes=30)
-    today_str = today.strftime("%Y-%m-%d")
-    month_start = today.replace(day=1).strftime("%Y-%m-%d")
+    today = today_ist()
+    today_str = today.isoformat()
+
+    # Today / month / FY totals are summed server-side in one query;
+    # recent entries and party count are independent, so run them alongside.
+    totals, recent, party_count = await asyncio.gather(
+        execute(supabase.rpc("dashboard_totals", {
+            "p_user_id": uid,
+            "p_today": today_str,
+            "p_month_start": month_start(today).isoformat(),
+            "p_fy_start": fy_start(today).isoformat(),
+        })),
+        # Recent entries (last 5)
+        execute(supabase.table("expenses").select("*, expense_categories(name)")
+            .eq("user_id", uid).order("created_at", desc=True).limit(5)),
+        # Party count
+        execute(supabase.table("parties").select("id", count="exact", head=True)
+            .eq("user_id", uid).eq("is_active", True)),
+    )
+    row = totals.data[0] if totals.data else {}
+    today_total = float(row.get("today_total") or 0)
+    month_total = float(row.get("month_total") or 0)
+    fy_total = float(row.get("fy_total") or 0)
 
-    # FY start: April 1
-    if today.month >= 4:
-        fy_start = today.replace(month=4, day=1).strftime("%Y-%m-%d")
-    else:
-        fy_start = today.replace(year=today.year - 1, month=4, day=1).strftime("%Y-%m-%d")
-
-    # Today's expenses
-    today_exp = supabase.table("expenses").select("amount") \
-        .eq("user_id", uid).eq("date", today_str).execute()
-    today_total = sum(float(e["amount"]) for e in today_exp.data)
-
-    # Month expenses
-    month_exp = supabase.table("expenses").select("amount") \
-        .eq("user_id", uid).gte("date", month_start).lte("date", today_str).execute()
-    month_total = sum(float(e["amount"]) for e in month_exp.data)
-
-    # FY expenses
-    fy_exp = supabase.table("expenses").select("amount") \
-        .eq("user_id", uid).gte("date", fy_start).lte("date", today_str).execute()
-    fy_total = sum(float(e["amount"]) for e in fy_exp.data)
-
-    # Recent entries (last 5)
-    recent = supabase.table("expenses").select("*, expense_categories(name)") \
-        .eq("user_id", uid).order("created_at", desc=True).limit(5).execute()
     for r in recent.data:
         cat = r.pop("expense_categories", None)
         r["category_name"] = cat["name"] if cat else ""
 
-    # Party count
-    party_count = supabase.table("parties").select("id", count="exact") \
-        .eq("user_id", uid).eq("is_active", True).execute()
-
     return {
         "today_total": today_total,
         "month_total": month_total,
@@ -409,26 +992,197 @@ async def dashboard(user=Depends(get_current_user)):
     }
 
 
+# ─── Delta sync ───
+# Tokens are opaque to the client. "x" is the snapshot xmin changes are read
+# from, "s" the last change already sent on this pass, "n" the xmin to hand
+# out once the pass is complete and "t" when the pass started.
+SYNC_PAGE_SIZE = 500
+SYNC_RETENTION_DAYS = int(os.getenv("SYNC_RETENTION_DAYS", "30"))
+SYNC_TABLES = {
+    "expense_categories": "categories",
+    "parties": "parties",
+    "expenses": "expenses",
+    "ledger_entries": "ledger",
+}
+
+
+def _encode_sync_token(token: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(token).encode()).decode()
+
+
+def _decode_sync_token(value: str) -> dict:
+    try:
+        token = json.loads(base64.urlsafe_b64decode(value.encode()))
+        if not all(isinstance(token.get(k), int) for k in ("x", "s", "t")):
+            raise ValueError
+        return token
+    except (ValueError, TypeError, AttributeError):
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+
+
+@app.get("/api/sync")
+async def sync(
+    since: str = Query(None), limit: int = Query(SYNC_PAGE_SIZE, ge=1, le=2000),
+    response: Response = None, user=Depends(get_current_user)
+):
+    """Rows changed since ``since``, grouped by table.
+
+    Without a token, or with one older than the change log keeps, the
+    response has ``reset: true``: reload the lists, then sync from the
+    returned token. Keep calling with the new token while ``has_more``.
+    """
+    token = _decode_sync_token(since) if since else None
+    now = int(time.time())
+    reset = token is None or now - token["t"] > SYNC_RETENTION_DAYS * 86400
+
+    result = await execute(supabase.rpc("sync_changes_since", {
+        "p_user_id": user["user_id"],
+        "p_xmin": 0 if reset else token["x"],
+        "p_after_seq": 0 if reset else token["s"],
+        "p_limit": 0 if reset else limit + 1,
+    }))
+    changes = result.data["changes"]
+    next_xmin = result.data["xmin"] if reset else token.get("n", result.data["xmin"])
+
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if has_more:
+        next_token = {"x": token["x"], "s": changes[-1]["seq"], "n": next_xmin, "t": token["t"]}
+    else:
+        next_token = {"x": next_xmin, "s": 0, "t": now}
+
+    # Latest state per row; a row gone from its table was deleted
+    out = {name: {"upserted": {}, "deleted": {}} for name in SYNC_TABLES.values()}
+    for c in changes:
+        bucket = out[SYNC_TABLES[c["table"]]]
+        if c["data"] is None:
+            bucket["upserted"].pop(c["id"], None)
+            bucket["deleted"][c["id"]] = True
+        else:
+            bucket["deleted"].pop(c["id"], None)
+            bucket["upserted"][c["id"]] = c["data"]
+
+    return _json({
+        "reset": reset,
+        "has_more": has_more,
+        "token": _encode_sync_token(next_token),
+        "changes": {
+            name: {"upserted": list(b["upserted"].values()), "deleted": list(b["deleted"])}
+            for name, b in out.items()
+        },
+    }, response)
+
+
+# ─── Analytics ───
+ANALYTICS_GROUPS = {"expenses": ("category", "none"), "ledger": ("party", "entry_type", "none")}
+ANALYTICS_BUCKETS = ("day", "week", "month", "fy")
+
+
+@app.get("/api/analytics")
+async def analytics(
+    source: str = Query("expenses"), group: str = Query(None), bucket: str = Query("month"),
+    date_from: str = Query(None), date_to: str = Query(None),
+    response: Response = None, user=Depends(versioned_user)
+):
+    """Totals per bucket (day / week / month / FY) and group, from the daily rollups.
+
+    Defaults to the current financial year up to today (IST).
+    """
+    if source not in ANALYTICS_GROUPS:
+        raise HTTPException(status_code=400, detail="source must be 'expenses' or 'ledger'")
+    group = group or ANALYTICS_GROUPS[source][0]
+    if group not in ANALYTICS_GROUPS[source]:
+        raise HTTPException(status_code=400, detail=f"group must be one of: {', '.join(ANALYTICS_GROUPS[source])}")
+    if bucket not in ANALYTICS_BUCKETS:
+        raise HTTPException(status_code=400, detail=f"bucket must be one of: {', '.join(ANALYTICS_BUCKETS)}")
+
+    today = today_ist()
+    date_to = date_to or today.isoformat()
+    date_from = date_from or fy_start(today).isoformat()
+    result = await execute(supabase.rpc("analytics_series", {
+        "p_user_id": user["user_id"], "p_source": source, "p_group": group,
+        "p_bucket": bucket, "p_from": date_from, "p_to": date_to,
+    }))
+    return _json({
+        "source": source,
+        "group": group,
+        "bucket": bucket,
+        "date_from": date_from,
+        "date_to": date_to,
+        "rows": result.data,
+    }, response)
+
+
+# ─── Search ───
+# Words are matched by phonetic key, so "Sharmaji", "sharma jee" and
+# "शर्मा जी" find the same entries. The newest 1000 matches are ranked
+# (see search_entries in the schema), so pages are by offset rather than keyset.
+SEARCH_SOURCES = ("expenses", "ledger")
+MIN_SEARCH_KEY = 3
+
+
+def _decode_offset(cursor: str) -> int:
+    try:
+        offset = int(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if offset < 0:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return offset
+
+
+@app.get("/api/search")
+async def search(
+    q: str = Query(..., max_length=200), source: str = Query(None),
+    cursor: str = Query(None), limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    response: Response = None, user=Depends(versioned_user)
+):
+    """Expenses and ledger entries whose description, item, voice text or
+    category / party name contain every word of ``q``, best match first."""
+    if source is not None and source not in SEARCH_SOURCES:
+        raise HTTPException(status_code=400, detail="source must be 'expenses' or 'ledger'")
+    keys = voice_rules.search_keys(q)
+    if not keys or len(keys[0]) < MIN_SEARCH_KEY:
+        raise HTTPException(status_code=400, detail=f"Search needs a word of at least {MIN_SEARCH_KEY} letters")
+
+    offset = _decode_offset(cursor) if cursor else 0
+    result = await execute(supabase.rpc("search_entries", {
+        "p_user_id": user["user_id"], "p_keys": keys, "p_source": source,
+        "p_limit": limit + 1, "p_offset": offset,
+    }))
+    has_more = len(result.data) > limit
+    next_cursor = base64.urlsafe_b64encode(str(offset + limit).encode()).decode().rstrip("=")
+    return _json({
+        "items": result.data[:limit],
+        "has_more": has_more,
+        "next_cursor": next_cursor if has_more else None,
+    }, response)
+
+
 # ─── Serve PWA static files ───
-# Mount static files LAST so API routes take priority
-static_path = Path(__file__).parent / "static"
-app.mount("/static", StaticFiles(directory=static_path), name="static")
+# Registered LAST so API routes take priority
+@app.get("/static/{path:path}")
+async def serve_static(path: str, request: Request, v: str = Query(None)):
+    file_path = static_assets.resolve(path)
+    if file_path is None:
+        raise HTTPException(status_code=404)
+    return static_assets.file_response(file_path, request.headers.get("accept-encoding", ""), v)
 
 
 @app.get("/")
 async def serve_index():
-    return FileResponse(static_path / "index.html")
+    return static_assets.index_response()
 
 # Catch-all for PWA routing (serve index.html for any non-API path)
 @app.get("/{path:path}")
-async def catch_all(path: str):
+async def catch_all(path: str, request: Request):
     # Don't catch API or report routes
     if path.startswith("api/") or path.startswith("reports/"):
         raise HTTPException(status_code=404)
-    file_path = static_path / path
-    if file_path.exists() and file_path.is_file():
-        return FileResponse(file_path)
-    return FileResponse(static_path / "index.html")
+    file_path = static_assets.resolve(path)
+    if file_path is not None and path != "index.html":
+        return static_assets.file_response(file_path, request.headers.get("accept-encoding", ""))
+    return static_assets.index_response()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,192 @@
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+# Prometheus text-format metrics kept in process memory, plus an optional
+# per-request Server-Timing breakdown. Each uvicorn worker exports its own
+# numbers; Prometheus sums them across scrape targets.
+SERVER_TIMING = os.getenv("SERVER_TIMING", "0") == "1"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+SIZE_BUCKETS = (10, 100, 1000, 10000, 100000, 1000000)
+
+_registry = []
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+# ─── Metric types ───
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name, self.help, self.labelnames = name, help, labels
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple = (), buckets: tuple = LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames, self.buckets = name, help, labels, buckets
+        self._values = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, **labels):
+        key = tuple(labels[n] for n in self.labelnames)
+        with self._lock:
+            v = self._values.get(key)
+            if v is None:
+                v = self._values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    v[i] += 1
+            v[-2] += value
+            v[-1] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, v in sorted(self._values.items()):
+            for bound, n in zip(self.buckets + ("+Inf",), v[:-2] + [v[-1]]):
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, key, le)} {n}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {v[-2]}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {v[-1]}")
+        return lines
+
+
+class CounterFunc:
+    """Counter whose values are read from existing stats at scrape time."""
+
+    def __init__(self, name: str, help: str, labels: tuple, fn):
+        self.name, self.help, self.labelnames, self.fn = name, help, labels, fn
+        _registry.append(self)
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.fn().items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, key)} {value}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in _registry:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# ─── Metrics ───
+http_duration = Histogram("http_request_duration_seconds", "HTTP request latency by route.",
+                          ("method", "route", "status"))
+db_duration = Histogram("db_query_duration_seconds", "Supabase query latency by table.",
+                        ("table", "method", "outcome"))
+openai_duration = Histogram("openai_request_duration_seconds", "OpenAI API call latency.",
+                            ("operation", "outcome"))
+openai_tokens = Counter("openai_tokens_total", "OpenAI tokens used.", ("model", "kind"))
+report_duration = Histogram("report_generation_seconds", "Excel report build time.", ("kind", "mode"))
+report_rows = Histogram("report_rows", "Rows written per Excel report.", ("kind",), SIZE_BUCKETS)
+
+
+# ─── Request timing ───
+# Spans recorded while a request is handled, for the Server-Timing header
+_spans: ContextVar = ContextVar("spans", default=None)
+
+
+def add_span(name: str, seconds: float):
+    spans = _spans.get()
+    if spans is not None:
+        total, count = spans.get(name, (0.0, 0))
+        spans[name] = (total + seconds, count + 1)
+
+
+class timed:
+    """Observe the block's duration in ``histogram`` (and as a Server-Timing
+    span). Histograms with an ``outcome`` label get "ok" or "error"."""
+
+    def __init__(self, histogram: Histogram, span: str = None, **labels):
+        self.histogram, self.span, self.labels = histogram, span, labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.start
+        if "outcome" in self.histogram.labelnames:
+            self.labels.setdefault("outcome", "error" if exc_type else "ok")
+        self.histogram.observe(elapsed, **self.labels)
+        if self.span:
+            add_span(self.span, elapsed)
+        return False
+
+
+def query_labels(query) -> dict:
+    """table / method labels for a PostgREST request builder."""
+    path = str(getattr(query, "path", "")).strip("/")
+    table = "rpc:" + path[4:] if path.startswith("rpc/") else (path or "unknown")
+    return {"table": table, "method": getattr(query, "http_method", "GET")}
+
+
+class MetricsMiddleware:
+    """Per-route latency histogram and the Server-Timing header (pure ASGI, so
+    streaming responses are not buffered)."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        spans = {}
+        token = _spans.set(spans)
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if SERVER_TIMING:
+                    message["headers"] = list(message.get("headers", [])) + [
+                        (b"server-timing", _server_timing(spans, time.perf_counter() - start).encode())
+                    ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _spans.reset(token)
+            route = scope.get("route")
+            http_duration.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status),
+            )
+
+
+def _server_timing(spans: dict, total: float) -> str:
+    parts = [f'{name};dur={seconds * 1000:.1f};desc="{count}x"' for name, (seconds, count) in spans.items()]
+    parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
@@ -0,0 +1,97 @@
+import hashlib
+import os
+import time
+from pathlib import Path
+
+# Generated reports live at REPORTS_DIR/<user_id>/<cache key>/<filename>.
+# The key covers everything the workbook depends on, including a data
+# version from the report_data_version() RPC, so a hit can be served
+# without regenerating and a write in the range produces a new key.
+# Directories are created when the first report is written.
+REPORTS_DIR = Path("generated_reports")
+
+REPORT_CACHE_MAX_MB = float(os.getenv("REPORT_CACHE_MAX_MB", "200"))
+REPORT_CACHE_MAX_AGE_HOURS = float(os.getenv("REPORT_CACHE_MAX_AGE_HOURS", "24"))
+
+stats = {"hits": 0, "misses": 0, "evicted": 0}
+
+
+def cache_key(user_id: str, kind: str, party_id: str, date_from: str, date_to: str,
+              data_version: str) -> str:
+    raw = "\x1f".join([user_id, kind, party_id or "", date_from, date_to, data_version or ""])
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def report_path(user_id: str, key: str, filename: str) -> Path:
+    return REPORTS_DIR / user_id / key / filename
+
+
+def download_url(path: Path) -> str:
+    return "/reports/" + path.relative_to(REPORTS_DIR).as_posix()
+
+
+def lookup(path: Path) -> bool:
+    """True if a cached report exists; refreshes its mtime so eviction is LRU.
+
+    On a miss, creates the directory the report should be written to.
+    """
+    if path.is_file():
+        os.utime(path)
+        stats["hits"] += 1
+        return True
+    path.parent.mkdir(parents=True, exist_ok=True)
+    stats["misses"] += 1
+    return False
+
+
+def resolve(relpath: str) -> Path:
+    """Map a /reports/ URL path to a file inside REPORTS_DIR (None if outside or missing)."""
+    root = REPORTS_DIR.resolve()
+    path = (root / relpath).resolve()
+    if root not in path.parents or not path.is_file():
+        return None
+    return path
+
+
+def evict() -> int:
+    """Drop reports unused for REPORT_CACHE_MAX_AGE_HOURS, then the least recently
+    used ones until REPORTS_DIR fits in REPORT_CACHE_MAX_MB. Returns files removed.
+
+    ``*.part`` files are reports still being written (reports._save_atomic);
+    they are only removed once older than the age cutoff, as crash leftovers.
+    """
+    cutoff = time.time() - REPORT_CACHE_MAX_AGE_HOURS * 3600
+    files = []
+    for path in REPORTS_DIR.rglob("*"):
+        try:
+            st = path.stat()
+        except FileNotFoundError:
+            continue
+        if not path.is_file():
+            continue
+        if path.suffix == ".part":
+            if st.st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+            continue
+        files.append((st.st_mtime, st.st_size, path))
+    files.sort()
+
+    budget = REPORT_CACHE_MAX_MB * 1024 * 1024
+    total = sum(size for _, size, _ in files)
+    removed = 0
+    for mtime, size, path in files:
+        if mtime >= cutoff and total <= budget:
+            break
+        path.unlink(missing_ok=True)
+        total -= size
+        removed += 1
+        # Remove the now-empty key directory (and user directory if empty)
+        for parent in (path.parent, path.parent.parent):
+            if parent == REPORTS_DIR:
+                break
+            try:
+                parent.rmdir()
+            except OSError:
+                break
+    stats["evicted"] += removed
+    return removed
@@ -0,0 +1,289 @@
+import asyncio
+import multiprocessing
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from pathlib import Path
+
+from db import supabase, execute, execute_sync, iter_rows
+import report_cache
+import metrics
+
+# Report jobs run in a small process pool so openpyxl's CPU work never
+# competes with API traffic for the GIL. The pool size is the concurrency
+# limit; extra jobs queue. Job records are kept in memory per API process.
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+REPORT_MAX_JOBS_PER_USER = int(os.getenv("REPORT_MAX_JOBS_PER_USER", "5"))
+REPORT_JOB_TTL_MINUTES = float(os.getenv("REPORT_JOB_TTL_MINUTES", "60"))
+PROGRESS_EVERY = 500
+
+_jobs: dict = {}
+_executor = None
+_manager = None
+_shared = None  # Manager dict: (job_id, "progress") -> rows, (job_id, "cancel") -> bool
+
+
+class JobCancelled(Exception):
+    pass
+
+
+# ─── Report specs (shared by inline endpoints and jobs) ───
+async def prepare(user_id: str, kind: str, date_from: str, date_to: str, party_id: str = None) -> dict:
+    """Resolve the cache path for a report. Cheap: one or two small queries."""
+    params = {"p_user_id": user_id, "p_kind": kind, "p_from": date_from, "p_to": date_to}
+    if kind == "party":
+        params["p_party_id"] = party_id
+        party, version = await asyncio.gather(
+            execute(supabase.table("parties").select("name").eq("id", party_id)),
+            execute(supabase.rpc("report_data_version", params)),
+        )
+        party_name = party.data[0]["name"] if party.data else "Unknown"
+        safe_name = party_name.replace(" ", "_").replace("/", "_")
+        filename = f"ledger_{safe_name}_{date_from}_to_{date_to}.xlsx"
+    else:
+        version = await execute(supabase.rpc("report_data_version", params))
+        party_name = None
+        filename = f"expenses_{date_from}_to_{date_to}.xlsx"
+
+    key = report_cache.cache_key(user_id, kind, party_id, date_from, date_to, version.data)
+    return {
+        "user_id": user_id,
+        "kind": kind,
+        "party_id": party_id,
+        "party_name": party_name,
+        "date_from": date_from,
+        "date_to": date_to,
+        "filename": filename,
+        "path": str(report_cache.report_path(user_id, key, filename)),
+    }
+
+
+def _expense_report_rows(uid: str, date_from: str, date_to: str):
+    def make_query():
+        return supabase.table("expenses").select(
+            "id, date, created_at, amount, description, expense_categories(name)"
+        ).eq("user_id", uid).gte("date", date_from).lte("date", date_to)
+
+    for r in iter_rows(make_query):
+        cat = r.pop("expense_categories", None)
+        r["category_name"] = cat["name"] if cat else ""
+        yield r
+
+
+def _party_report_rows(uid: str, party_id: str, date_from: str, date_to: str):
+    def make_query():
+        return supabase.table("ledger_entries").select(
+            "id, date, created_at, entry_type, item_name, quantity, unit, rate, amount"
+        ).eq("user_id", uid).eq("party_id", party_id).gte("date", date_from).lte("date", date_to)
+
+    return iter_rows(make_query)
+
+
+def _tracked(rows, job_id: str):
+    """Publish progress and honour cancellation while rows stream through."""
+    for i, r in enumerate(rows, 1):
+        if i % PROGRESS_EVERY == 0:
+            if _shared.get((job_id, "cancel")):
+                raise JobCancelled()
+            _shared[(job_id, "progress")] = i
+        yield r
+
+
+def build_report(spec: dict, job_id: str = None) -> int:
+    """Page rows from Supabase and stream the workbook to spec["path"].
+
+    Blocking. Runs in a worker thread for inline requests, or in a pool
+    process for jobs (where ``job_id`` enables progress and cancellation).
+    Returns the number of rows written.
+    """
+    # openpyxl is only imported once a report is actually built
+    from reports import write_expense_report, write_party_report
+
+    uid = spec["user_id"]
+    d_from = date.fromisoformat(spec["date_from"])
+    d_to = date.fromisoformat(spec["date_to"])
+    path = Path(spec["path"])
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    if spec["kind"] == "party":
+        rows = _party_report_rows(uid, spec["party_id"], spec["date_from"], spec["date_to"])
+        if job_id:
+            rows = _tracked(rows, job_id)
+        return write_party_report(spec["party_name"], rows, path, d_from, d_to)
+
+    user_info = execute_sync(supabase.table("users").select("display_name").eq("id", uid))
+    name = user_info.data[0].get("display_name", "") if user_info.data else ""
+    summary = execute_sync(supabase.rpc("expense_category_summary", {
+        "p_user_id": uid, "p_from": spec["date_from"], "p_to": spec["date_to"],
+    }))
+    rows = _expense_report_rows(uid, spec["date_from"], spec["date_to"])
+    if job_id:
+        rows = _tracked(rows, job_id)
+    return write_expense_report(rows, path, d_from, d_to, name, summary.data)
+
+
+# ─── Process pool ───
+def _init_worker(shared):
+    global _shared
+    _shared = shared
+
+
+def _run_job(spec: dict, job_id: str) -> tuple:
+    """Build in a pool process; returns (rows, seconds) so the parent can record metrics."""
+    try:
+        # Cancelled while waiting in the pool's call queue
+        if _shared.get((job_id, "cancel")):
+            raise JobCancelled()
+        _shared[(job_id, "progress")] = 0
+        start = time.perf_counter()
+        rows = build_report(spec, job_id)
+        return rows, time.perf_counter() - start
+    finally:
+        # Only the worker knows when it has stopped looking at the flag
+        _shared.pop((job_id, "cancel"), None)
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor, _manager, _shared
+    if _executor is None:
+        # spawn: workers build their own Supabase client instead of sharing
+        # the parent's HTTP connections across fork
+        ctx = multiprocessing.get_context("spawn")
+        _manager = ctx.Manager()
+        _shared = _manager.dict()
+        _executor = ProcessPoolExecutor(
+            max_workers=REPORT_WORKERS, mp_context=ctx,
+            initializer=_init_worker, initargs=(_shared,),
+        )
+    return _executor
+
+
+def shutdown():
+    global _executor, _manager
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _manager.shutdown()
+        _executor = _manager = None
+
+
+# ─── Jobs ───
+def _public(job: dict) -> dict:
+    progress = job["progress"]
+    if job["status"] in ("queued", "running") and _shared is not None:
+        progress = _shared.get((job["id"], "progress"), progress)
+        if job["status"] == "queued" and (job["id"], "progress") in _shared:
+            job["status"] = "running"
+    out = {
+        "job_id": job["id"],
+        "status": job["status"],
+        "rows_done": progress,
+        "rows_total": job["rows_total"],
+        "filename": job["filename"],
+        "error": job["error"],
+    }
+    if job["rows_total"]:
+        out["percent"] = min(100, round(100 * progress / job["rows_total"]))
+    if job["status"] == "done":
+        out["percent"] = 100
+        out["download_url"] = report_cache.download_url(Path(job["path"]))
+    return out
+
+
+async def _row_count(spec: dict) -> int:
+    table = "ledger_entries" if spec["kind"] == "party" else "expenses"
+    q = supabase.table(table).select("id", count="exact", head=True) \
+        .eq("user_id", spec["user_id"]) \
+        .gte("date", spec["date_from"]).lte("date", spec["date_to"])
+    if spec["kind"] == "party":
+        q = q.eq("party_id", spec["party_id"])
+    result = await execute(q)
+    return result.count or 0
+
+
+async def _watch(job: dict, future):
+    try:
+        job["progress"], seconds = await asyncio.wrap_future(future)
+        job["status"] = "done"
+        metrics.report_duration.observe(seconds, kind=job["kind"], mode="job")
+        metrics.report_rows.observe(job["progress"], kind=job["kind"])
+    except (asyncio.CancelledError, JobCancelled):
+        job["status"] = "cancelled"
+    except Exception as e:
+        job["status"] = "failed"
+        job["error"] = str(e)
+    finally:
+        job["finished_at"] = time.time()
+        if _shared is not None:
+            _shared.pop((job["id"], "progress"), None)
+        await asyncio.get_running_loop().run_in_executor(None, report_cache.evict)
+
+
+def cleanup():
+    """Forget finished jobs older than REPORT_JOB_TTL_MINUTES; their files are
+    left to report_cache eviction."""
+    cutoff = time.time() - REPORT_JOB_TTL_MINUTES * 60
+    for job_id, job in list(_jobs.items()):
+        if job.get("finished_at") and job["finished_at"] < cutoff:
+            del _jobs[job_id]
+
+
+async def submit(spec: dict) -> dict:
+    cleanup()
+    active = [j for j in _jobs.values()
+              if j["user_id"] == spec["user_id"] and j["status"] in ("queued", "running")]
+    if len(active) >= REPORT_MAX_JOBS_PER_USER:
+        return None
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "user_id": spec["user_id"],
+        "kind": spec["kind"],
+        "status": "queued",
+        "progress": 0,
+        "rows_total": None,
+        "filename": spec["filename"],
+        "path": spec["path"],
+        "error": None,
+        "created_at": time.time(),
+        "finished_at": None,
+    }
+    _jobs[job["id"]] = job
+
+    if report_cache.lookup(Path(spec["path"])):
+        job["status"] = "done"
+        job["finished_at"] = time.time()
+        return _public(job)
+
+    job["rows_total"] = await _row_count(spec)
+    # The pool's own future: unlike an asyncio wrapper, cancel() on it only
+    # succeeds while the job has not been handed to a worker
+    future = _pool().submit(_run_job, spec, job["id"])
+    job["future"] = future
+    asyncio.create_task(_watch(job, future))
+    return _public(job)
+
+
+def get(job_id: str, user_id: str) -> dict:
+    cleanup()
+    job = _jobs.get(job_id)
+    if job is None or job["user_id"] != user_id:
+        return None
+    return _public(job)
+
+
+def cancel(job_id: str, user_id: str) -> dict:
+    job = _jobs.get(job_id)
+    if job is None or job["user_id"] != user_id:
+        return None
+    future = job.get("future")
+    if job["status"] in ("queued", "running") and future is not None and not future.done():
+        # Jobs still queued in the pool are dropped before they start. Ones
+        # already handed to a worker stop at their next progress tick; the
+        # worker clears the flag when it exits.
+        if future.cancel():
+            job["status"] = "cancelled"
+        else:
+            _shared[(job_id, "cancel")] = True
+    return _public(job)
@@ -1,7 +1,11 @@
-import io
+import os
+import tempfile
 from datetime import date
+from pathlib import Path
+from typing import Iterable
 from openpyxl import Workbook
-from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Alignment, Border, Side, PatternFill, NamedStyle
 from openpyxl.utils import get_column_letter
 
 
@@ -26,176 +30,177 @@ LEFT = Alignment(horizontal="left", vertical="center")
 RIGHT = Alignment(horizontal="right", vertical="center")
 
 
-def _style_header_row(ws, row, col_count):
-    for col in range(1, col_count + 1):
-        cell = ws.cell(row=row, column=col)
-        cell.font = COLUMN_HEADER_FONT
-        cell.fill = HEADER_FILL
-        cell.alignment = CENTER
-        cell.border = THIN_BORDER
-
-
-def _style_data_row(ws, row, col_count, is_alt=False):
-    for col in range(1, col_count + 1):
-        cell = ws.cell(row=row, column=col)
-        cell.font = CELL_FONT
-        cell.border = THIN_BORDER
-        if is_alt:
-            cell.fill = ALT_ROW_FILL
-
-
-def generate_expense_report(expenses: list, date_from: date, date_to: date, user_name: str = "") -> bytes:
-    """Generate Excel expense report."""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Expense Report"
-
-    # Title
-    ws.merge_cells("A1:E1")
-    ws["A1"] = f"Expense Report — {user_name}" if user_name else "Expense Report"
-    ws["A1"].font = HEADER_FONT
-    ws["A1"].alignment = CENTER
-
-    ws.merge_cells("A2:E2")
-    ws["A2"] = f"{date_from.strftime('%d %b %Y')} to {date_to.strftime('%d %b %Y')}"
-    ws["A2"].font = SUBHEADER_FONT
-    ws["A2"].alignment = CENTER
-
-    # Column headers
-    headers = ["#", "Date", "Category", "Description", "Amount (₹)"]
-    col_widths = [6, 15, 20, 35, 18]
-    header_row = 4
-
-    for i, (h, w) in enumerate(zip(headers, col_widths), 1):
-        ws.cell(row=header_row, column=i, value=h)
+TYPE_LABELS = {
+    "goods_sold": "Goods Sold",
+    "payment_received": "Payment Received",
+    "payment_made": "Payment Made",
+    "goods_returned": "Goods Returned",
+    "goods_taken": "Goods Taken",
+}
+
+
+# ─── Streaming (write-only) reports ───
+# Rows are appended to a write-only workbook as they arrive from an iterator
+# and styled through named styles, so memory stays flat regardless of row
+# count. Write-only sheets cannot merge cells, so titles sit in column A.
+# (benchmarks/legacy_reports.py has the old in-memory versions.)
+
+def _named_styles() -> list:
+    def style(name, font, fill=None, alignment=None, border=THIN_BORDER, number_format=None):
+        ns = NamedStyle(name=name, font=font, border=border)
+        if fill is not None:
+            ns.fill = fill
+        if alignment is not None:
+            ns.alignment = alignment
+        if number_format is not None:
+            ns.number_format = number_format
+        return ns
+
+    no_border = Border()
+    styles = [
+        style("bt_title", HEADER_FONT, border=no_border),
+        style("bt_subtitle", SUBHEADER_FONT, border=no_border),
+        style("bt_header", COLUMN_HEADER_FONT, HEADER_FILL, CENTER),
+        style("bt_total_label", TOTAL_FONT, TOTAL_FILL, RIGHT),
+        style("bt_total", TOTAL_FONT, TOTAL_FILL, RIGHT, number_format="#,##0.00"),
+        style("bt_total_fill", CELL_FONT, TOTAL_FILL),
+        style("bt_summary_label", SUBHEADER_FONT, TOTAL_FILL),
+    ]
+    # Data cells come in plain and alternate-row variants
+    for suffix, fill in (("", None), ("_alt", ALT_ROW_FILL)):
+        styles += [
+            style("bt_cell" + suffix, CELL_FONT, fill),
+            style("bt_index" + suffix, CELL_FONT, fill, CENTER),
+            style("bt_number" + suffix, CELL_FONT, fill, number_format="#,##0.00"),
+            style("bt_amount" + suffix, AMOUNT_FONT, fill, RIGHT, number_format="#,##0.00"),
+        ]
+    return styles
+
+
+def _write_only_workbook() -> Workbook:
+    wb = Workbook(write_only=True)
+    for ns in _named_styles():
+        wb.add_named_style(ns)
+    return wb
+
+
+def _cell(ws, value, style: str) -> WriteOnlyCell:
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style
+    return cell
+
+
+def _set_widths(ws, widths: list):
+    for i, w in enumerate(widths, 1):
         ws.column_dimensions[get_column_letter(i)].width = w
-    _style_header_row(ws, header_row, len(headers))
 
-    # Data rows
-    total = 0
-    for idx, exp in enumerate(expenses):
-        row = header_row + 1 + idx
-        ws.cell(row=row, column=1, value=idx + 1).alignment = CENTER
-        ws.cell(row=row, column=2, value=exp["date"])
-        ws.cell(row=row, column=3, value=exp.get("category_name", ""))
-        ws.cell(row=row, column=4, value=exp.get("description", ""))
-        amt_cell = ws.cell(row=row, column=5, value=float(exp["amount"]))
-        amt_cell.number_format = "#,##0.00"
-        amt_cell.font = AMOUNT_FONT
-        amt_cell.alignment = RIGHT
-        _style_data_row(ws, row, len(headers), is_alt=(idx % 2 == 1))
-        total += float(exp["amount"])
-
-    # Total row
-    total_row = header_row + 1 + len(expenses)
-    ws.merge_cells(f"A{total_row}:D{total_row}")
-    ws.cell(row=total_row, column=1, value="TOTAL").font = TOTAL_FONT
-    ws.cell(row=total_row, column=1).alignment = RIGHT
-    total_cell = ws.cell(row=total_row, column=5, value=total)
-    total_cell.font = TOTAL_FONT
-    total_cell.number_format = "#,##0.00"
-    total_cell.alignment = RIGHT
-    for col in range(1, 6):
-        ws.cell(row=total_row, column=col).fill = TOTAL_FILL
-        ws.cell(row=total_row, column=col).border = THIN_BORDER
-
-    # Category summary sheet
-    ws2 = wb.create_sheet("Category Summary")
-    ws2.merge_cells("A1:C1")
-    ws2["A1"] = "Category-wise Summary"
-    ws2["A1"].font = HEADER_FONT
-    ws2["A1"].alignment = CENTER
 
-    cat_totals = {}
-    for exp in expenses:
-        cat = exp.get("category_name", "Uncategorized")
-        cat_totals[cat] = cat_totals.get(cat, 0) + float(exp["amount"])
+def _save_atomic(wb: Workbook, path: Path):
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name, suffix=".part")
+    os.close(fd)
+    try:
+        wb.save(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
 
-    cat_headers = ["Category", "Count", "Total (₹)"]
-    for i, h in enumerate(cat_headers, 1):
-        ws2.cell(row=3, column=i, value=h)
-    _style_header_row(ws2, 3, 3)
-    ws2.column_dimensions["A"].width = 25
-    ws2.column_dimensions["B"].width = 12
-    ws2.column_dimensions["C"].width = 18
 
+def write_expense_report(expenses: Iterable[dict], path: Path, date_from: date, date_to: date,
+                         user_name: str = "", category_summary: list = None) -> int:
+    """Stream an expense report to ``path``. Returns the number of expense rows written."""
+    wb = _write_only_workbook()
+    ws = wb.create_sheet("Expense Report")
+    _set_widths(ws, [6, 15, 20, 35, 18])
+
+    ws.append([_cell(ws, f"Expense Report — {user_name}" if user_name else "Expense Report", "bt_title")])
+    ws.append([_cell(ws, f"{date_from.strftime('%d %b %Y')} to {date_to.strftime('%d %b %Y')}", "bt_subtitle")])
+    ws.append([])
+    ws.append([_cell(ws, h, "bt_header") for h in ["#", "Date", "Category", "Description", "Amount (₹)"]])
+
+    total = 0
+    count = 0
+    cat_totals = {}
     cat_counts = {}
     for exp in expenses:
+        alt = "_alt" if count % 2 == 1 else ""
+        amt = float(exp["amount"])
         cat = exp.get("category_name", "Uncategorized")
-        cat_counts[cat] = cat_counts.get(cat, 0) + 1
-
-    for idx, (cat, amt) in enumerate(sorted(cat_totals.items(), key=lambda x: -x[1])):
-        row = 4 + idx
-        ws2.cell(row=row, column=1, value=cat)
-        ws2.cell(row=row, column=2, value=cat_counts.get(cat, 0)).alignment = CENTER
-        c = ws2.cell(row=row, column=3, value=amt)
-        c.number_format = "#,##0.00"
-        c.font = AMOUNT_FONT
-        _style_data_row(ws2, row, 3, is_alt=(idx % 2 == 1))
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    return buf.getvalue()
-
-
-def generate_party_report(party_name: str, entries: list, date_from: date, date_to: date) -> bytes:
-    """Generate Excel ledger report for a specific party/client."""
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Ledger"
-
-    # Title
-    ws.merge_cells("A1:G1")
-    ws["A1"] = f"Ledger — {party_name}"
-    ws["A1"].font = HEADER_FONT
-    ws["A1"].alignment = CENTER
-
-    ws.merge_cells("A2:G2")
-    ws["A2"] = f"{date_from.strftime('%d %b %Y')} to {date_to.strftime('%d %b %Y')}"
-    ws["A2"].font = SUBHEADER_FONT
-    ws["A2"].alignment = CENTER
-
-    # Headers
-    headers = ["#", "Date", "Type", "Item", "Qty", "Rate (₹)", "Amount (₹)"]
-    col_widths = [6, 15, 18, 25, 10, 14, 18]
-    header_row = 4
-
-    for i, (h, w) in enumerate(zip(headers, col_widths), 1):
-        ws.cell(row=header_row, column=i, value=h)
-        ws.column_dimensions[get_column_letter(i)].width = w
-    _style_header_row(ws, header_row, len(headers))
+        ws.append([
+            _cell(ws, count + 1, "bt_index" + alt),
+            _cell(ws, exp["date"], "bt_cell" + alt),
+            _cell(ws, cat, "bt_cell" + alt),
+            _cell(ws, exp.get("description", ""), "bt_cell" + alt),
+            _cell(ws, amt, "bt_amount" + alt),
+        ])
+        total += amt
+        count += 1
+        if category_summary is None:
+            cat_totals[cat] = cat_totals.get(cat, 0) + amt
+            cat_counts[cat] = cat_counts.get(cat, 0) + 1
+
+    ws.append([_cell(ws, "TOTAL", "bt_total_label")]
+              + [_cell(ws, None, "bt_total_fill") for _ in range(3)]
+              + [_cell(ws, total, "bt_total")])
+
+    if category_summary is None:
+        category_summary = [
+            {"category_name": cat, "entry_count": cat_counts[cat], "total": amt}
+            for cat, amt in sorted(cat_totals.items(), key=lambda x: -x[1])
+        ]
 
-    TYPE_LABELS = {
-        "goods_sold": "Goods Sold",
-        "payment_received": "Payment Received",
-        "payment_made": "Payment Made",
-        "goods_returned": "Goods Returned",
-        "goods_taken": "Goods Taken",
-    }
+    ws2 = wb.create_sheet("Category Summary")
+    _set_widths(ws2, [25, 12, 18])
+    ws2.append([_cell(ws2, "Category-wise Summary", "bt_title")])
+    ws2.append([])
+    ws2.append([_cell(ws2, h, "bt_header") for h in ["Category", "Count", "Total (₹)"]])
+    for idx, summary in enumerate(category_summary):
+        alt = "_alt" if idx % 2 == 1 else ""
+        ws2.append([
+            _cell(ws2, summary["category_name"], "bt_cell" + alt),
+            _cell(ws2, int(summary["entry_count"]), "bt_index" + alt),
+            _cell(ws2, float(summary["total"]), "bt_amount" + alt),
+        ])
+
+    _save_atomic(wb, path)
+    return count
+
+
+def write_party_report(party_name: str, entries: Iterable[dict], path: Path,
+                       date_from: date, date_to: date) -> int:
+    """Stream a party ledger report to ``path``. Returns the number of entries written."""
+    wb = _write_only_workbook()
+    ws = wb.create_sheet("Ledger")
+    _set_widths(ws, [6, 15, 18, 25, 10, 14, 18])
+
+    ws.append([_cell(ws, f"Ledger — {party_name}", "bt_title")])
+    ws.append([_cell(ws, f"{date_from.strftime('%d %b %Y')} to {date_to.strftime('%d %b %Y')}", "bt_subtitle")])
+    ws.append([])
+    ws.append([_cell(ws, h, "bt_header")
+               for h in ["#", "Date", "Type", "Item", "Qty", "Rate (₹)", "Amount (₹)"]])
 
     payable = 0  # what party owes us
     receivable = 0  # what we owe party
-
-    for idx, entry in enumerate(entries):
-        row = header_row + 1 + idx
-        ws.cell(row=row, column=1, value=idx + 1).alignment = CENTER
-        ws.cell(row=row, column=2, value=entry["date"])
-        ws.cell(row=row, column=3, value=TYPE_LABELS.get(entry["entry_type"], entry["entry_type"]))
-        ws.cell(row=row, column=4, value=entry.get("item_name", ""))
+    count = 0
+    for entry in entries:
+        alt = "_alt" if count % 2 == 1 else ""
         qty = entry.get("quantity")
         unit = entry.get("unit", "")
-        ws.cell(row=row, column=5, value=f"{qty} {unit}".strip() if qty else "")
         rate = entry.get("rate")
-        if rate:
-            ws.cell(row=row, column=6, value=float(rate)).number_format = "#,##0.00"
-        amt_cell = ws.cell(row=row, column=7, value=float(entry["amount"]))
-        amt_cell.number_format = "#,##0.00"
-        amt_cell.font = AMOUNT_FONT
-        amt_cell.alignment = RIGHT
-        _style_data_row(ws, row, len(headers), is_alt=(idx % 2 == 1))
+        amt = float(entry["amount"])
+        ws.append([
+            _cell(ws, count + 1, "bt_index" + alt),
+            _cell(ws, entry["date"], "bt_cell" + alt),
+            _cell(ws, TYPE_LABELS.get(entry["entry_type"], entry["entry_type"]), "bt_cell" + alt),
+            _cell(ws, entry.get("item_name", ""), "bt_cell" + alt),
+            _cell(ws, f"{qty} {unit}".strip() if qty else "", "bt_cell" + alt),
+            _cell(ws, float(rate) if rate else None, "bt_number" + alt),
+            _cell(ws, amt, "bt_amount" + alt),
+        ])
+        count += 1
 
         et = entry["entry_type"]
-        amt = float(entry["amount"])
         if et in ("goods_sold",):
             payable += amt
         elif et in ("payment_received",):
@@ -207,28 +212,17 @@ def generate_party_report(party_name: str, entries: list, date_from: date, date_
         elif et in ("goods_taken",):
             receivable -= amt
 
-    # Summary
-    summary_row = header_row + 2 + len(entries)
-    ws.merge_cells(f"A{summary_row}:G{summary_row}")
-    ws.cell(row=summary_row, column=1, value="SUMMARY").font = HEADER_FONT
-
+    ws.append([])
+    ws.append([_cell(ws, "SUMMARY", "bt_title")])
     labels = [
         ("Total Goods Sold / Payable by Party", payable),
         ("Total Payments Made / Receivable from Party", receivable),
         ("Net Balance (Party owes us)" if payable - receivable >= 0 else "Net Balance (We owe party)", abs(payable - receivable)),
     ]
-    for i, (label, val) in enumerate(labels):
-        row = summary_row + 1 + i
-        ws.merge_cells(f"A{row}:F{row}")
-        ws.cell(row=row, column=1, value=label).font = SUBHEADER_FONT
-        c = ws.cell(row=row, column=7, value=val)
-        c.font = TOTAL_FONT
-        c.number_format = "#,##0.00"
-        c.alignment = RIGHT
-        for col in range(1, 8):
-            ws.cell(row=row, column=col).fill = TOTAL_FILL
-            ws.cell(row=row, column=col).border = THIN_BORDER
-
-    buf = io.BytesIO()
-    wb.save(buf)
-    return buf.getvalue()
+    for label, val in labels:
+        ws.append([_cell(ws, label, "bt_summary_label")]
+                  + [_cell(ws, None, "bt_total_fill") for _ in range(5)]
+                  + [_cell(ws, val, "bt_total")])
+
+    _save_atomic(wb, path)
+    return count
@@ -0,0 +1,51 @@
+"""Rebuild or verify the daily rollup tables against the raw rows.
+
+Usage:
+    python rollups.py verify [--user USER_ID]
+    python rollups.py rebuild [--user USER_ID]
+
+`verify` exits with status 1 and prints the mismatching rows if the
+expense_daily_totals / ledger_daily_totals rollups or the party_balances
+table disagree with the expenses / ledger_entries tables.
+"""
+import argparse
+import sys
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from db import supabase
+
+
+def verify(user_id: str = None) -> list:
+    result = supabase.rpc("verify_daily_rollups", {"p_user_id": user_id}).execute()
+    return result.data
+
+
+def rebuild(user_id: str = None) -> None:
+    supabase.rpc("rebuild_daily_rollups", {"p_user_id": user_id}).execute()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("command", choices=["verify", "rebuild"])
+    parser.add_argument("--user", dest="user_id", default=None, help="limit to one user id")
+    args = parser.parse_args(argv)
+
+    if args.command == "rebuild":
+        rebuild(args.user_id)
+        print("Rollups rebuilt")
+
+    mismatches = verify(args.user_id)
+    for m in mismatches:
+        print(f"{m['kind']:8} {m['user_id']} {m['date'] or '-'} {m['key_id'] or '-'} {m['entry_type'] or ''} "
+              f"rollup={m['rollup_total']} ({m['rollup_count']}) raw={m['raw_total']} ({m['raw_count']})")
+    if mismatches:
+        print(f"{len(mismatches)} mismatching rollup rows")
+        return 1
+    print("Rollups match raw rows")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
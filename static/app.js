@@ -8,7 +8,10 @@ const state = {
   categories: [],
   parties: [],
   expenses: [],
+  expensesCursor: null,
   ledger: [],
+  ledgerCursor: null,
+  partyBalance: null,
   dashboard: null,
   // Voice
   isRecording: false,
@@ -105,6 +108,8 @@ function logout() {
   localStorage.removeItem("token");
   localStorage.removeItem("userId");
   localStorage.removeItem("displayName");
+  // Cached API responses belong to this user
+  if ("caches" in window) caches.delete("biztracker-api");
   render();
 }
 
@@ -145,20 +150,42 @@ async function loadDashboard() {
   state.dashboard = await api("/api/dashboard");
 }
 
-async function loadExpenses() {
-  const p = new URLSearchParams();
+// List views skip bulky columns like raw_voice_text
+const EXPENSE_LIST_FIELDS = "category_id,amount,description";
+const LEDGER_LIST_FIELDS = "party_id,entry_type,item_name,quantity,unit,rate,amount,description";
+
+async function loadExpenses(more = false) {
+  const p = new URLSearchParams({ fields: EXPENSE_LIST_FIELDS });
   if (state.filters.dateFrom) p.set("date_from", state.filters.dateFrom);
   if (state.filters.dateTo) p.set("date_to", state.filters.dateTo);
   if (state.filters.categoryId) p.set("category_id", state.filters.categoryId);
-  state.expenses = await api(`/api/expenses?${p}`);
+  if (more && state.expensesCursor) p.set("cursor", state.expensesCursor);
+  const page = await api(`/api/expenses?${p}`);
+  state.expenses = more ? state.expenses.concat(page.items) : page.items;
+  state.expensesCursor = page.next_cursor;
 }
 
-async function loadLedger() {
-  const p = new URLSearchParams();
+async function loadLedger(more = false) {
+  const p = new URLSearchParams({ fields: LEDGER_LIST_FIELDS });
   if (state.filters.partyId) p.set("party_id", state.filters.partyId);
   if (state.filters.dateFrom) p.set("date_from", state.filters.dateFrom);
   if (state.filters.dateTo) p.set("date_to", state.filters.dateTo);
-  state.ledger = await api(`/api/ledger?${p}`);
+  if (more && state.ledgerCursor) p.set("cursor", state.ledgerCursor);
+  const page = await api(`/api/ledger?${p}`);
+  state.ledger = more ? state.ledger.concat(page.items) : page.items;
+  state.ledgerCursor = page.next_cursor;
+  if (!more) await loadPartyBalance();
+}
+
+async function loadPartyBalance() {
+  // Totals come from the server so they cover every entry, not just loaded pages
+  state.partyBalance = null;
+  if (!state.filters.partyId) return;
+  const p = new URLSearchParams({ party_id: state.filters.partyId });
+  if (state.filters.dateFrom) p.set("date_from", state.filters.dateFrom);
+  if (state.filters.dateTo) p.set("date_to", state.filters.dateTo);
+  const rows = await api(`/api/parties/balances?${p}`);
+  state.partyBalance = rows[0] || null;
 }
 
 // ─── Voice Recording ───
@@ -617,21 +644,13 @@ function renderExpenses() {
           </div>
         `).join("")
       }
+      ${state.expensesCursor ? `<button class="btn btn-outline btn-sm" onclick="loadExpenses(true).then(render)">${t("load_more")}</button>` : ""}
     </div>
   `;
 }
 
 function renderLedger() {
-  // Calculate totals
-  let payable = 0, receivable = 0;
-  state.ledger.forEach(e => {
-    const amt = parseFloat(e.amount);
-    if (e.entry_type === "goods_sold") payable += amt;
-    else if (e.entry_type === "payment_received") payable -= amt;
-    else if (e.entry_type === "payment_made") receivable += amt;
-    else if (e.entry_type === "goods_returned") payable -= amt;
-    else if (e.entry_type === "goods_taken") receivable -= amt;
-  });
+  const bal = state.partyBalance;
 
   return `
     <div class="filter-bar">
@@ -652,11 +671,11 @@ function renderLedger() {
       </div>
       <button class="btn btn-primary btn-sm" id="filter-apply">🔍</button>
     </div>
-    ${state.filters.partyId ? `
+    ${bal ? `
     <div class="stats-grid" style="grid-template-columns:repeat(3,1fr)">
-      <div class="card"><div class="card-title">${t("ledger_payable")}</div><div class="card-value red">${fmtAmount(payable)}</div></div>
-      <div class="card"><div class="card-title">${t("ledger_receivable")}</div><div class="card-value amber">${fmtAmount(receivable)}</div></div>
-      <div class="card"><div class="card-title">${t("ledger_net")}</div><div class="card-value green">${fmtAmount(payable - receivable)}</div></div>
+      <div class="card"><div class="card-title">${t("ledger_payable")}</div><div class="card-value red">${fmtAmount(bal.payable)}</div></div>
+      <div class="card"><div class="card-title">${t("ledger_receivable")}</div><div class="card-value amber">${fmtAmount(bal.receivable)}</div></div>
+      <div class="card"><div class="card-title">${t("ledger_net")}</div><div class="card-value green">${fmtAmount(bal.balance)}</div></div>
     </div>
     ` : ""}
     <div class="card">
@@ -677,6 +696,7 @@ function renderLedger() {
           `;
         }).join("")
       }
+      ${state.ledgerCursor ? `<button class="btn btn-outline btn-sm" onclick="loadLedger(true).then(render)">${t("load_more")}</button>` : ""}
     </div>
   `;
 }
@@ -1137,6 +1157,20 @@ function applyPreset(preset) {
   if (active) active.classList.add("active");
 }
 
+// Reports are generated as background jobs; poll until the file is ready
+async function runReportJob(body, container) {
+  let job = await api("/api/reports/jobs", { method: "POST", body });
+  while (job.status === "queued" || job.status === "running") {
+    if (container && job.percent != null) {
+      container.innerHTML = `<div class="spinner"></div><p>${t("reports_generating")} ${job.percent}%</p>`;
+    }
+    await new Promise(r => setTimeout(r, 1000));
+    job = await api(`/api/reports/jobs/${job.job_id}`);
+  }
+  if (job.status !== "done") throw new Error(job.error || job.status);
+  return job;
+}
+
 async function generateExpenseReport() {
   const from = $("#r-date-from")?.value;
   const to = $("#r-date-to")?.value;
@@ -1146,7 +1180,7 @@ async function generateExpenseReport() {
   if (container) container.innerHTML = `<div class="spinner"></div>`;
 
   try {
-    const res = await api(`/api/reports/expenses?date_from=${from}&date_to=${to}`);
+    const res = await runReportJob({ kind: "expenses", date_from: from, date_to: to }, container);
     if (container) {
       const shareUrl = encodeURIComponent(window.location.origin + res.download_url);
       container.innerHTML = `
@@ -1169,7 +1203,7 @@ async function generatePartyReport() {
   if (container) container.innerHTML = `<div class="spinner"></div>`;
 
   try {
-    const res = await api(`/api/reports/party/${partyId}?date_from=${from}&date_to=${to}`);
+    const res = await runReportJob({ kind: "party", party_id: partyId, date_from: from, date_to: to }, container);
     if (container) {
       container.innerHTML = `
         <a class="download-link" href="${res.download_url}" download>📥 ${t("reports_download")}</a>
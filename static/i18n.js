@@ -70,6 +70,7 @@ const i18n = {
     exp_title: "Expenses",
     exp_add: "Add Expense",
     exp_no_data: "No expenses found",
+    load_more: "Load more",
 
     // Ledger
     ledger_title: "Client Ledger",
@@ -196,6 +197,7 @@ const i18n = {
     exp_title: "खर्चे",
     exp_add: "खर्चा जोड़ें",
     exp_no_data: "कोई खर्चा नहीं मिला",
+    load_more: "और देखें",
 
     // Ledger
     ledger_title: "क्लाइंट खाता",
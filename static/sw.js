@@ -1,11 +1,6 @@
-const CACHE_NAME = "biztracker-v1";
-const URLS_TO_CACHE = [
-  "/",
-  "/static/styles.css",
-  "/static/app.js",
-  "/static/i18n.js",
-  "/static/manifest.json",
-];
+const CACHE_NAME = "biztracker-v2";
+const API_CACHE = "biztracker-api";
+const URLS_TO_CACHE = ["/"];
 
 self.addEventListener("install", (event) => {
   event.waitUntil(
@@ -17,21 +12,75 @@ self.addEventListener("install", (event) => {
 self.addEventListener("activate", (event) => {
   event.waitUntil(
     caches.keys().then((names) =>
-      Promise.all(names.filter((n) => n !== CACHE_NAME).map((n) => caches.delete(n)))
+      Promise.all(names.filter((n) => n !== CACHE_NAME && n !== API_CACHE).map((n) => caches.delete(n)))
     )
   );
   self.clients.claim();
 });
 
+// API reads carry ETags: keep the last response per URL and revalidate it
+// with If-None-Match, so an unchanged list costs a bodiless 304. The
+// cached copy is also served when offline.
+async function revalidate(request) {
+  const cache = await caches.open(API_CACHE);
+  const cached = await cache.match(request);
+  const headers = new Headers(request.headers);
+  const etag = cached && cached.headers.get("ETag");
+  if (etag) headers.set("If-None-Match", etag);
+
+  let response;
+  try {
+    response = await fetch(request.url, { headers, cache: "no-store" });
+  } catch (err) {
+    if (cached) return cached;
+    throw err;
+  }
+  if (response.status === 304 && cached) return cached;
+  if (response.ok && response.headers.get("ETag")) {
+    await cache.put(request, response.clone());
+  }
+  return response;
+}
+
+// Versioned assets (/static/app.js?v=<hash>) never change: cache-first,
+// stored on first use. Pages and unversioned files: network-first, so a
+// deploy is picked up on the next load and the cache covers offline use.
+async function cacheFirst(request) {
+  const cached = await caches.match(request);
+  if (cached) return cached;
+  const response = await fetch(request);
+  if (response.ok) {
+    const cache = await caches.open(CACHE_NAME);
+    await cache.put(request, response.clone());
+  }
+  return response;
+}
+
+async function networkFirst(request) {
+  try {
+    const response = await fetch(request);
+    if (response.ok && request.method === "GET") {
+      const cache = await caches.open(CACHE_NAME);
+      await cache.put(request.mode === "navigate" ? "/" : request, response.clone());
+    }
+    return response;
+  } catch (err) {
+    const cached = await caches.match(request.mode === "navigate" ? "/" : request);
+    if (cached) return cached;
+    throw err;
+  }
+}
+
 self.addEventListener("fetch", (event) => {
-  // Network-first for API calls, cache-first for static assets
-  if (event.request.url.includes("/api/") || event.request.url.includes("/reports/")) {
-    event.respondWith(
-      fetch(event.request).catch(() => caches.match(event.request))
-    );
+  const url = new URL(event.request.url);
+  if (url.pathname.startsWith("/api/") && event.request.method === "GET") {
+    event.respondWith(revalidate(event.request));
+  } else if (url.pathname.startsWith("/api/") || url.pathname.startsWith("/reports/")) {
+    // Writes and report downloads always go to the network
+    event.respondWith(fetch(event.request));
+  } else if (url.searchParams.has("v")) {
+    event.respondWith(cacheFirst(event.request));
   } else {
-    event.respondWith(
-      caches.match(event.request).then((cached) => cached || fetch(event.request))
-    );
+    event.respondWith(networkFirst(event.request));
   }
 });
@@ -0,0 +1,100 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from fastapi.responses import FileResponse, HTMLResponse
+
+# Static files are precompressed once per process (gzip always, brotli when
+# the `brotli` package is installed) and served by content negotiation.
+# index.html links assets as /static/<file>?v=<hash>; those URLs never
+# change content, so they are cached for a year.
+STATIC_DIR = Path(__file__).parent / "static"
+COMPRESSED_DIR = Path(os.getenv("STATIC_CACHE_DIR", Path(tempfile.gettempdir()) / "biztracker-static"))
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE = {".js", ".css", ".html", ".json", ".svg", ".txt"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def _accepts(accept_encoding: str, encoding: str) -> bool:
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        if name.strip() == encoding:
+            return params.replace(" ", "") not in ("q=0", "q=0.0")
+    return False
+
+
+@lru_cache(maxsize=1)
+def manifest() -> dict:
+    """relative path → {"hash", "gzip", "br"} for every static file."""
+    COMPRESSED_DIR.mkdir(parents=True, exist_ok=True)
+    entries = {}
+    for path in STATIC_DIR.rglob("*"):
+        if not path.is_file() or "__pycache__" in path.parts:
+            continue
+        data = path.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()[:12]
+        rel = path.relative_to(STATIC_DIR).as_posix()
+        entry = {"hash": digest}
+        if path.suffix in COMPRESSIBLE and len(data) >= COMPRESS_MIN_BYTES:
+            base = COMPRESSED_DIR / f"{digest}{path.suffix}"
+            gz = base.with_name(base.name + ".gz")
+            if not gz.exists():
+                gz.write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+            entry["gzip"] = gz
+            if brotli is not None:
+                br = base.with_name(base.name + ".br")
+                if not br.exists():
+                    br.write_bytes(brotli.compress(data, quality=11))
+                entry["br"] = br
+        entries[rel] = entry
+    return entries
+
+
+def resolve(relpath: str):
+    """Path of a file inside STATIC_DIR, or None (also for traversal attempts)."""
+    path = (STATIC_DIR / relpath).resolve()
+    if not path.is_relative_to(STATIC_DIR.resolve()) or not path.is_file():
+        return None
+    return path
+
+
+def file_response(path: Path, accept_encoding: str, version: str = None) -> FileResponse:
+    rel = path.relative_to(STATIC_DIR.resolve()).as_posix()
+    entry = manifest().get(rel, {})
+    immutable = version is not None and version == entry.get("hash")
+    headers = {"Cache-Control": IMMUTABLE if immutable else REVALIDATE, "Vary": "Accept-Encoding"}
+    media_type = mimetypes.guess_type(path.name)[0] or "text/plain"
+    for encoding in ("br", "gzip"):
+        if encoding in entry and _accepts(accept_encoding, encoding):
+            headers["Content-Encoding"] = encoding
+            return FileResponse(entry[encoding], media_type=media_type, headers=headers)
+    return FileResponse(path, headers=headers)
+
+
+@lru_cache(maxsize=1)
+def _index_html() -> str:
+    html = (STATIC_DIR / "index.html").read_text(encoding="utf-8")
+    files = manifest()
+
+    def versioned(m):
+        rel = m.group(2)
+        if rel in files and rel != "sw.js":
+            return f'{m.group(1)}/static/{rel}?v={files[rel]["hash"]}"'
+        return m.group(0)
+
+    return re.sub(r'((?:src|href)=")/static/([^"?]+)"', versioned, html)
+
+
+def index_response() -> HTMLResponse:
+    return HTMLResponse(_index_html(), headers={"Cache-Control": REVALIDATE})
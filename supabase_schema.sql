@@ -5,6 +5,8 @@
 
 -- Enable UUID extension
 CREATE EXTENSION IF NOT EXISTS "pgcrypto";
+-- Trigram indexes for search
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
 
 -- Users table
 CREATE TABLE users (
@@ -23,6 +25,7 @@ CREATE TABLE expense_categories (
   name_lower VARCHAR(100) NOT NULL,
   is_active BOOLEAN DEFAULT TRUE,
   created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
   UNIQUE(user_id, name_lower)
 );
 
@@ -36,6 +39,7 @@ CREATE TABLE parties (
   notes TEXT,
   is_active BOOLEAN DEFAULT TRUE,
   created_at TIMESTAMPTZ DEFAULT NOW(),
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
   UNIQUE(user_id, name_lower)
 );
 
@@ -48,7 +52,10 @@ CREATE TABLE expenses (
   description TEXT,
   raw_voice_text TEXT,
   date DATE NOT NULL,
-  created_at TIMESTAMPTZ DEFAULT NOW()
+  client_ref VARCHAR(64),  -- idempotency key sent by bulk clients
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- part of the list keyset
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE(user_id, client_ref)
 );
 
 -- Ledger entries (party transactions)
@@ -67,17 +74,743 @@ CREATE TABLE ledger_entries (
   description TEXT,
   raw_voice_text TEXT,
   date DATE NOT NULL,
-  created_at TIMESTAMPTZ DEFAULT NOW()
+  client_ref VARCHAR(64),  -- idempotency key sent by bulk clients
+  created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),  -- part of the list keyset
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE(user_id, client_ref)
 );
 
 -- Indexes for performance
-CREATE INDEX idx_expenses_user_date ON expenses(user_id, date DESC);
+-- (date, created_at, id) is the keyset used by paginated list endpoints
+CREATE INDEX idx_expenses_user_date ON expenses(user_id, date DESC, created_at DESC, id DESC);
 CREATE INDEX idx_expenses_category ON expenses(category_id);
-CREATE INDEX idx_ledger_user_date ON ledger_entries(user_id, date DESC);
+CREATE INDEX idx_ledger_user_date ON ledger_entries(user_id, date DESC, created_at DESC, id DESC);
 CREATE INDEX idx_ledger_party ON ledger_entries(party_id, date DESC);
 CREATE INDEX idx_parties_user ON parties(user_id);
 CREATE INDEX idx_categories_user ON expense_categories(user_id);
 
+-- ============================================
+-- UPGRADES
+-- Columns added after the first release. New databases get them from the
+-- CREATE TABLE statements above. Existing databases: run this section
+-- (it is safe to run more than once).
+-- ============================================
+-- Idempotency keys for /api/expenses/bulk and /api/ledger/bulk. The unique
+-- indexes carry the names CREATE TABLE gives its UNIQUE constraints, so
+-- they are skipped where the constraint already exists.
+ALTER TABLE expenses ADD COLUMN IF NOT EXISTS client_ref VARCHAR(64);
+ALTER TABLE ledger_entries ADD COLUMN IF NOT EXISTS client_ref VARCHAR(64);
+CREATE UNIQUE INDEX IF NOT EXISTS expenses_user_id_client_ref_key ON expenses(user_id, client_ref);
+CREATE UNIQUE INDEX IF NOT EXISTS ledger_entries_user_id_client_ref_key ON ledger_entries(user_id, client_ref);
+-- Row timestamps kept by the touch triggers in DELTA SYNC (run that
+-- section after this one). Rows that predate the column get created_at.
+ALTER TABLE expense_categories ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE parties ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE expenses ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+ALTER TABLE ledger_entries ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ;
+UPDATE expense_categories SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE parties SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE expenses SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+UPDATE ledger_entries SET updated_at = COALESCE(created_at, NOW()) WHERE updated_at IS NULL;
+ALTER TABLE expense_categories ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE parties ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE expenses ALTER COLUMN updated_at SET DEFAULT NOW();
+ALTER TABLE ledger_entries ALTER COLUMN updated_at SET DEFAULT NOW();
+-- created_at is part of the (date, created_at, id) list keyset, and a NULL
+-- there would end up in a cursor that can never match
+UPDATE expenses SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;
+UPDATE ledger_entries SET created_at = COALESCE(updated_at, NOW()) WHERE created_at IS NULL;
+ALTER TABLE expenses ALTER COLUMN created_at SET NOT NULL;
+ALTER TABLE ledger_entries ALTER COLUMN created_at SET NOT NULL;
+
+-- ============================================
+-- DAILY ROLLUPS
+-- Per-user daily totals kept in sync with the raw rows by triggers, so
+-- dashboard / FY / category totals never scan a year of entries.
+-- Rows are kept (not deleted) when they drop to zero; updated_at moves on
+-- every write that touches the day.
+-- ============================================
+CREATE TABLE expense_daily_totals (
+  user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  date DATE NOT NULL,
+  category_id UUID,
+  total DECIMAL(14,2) NOT NULL DEFAULT 0,
+  entry_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE NULLS NOT DISTINCT (user_id, date, category_id)
+);
+
+CREATE TABLE ledger_daily_totals (
+  user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  date DATE NOT NULL,
+  party_id UUID,
+  entry_type VARCHAR(30) NOT NULL,
+  total DECIMAL(14,2) NOT NULL DEFAULT 0,
+  entry_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW(),
+  UNIQUE NULLS NOT DISTINCT (user_id, date, party_id, entry_type)
+);
+
+CREATE INDEX idx_ledger_daily_party ON ledger_daily_totals(user_id, party_id, date);
+
+CREATE OR REPLACE FUNCTION expense_rollup_add(
+  p_user_id UUID, p_date DATE, p_category_id UUID, p_amount NUMERIC, p_count INTEGER
+) RETURNS VOID LANGUAGE sql AS $$
+  INSERT INTO expense_daily_totals (user_id, date, category_id, total, entry_count)
+  VALUES (p_user_id, p_date, p_category_id, p_amount, p_count)
+  ON CONFLICT (user_id, date, category_id) DO UPDATE
+    SET total = expense_daily_totals.total + EXCLUDED.total,
+        entry_count = expense_daily_totals.entry_count + EXCLUDED.entry_count,
+        updated_at = clock_timestamp();
+$$;
+
+CREATE OR REPLACE FUNCTION ledger_rollup_add(
+  p_user_id UUID, p_date DATE, p_party_id UUID, p_entry_type VARCHAR,
+  p_amount NUMERIC, p_count INTEGER
+) RETURNS VOID LANGUAGE sql AS $$
+  INSERT INTO ledger_daily_totals (user_id, date, party_id, entry_type, total, entry_count)
+  VALUES (p_user_id, p_date, p_party_id, p_entry_type, p_amount, p_count)
+  ON CONFLICT (user_id, date, party_id, entry_type) DO UPDATE
+    SET total = ledger_daily_totals.total + EXCLUDED.total,
+        entry_count = ledger_daily_totals.entry_count + EXCLUDED.entry_count,
+        updated_at = clock_timestamp();
+$$;
+
+-- Running balance per party with the party report's rules:
+--   goods_sold +payable, payment_received / goods_returned -payable,
+--   payment_made +receivable, goods_taken -receivable.
+-- balance = payable - receivable (positive: the party owes us).
+CREATE TABLE party_balances (
+  party_id UUID PRIMARY KEY,
+  user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+  payable DECIMAL(14,2) NOT NULL DEFAULT 0,
+  receivable DECIMAL(14,2) NOT NULL DEFAULT 0,
+  balance DECIMAL(14,2) GENERATED ALWAYS AS (payable - receivable) STORED,
+  entry_count INTEGER NOT NULL DEFAULT 0,
+  updated_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_party_balances_user ON party_balances(user_id);
+
+CREATE OR REPLACE FUNCTION party_balance_add(
+  p_user_id UUID, p_party_id UUID, p_entry_type VARCHAR, p_amount NUMERIC, p_count INTEGER
+) RETURNS VOID LANGUAGE sql AS $$
+  INSERT INTO party_balances (party_id, user_id, payable, receivable, entry_count)
+  VALUES (
+    p_party_id, p_user_id,
+    CASE p_entry_type WHEN 'goods_sold' THEN p_amount
+                      WHEN 'payment_received' THEN -p_amount
+                      WHEN 'goods_returned' THEN -p_amount ELSE 0 END,
+    CASE p_entry_type WHEN 'payment_made' THEN p_amount
+                      WHEN 'goods_taken' THEN -p_amount ELSE 0 END,
+    p_count
+  )
+  ON CONFLICT (party_id) DO UPDATE
+    SET payable = party_balances.payable + EXCLUDED.payable,
+        receivable = party_balances.receivable + EXCLUDED.receivable,
+        entry_count = party_balances.entry_count + EXCLUDED.entry_count,
+        updated_at = clock_timestamp();
+$$;
+
+CREATE OR REPLACE FUNCTION expenses_rollup_trigger() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM expense_rollup_add(OLD.user_id, OLD.date, OLD.category_id, -OLD.amount, -1);
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM expense_rollup_add(NEW.user_id, NEW.date, NEW.category_id, NEW.amount, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION ledger_rollup_trigger() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP IN ('UPDATE', 'DELETE') THEN
+    PERFORM ledger_rollup_add(OLD.user_id, OLD.date, OLD.party_id, OLD.entry_type, -OLD.amount, -1);
+    IF OLD.party_id IS NOT NULL THEN
+      PERFORM party_balance_add(OLD.user_id, OLD.party_id, OLD.entry_type, -OLD.amount, -1);
+    END IF;
+  END IF;
+  IF TG_OP IN ('INSERT', 'UPDATE') THEN
+    PERFORM ledger_rollup_add(NEW.user_id, NEW.date, NEW.party_id, NEW.entry_type, NEW.amount, 1);
+    IF NEW.party_id IS NOT NULL THEN
+      PERFORM party_balance_add(NEW.user_id, NEW.party_id, NEW.entry_type, NEW.amount, 1);
+    END IF;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER expenses_rollup AFTER INSERT OR UPDATE OR DELETE ON expenses
+  FOR EACH ROW EXECUTE FUNCTION expenses_rollup_trigger();
+CREATE TRIGGER ledger_rollup AFTER INSERT OR UPDATE OR DELETE ON ledger_entries
+  FOR EACH ROW EXECUTE FUNCTION ledger_rollup_trigger();
+
+-- ============================================
+-- DELTA SYNC
+-- Every insert / update / delete on the synced tables appends to
+-- sync_changes, stamped with the writing transaction's id. A sync token is
+-- the oldest transaction still running when the client last synced
+-- (the snapshot xmin), so changes from transactions that commit late are
+-- picked up next time; a few changes may be sent twice, never skipped.
+-- ============================================
+CREATE TABLE sync_changes (
+  seq BIGSERIAL PRIMARY KEY,
+  user_id UUID NOT NULL,
+  table_name TEXT NOT NULL,
+  row_id UUID NOT NULL,
+  txid BIGINT NOT NULL DEFAULT pg_current_xact_id()::TEXT::BIGINT,
+  changed_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX idx_sync_changes_user ON sync_changes(user_id, txid);
+CREATE INDEX idx_sync_changes_time ON sync_changes(changed_at);
+
+CREATE OR REPLACE FUNCTION log_sync_change() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    INSERT INTO sync_changes (user_id, table_name, row_id) VALUES (OLD.user_id, TG_TABLE_NAME, OLD.id);
+  ELSE
+    INSERT INTO sync_changes (user_id, table_name, row_id) VALUES (NEW.user_id, TG_TABLE_NAME, NEW.id);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  NEW.updated_at := NOW();
+  RETURN NEW;
+END;
+$$;
+
+CREATE TRIGGER expense_categories_sync AFTER INSERT OR UPDATE OR DELETE ON expense_categories
+  FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+CREATE TRIGGER parties_sync AFTER INSERT OR UPDATE OR DELETE ON parties
+  FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+CREATE TRIGGER expenses_sync AFTER INSERT OR UPDATE OR DELETE ON expenses
+  FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+CREATE TRIGGER ledger_entries_sync AFTER INSERT OR UPDATE OR DELETE ON ledger_entries
+  FOR EACH ROW EXECUTE FUNCTION log_sync_change();
+
+CREATE TRIGGER expense_categories_touch BEFORE UPDATE ON expense_categories
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE TRIGGER parties_touch BEFORE UPDATE ON parties
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE TRIGGER expenses_touch BEFORE UPDATE ON expenses
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+CREATE TRIGGER ledger_entries_touch BEFORE UPDATE ON ledger_entries
+  FOR EACH ROW EXECUTE FUNCTION touch_updated_at();
+
+-- Changes after a token, oldest first, with each row's current state
+-- (data is NULL when the row has since been deleted). Also returns the
+-- snapshot xmin to use as the next token.
+CREATE OR REPLACE FUNCTION sync_changes_since(
+  p_user_id UUID, p_xmin BIGINT, p_after_seq BIGINT, p_limit INTEGER
+)
+RETURNS JSONB LANGUAGE sql STABLE AS $$
+  WITH c AS (
+    SELECT s.seq, s.table_name, s.row_id
+    FROM sync_changes s
+    WHERE s.user_id = p_user_id AND s.txid >= p_xmin AND s.seq > p_after_seq
+    ORDER BY s.seq
+    LIMIT p_limit
+  )
+  SELECT jsonb_build_object(
+    'xmin', pg_snapshot_xmin(pg_current_snapshot())::TEXT::BIGINT,
+    'changes', COALESCE(jsonb_agg(jsonb_build_object(
+      'seq', c.seq, 'table', c.table_name, 'id', c.row_id, 'data', d.data
+    ) ORDER BY c.seq), '[]'::JSONB)
+  )
+  FROM c
+  LEFT JOIN LATERAL (
+    SELECT to_jsonb(x) AS data FROM expenses x
+    WHERE c.table_name = 'expenses' AND x.id = c.row_id
+    UNION ALL
+    SELECT to_jsonb(x) FROM ledger_entries x
+    WHERE c.table_name = 'ledger_entries' AND x.id = c.row_id
+    UNION ALL
+    SELECT to_jsonb(x) FROM expense_categories x
+    WHERE c.table_name = 'expense_categories' AND x.id = c.row_id
+    UNION ALL
+    SELECT to_jsonb(x) FROM parties x
+    WHERE c.table_name = 'parties' AND x.id = c.row_id
+  ) d ON TRUE;
+$$;
+
+-- Drop change-log rows older than the sync retention window (schedule it,
+-- e.g. daily with pg_cron). Clients with older tokens do a full reload.
+CREATE OR REPLACE FUNCTION prune_sync_changes(p_days INTEGER DEFAULT 30)
+RETURNS BIGINT LANGUAGE sql AS $$
+  WITH d AS (DELETE FROM sync_changes WHERE changed_at < NOW() - make_interval(days => p_days) RETURNING 1)
+  SELECT COUNT(*) FROM d;
+$$;
+
+-- Rebuild rollups from raw rows (all users when p_user_id is NULL)
+CREATE OR REPLACE FUNCTION rebuild_daily_rollups(p_user_id UUID DEFAULT NULL)
+RETURNS VOID LANGUAGE plpgsql AS $$
+BEGIN
+  DELETE FROM expense_daily_totals WHERE p_user_id IS NULL OR user_id = p_user_id;
+  INSERT INTO expense_daily_totals (user_id, date, category_id, total, entry_count)
+  SELECT user_id, date, category_id, SUM(amount), COUNT(*)
+  FROM expenses WHERE p_user_id IS NULL OR user_id = p_user_id
+  GROUP BY user_id, date, category_id;
+
+  DELETE FROM ledger_daily_totals WHERE p_user_id IS NULL OR user_id = p_user_id;
+  INSERT INTO ledger_daily_totals (user_id, date, party_id, entry_type, total, entry_count)
+  SELECT user_id, date, party_id, entry_type, SUM(amount), COUNT(*)
+  FROM ledger_entries WHERE p_user_id IS NULL OR user_id = p_user_id
+  GROUP BY user_id, date, party_id, entry_type;
+
+  DELETE FROM party_balances WHERE p_user_id IS NULL OR user_id = p_user_id;
+  PERFORM party_balance_add(user_id, party_id, entry_type, SUM(amount), COUNT(*)::INTEGER)
+  FROM ledger_entries
+  WHERE (p_user_id IS NULL OR user_id = p_user_id) AND party_id IS NOT NULL
+  GROUP BY user_id, party_id, entry_type;
+END;
+$$;
+
+-- Rows where the rollup disagrees with the raw tables (empty = consistent)
+CREATE OR REPLACE FUNCTION verify_daily_rollups(p_user_id UUID DEFAULT NULL)
+RETURNS TABLE (
+  kind TEXT, user_id UUID, date DATE, key_id UUID, entry_type VARCHAR,
+  rollup_total NUMERIC, raw_total NUMERIC, rollup_count BIGINT, raw_count BIGINT
+) LANGUAGE sql STABLE AS $$
+  WITH r AS (
+    SELECT t.user_id, t.date, t.category_id, t.total, t.entry_count
+    FROM expense_daily_totals t
+    WHERE (p_user_id IS NULL OR t.user_id = p_user_id) AND t.entry_count <> 0
+  ), x AS (
+    SELECT e.user_id, e.date, e.category_id, SUM(e.amount) AS total, COUNT(*) AS entry_count
+    FROM expenses e WHERE p_user_id IS NULL OR e.user_id = p_user_id
+    GROUP BY e.user_id, e.date, e.category_id
+  )
+  SELECT 'expense', COALESCE(r.user_id, x.user_id), COALESCE(r.date, x.date),
+         COALESCE(r.category_id, x.category_id), NULL::VARCHAR,
+         COALESCE(r.total, 0), COALESCE(x.total, 0),
+         COALESCE(r.entry_count, 0)::BIGINT, COALESCE(x.entry_count, 0)
+  FROM r FULL OUTER JOIN x
+    ON r.user_id = x.user_id AND r.date = x.date
+   AND r.category_id IS NOT DISTINCT FROM x.category_id
+  WHERE COALESCE(r.total, 0) <> COALESCE(x.total, 0)
+     OR COALESCE(r.entry_count, 0) <> COALESCE(x.entry_count, 0)
+  UNION ALL
+  SELECT 'ledger', COALESCE(r.user_id, x.user_id), COALESCE(r.date, x.date),
+         COALESCE(r.party_id, x.party_id), COALESCE(r.entry_type, x.entry_type),
+         COALESCE(r.total, 0), COALESCE(x.total, 0),
+         COALESCE(r.entry_count, 0)::BIGINT, COALESCE(x.entry_count, 0)
+  FROM (
+    SELECT t.user_id, t.date, t.party_id, t.entry_type, t.total, t.entry_count
+    FROM ledger_daily_totals t
+    WHERE (p_user_id IS NULL OR t.user_id = p_user_id) AND t.entry_count <> 0
+  ) r FULL OUTER JOIN (
+    SELECT l.user_id, l.date, l.party_id, l.entry_type, SUM(l.amount) AS total, COUNT(*) AS entry_count
+    FROM ledger_entries l WHERE p_user_id IS NULL OR l.user_id = p_user_id
+    GROUP BY l.user_id, l.date, l.party_id, l.entry_type
+  ) x
+    ON r.user_id = x.user_id AND r.date = x.date
+   AND r.party_id IS NOT DISTINCT FROM x.party_id AND r.entry_type = x.entry_type
+  WHERE COALESCE(r.total, 0) <> COALESCE(x.total, 0)
+     OR COALESCE(r.entry_count, 0) <> COALESCE(x.entry_count, 0)
+  UNION ALL
+  SELECT 'balance', COALESCE(r.user_id, x.user_id), NULL::DATE,
+         COALESCE(r.party_id, x.party_id), NULL::VARCHAR,
+         COALESCE(r.balance, 0), COALESCE(x.balance, 0),
+         COALESCE(r.entry_count, 0)::BIGINT, COALESCE(x.entry_count, 0)
+  FROM (
+    SELECT b.user_id, b.party_id, b.balance, b.entry_count
+    FROM party_balances b
+    WHERE (p_user_id IS NULL OR b.user_id = p_user_id) AND b.entry_count <> 0
+  ) r FULL OUTER JOIN (
+    SELECT l.user_id, l.party_id, COUNT(*) AS entry_count,
+           SUM(CASE WHEN l.entry_type = 'goods_sold' THEN l.amount
+                    WHEN l.entry_type IN ('payment_received', 'goods_returned', 'payment_made') THEN -l.amount
+                    WHEN l.entry_type = 'goods_taken' THEN l.amount ELSE 0 END) AS balance
+    FROM ledger_entries l
+    WHERE (p_user_id IS NULL OR l.user_id = p_user_id) AND l.party_id IS NOT NULL
+    GROUP BY l.user_id, l.party_id
+  ) x ON r.party_id = x.party_id
+  WHERE COALESCE(r.balance, 0) <> COALESCE(x.balance, 0)
+     OR COALESCE(r.entry_count, 0) <> COALESCE(x.entry_count, 0);
+$$;
+
+-- Dashboard totals: today / month / FY expense sums in one round trip
+CREATE OR REPLACE FUNCTION dashboard_totals(
+  p_user_id UUID, p_today DATE, p_month_start DATE, p_fy_start DATE
+)
+RETURNS TABLE (today_total NUMERIC, month_total NUMERIC, fy_total NUMERIC)
+LANGUAGE sql STABLE AS $$
+  SELECT
+    COALESCE(SUM(total) FILTER (WHERE date = p_today), 0),
+    COALESCE(SUM(total) FILTER (WHERE date >= p_month_start), 0),
+    COALESCE(SUM(total), 0)
+  FROM expense_daily_totals
+  WHERE user_id = p_user_id AND date >= p_fy_start AND date <= p_today;
+$$;
+
+-- Category-wise totals for a date range (feeds the report summary sheet)
+CREATE OR REPLACE FUNCTION expense_category_summary(
+  p_user_id UUID, p_from DATE, p_to DATE
+)
+RETURNS TABLE (category_id UUID, category_name TEXT, entry_count BIGINT, total NUMERIC)
+LANGUAGE sql STABLE AS $$
+  SELECT t.category_id, COALESCE(c.name, '')::TEXT, SUM(t.entry_count)::BIGINT, SUM(t.total)
+  FROM expense_daily_totals t
+  LEFT JOIN expense_categories c ON c.id = t.category_id
+  WHERE t.user_id = p_user_id AND t.date BETWEEN p_from AND p_to
+  GROUP BY t.category_id, c.name
+  HAVING SUM(t.entry_count) > 0
+  ORDER BY SUM(t.total) DESC;
+$$;
+
+-- Bucketed totals for the analytics API, read from the daily rollups.
+-- p_source: 'expenses' | 'ledger'; p_group: 'category' | 'party' |
+-- 'entry_type' | 'none'; p_bucket: 'day' | 'week' | 'month' | 'fy'
+-- (weeks start Monday, financial years on April 1).
+CREATE OR REPLACE FUNCTION analytics_series(
+  p_user_id UUID, p_source TEXT, p_group TEXT, p_bucket TEXT, p_from DATE, p_to DATE
+)
+RETURNS TABLE (bucket DATE, group_id UUID, group_name TEXT, total NUMERIC, entry_count BIGINT)
+LANGUAGE sql STABLE AS $$
+  WITH src AS (
+    SELECT t.date, t.category_id AS key_id, NULL::VARCHAR AS entry_type, t.total, t.entry_count
+    FROM expense_daily_totals t
+    WHERE p_source = 'expenses' AND t.user_id = p_user_id AND t.date BETWEEN p_from AND p_to
+    UNION ALL
+    SELECT t.date, t.party_id, t.entry_type, t.total, t.entry_count
+    FROM ledger_daily_totals t
+    WHERE p_source = 'ledger' AND t.user_id = p_user_id AND t.date BETWEEN p_from AND p_to
+  ), agg AS (
+    SELECT
+      CASE p_bucket
+        WHEN 'day' THEN s.date
+        WHEN 'week' THEN date_trunc('week', s.date)::DATE
+        WHEN 'month' THEN date_trunc('month', s.date)::DATE
+        ELSE make_date(EXTRACT(YEAR FROM s.date)::INT - (EXTRACT(MONTH FROM s.date) < 4)::INT, 4, 1)
+      END AS bucket,
+      CASE WHEN p_group IN ('category', 'party') THEN s.key_id END AS group_id,
+      CASE WHEN p_group = 'entry_type' THEN s.entry_type END AS group_key,
+      SUM(s.total) AS total, SUM(s.entry_count)::BIGINT AS entry_count
+    FROM src s
+    GROUP BY 1, 2, 3
+    HAVING SUM(s.entry_count) > 0
+  )
+  SELECT a.bucket, a.group_id,
+         COALESCE(a.group_key, c.name, p.name, '')::TEXT, a.total, a.entry_count
+  FROM agg a
+  LEFT JOIN expense_categories c ON p_group = 'category' AND c.id = a.group_id
+  LEFT JOIN parties p ON p_group = 'party' AND p.id = a.group_id
+  ORDER BY a.bucket, a.total DESC;
+$$;
+
+-- Party balances sorted by outstanding amount. Without dates this is the
+-- party_balances table as is. With a range, opening / closing balances are
+-- worked back from the current balance using only the daily rollup rows
+-- on or after the range start, so recent ranges stay cheap.
+CREATE OR REPLACE FUNCTION party_balance_list(
+  p_user_id UUID, p_from DATE DEFAULT NULL, p_to DATE DEFAULT NULL, p_party_id UUID DEFAULT NULL
+)
+RETURNS TABLE (
+  party_id UUID, party_name TEXT, opening NUMERIC, payable NUMERIC,
+  receivable NUMERIC, balance NUMERIC, entry_count BIGINT
+) LANGUAGE sql STABLE AS $$
+  WITH moves AS (
+    SELECT t.party_id,
+      SUM(CASE t.entry_type WHEN 'goods_sold' THEN t.total
+                            WHEN 'payment_received' THEN -t.total
+                            WHEN 'goods_returned' THEN -t.total ELSE 0 END)
+        FILTER (WHERE t.date BETWEEN COALESCE(p_from, '-infinity') AND COALESCE(p_to, 'infinity')) AS payable,
+      SUM(CASE t.entry_type WHEN 'payment_made' THEN t.total
+                            WHEN 'goods_taken' THEN -t.total ELSE 0 END)
+        FILTER (WHERE t.date BETWEEN COALESCE(p_from, '-infinity') AND COALESCE(p_to, 'infinity')) AS receivable,
+      SUM(t.entry_count)
+        FILTER (WHERE t.date BETWEEN COALESCE(p_from, '-infinity') AND COALESCE(p_to, 'infinity')) AS entry_count,
+      SUM(CASE WHEN t.entry_type = 'goods_sold' THEN t.total
+               WHEN t.entry_type = 'goods_taken' THEN t.total ELSE -t.total END)
+        FILTER (WHERE t.date >= COALESCE(p_from, '-infinity')) AS since_from,
+      SUM(CASE WHEN t.entry_type = 'goods_sold' THEN t.total
+               WHEN t.entry_type = 'goods_taken' THEN t.total ELSE -t.total END)
+        FILTER (WHERE t.date > COALESCE(p_to, 'infinity')) AS after_to
+    FROM ledger_daily_totals t
+    WHERE t.user_id = p_user_id AND (p_from IS NOT NULL OR p_to IS NOT NULL)
+      AND (p_party_id IS NULL OR t.party_id = p_party_id)
+      AND t.date >= LEAST(COALESCE(p_from, '-infinity'), COALESCE(p_to + 1, 'infinity'))
+    GROUP BY t.party_id
+  ), rows AS (
+    SELECT p.id AS party_id, p.name::TEXT AS party_name,
+      CASE WHEN p_from IS NULL THEN 0
+           ELSE COALESCE(b.balance, 0) - COALESCE(m.since_from, 0) END AS opening,
+      CASE WHEN p_from IS NULL AND p_to IS NULL THEN COALESCE(b.payable, 0)
+           ELSE COALESCE(m.payable, 0) END AS payable,
+      CASE WHEN p_from IS NULL AND p_to IS NULL THEN COALESCE(b.receivable, 0)
+           ELSE COALESCE(m.receivable, 0) END AS receivable,
+      COALESCE(b.balance, 0) - COALESCE(m.after_to, 0) AS balance,
+      CASE WHEN p_from IS NULL AND p_to IS NULL THEN COALESCE(b.entry_count, 0)
+           ELSE COALESCE(m.entry_count, 0) END::BIGINT AS entry_count
+    FROM parties p
+    LEFT JOIN party_balances b ON b.party_id = p.id
+    LEFT JOIN moves m ON m.party_id = p.id
+    WHERE p.user_id = p_user_id AND p.is_active
+      AND (p_party_id IS NULL OR p.id = p_party_id)
+  )
+  SELECT * FROM rows ORDER BY ABS(balance) DESC, party_name;
+$$;
+
+-- Report cache version: changes whenever any row in the range is written
+-- (rollup rows are kept at zero and their updated_at bumps on every write),
+-- or a category / the party whose name the report shows is renamed
+CREATE OR REPLACE FUNCTION report_data_version(
+  p_user_id UUID, p_kind TEXT, p_from DATE, p_to DATE, p_party_id UUID DEFAULT NULL
+)
+RETURNS TEXT LANGUAGE sql STABLE AS $$
+  SELECT COALESCE(MAX(updated_at)::TEXT, '-') || '/' || COUNT(*) || '/' || COALESCE(SUM(entry_count), 0)
+    || '/' || COALESCE((
+      SELECT MAX(n.updated_at)::TEXT FROM (
+        SELECT updated_at FROM expense_categories WHERE p_kind = 'expenses' AND user_id = p_user_id
+        UNION ALL
+        SELECT updated_at FROM parties WHERE p_kind = 'party' AND id = p_party_id
+      ) n), '-')
+  FROM (
+    SELECT updated_at, entry_count FROM expense_daily_totals
+    WHERE p_kind = 'expenses' AND user_id = p_user_id AND date BETWEEN p_from AND p_to
+    UNION ALL
+    SELECT updated_at, entry_count FROM ledger_daily_totals
+    WHERE p_kind = 'party' AND user_id = p_user_id AND party_id = p_party_id
+      AND date BETWEEN p_from AND p_to
+  ) t;
+$$;
+
+-- Bulk updates: one statement for many rows. p_rows is a JSON array of
+-- objects with "id" plus the fields to change; absent fields are kept.
+CREATE OR REPLACE FUNCTION bulk_update_expenses(p_user_id UUID, p_rows JSONB)
+RETURNS SETOF UUID LANGUAGE sql AS $$
+  UPDATE expenses e SET
+    category_id = COALESCE((r->>'category_id')::UUID, e.category_id),
+    amount = COALESCE((r->>'amount')::DECIMAL, e.amount),
+    description = COALESCE(r->>'description', e.description),
+    date = COALESCE((r->>'date')::DATE, e.date)
+  FROM jsonb_array_elements(p_rows) r
+  WHERE e.id = (r->>'id')::UUID AND e.user_id = p_user_id
+  RETURNING e.id;
+$$;
+
+CREATE OR REPLACE FUNCTION bulk_update_ledger_entries(p_user_id UUID, p_rows JSONB)
+RETURNS SETOF UUID LANGUAGE sql AS $$
+  UPDATE ledger_entries l SET
+    party_id = COALESCE((r->>'party_id')::UUID, l.party_id),
+    entry_type = COALESCE(r->>'entry_type', l.entry_type),
+    item_name = COALESCE(r->>'item_name', l.item_name),
+    quantity = COALESCE((r->>'quantity')::DECIMAL, l.quantity),
+    unit = COALESCE(r->>'unit', l.unit),
+    rate = COALESCE((r->>'rate')::DECIMAL, l.rate),
+    amount = COALESCE((r->>'amount')::DECIMAL, l.amount),
+    description = COALESCE(r->>'description', l.description),
+    date = COALESCE((r->>'date')::DATE, l.date)
+  FROM jsonb_array_elements(p_rows) r
+  WHERE l.id = (r->>'id')::UUID AND l.user_id = p_user_id
+  RETURNING l.id;
+$$;
+
+-- ============================================
+-- SEARCH
+-- entry_search holds one phonetic key per expense / ledger entry (its
+-- description, item name, voice text and category / party name), kept in
+-- sync by triggers and indexed by trigrams, so a word is found with an
+-- index scan instead of an ILIKE over every row. Existing databases: run
+-- this section, then SELECT rebuild_entry_search();
+-- ============================================
+-- Spelling-insensitive search key, word by word; mirrors voice_rules.phonetic_key
+-- (Devanagari is romanized first), so "Sharmaji", "sharma jee" and "शर्मा जी"
+-- all contain "sarma".
+CREATE OR REPLACE FUNCTION hinglish_key(p_text TEXT) RETURNS TEXT
+LANGUAGE plpgsql IMMUTABLE PARALLEL SAFE AS $$
+DECLARE
+  consonants CONSTANT JSONB := '{"क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n", "च": "ch", "छ": "chh",
+    "ज": "j", "झ": "jh", "ञ": "n", "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n", "त": "t", "थ": "th",
+    "द": "d", "ध": "dh", "न": "n", "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m", "य": "y", "र": "r",
+    "ल": "l", "व": "v", "श": "sh", "ष": "sh", "स": "s", "ह": "h"}';
+  others CONSTANT JSONB := '{"अ": "a", "आ": "aa", "इ": "i", "ई": "ee", "उ": "u", "ऊ": "oo", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o", "ं": "n", "ँ": "n", "ः": "h"}';
+  matras CONSTANT JSONB := '{"ा": "aa", "ि": "i", "ी": "ee", "ु": "u", "ू": "oo", "ृ": "ri", "े": "e",
+    "ै": "ai", "ो": "o", "ौ": "au", "ॅ": "e", "ॉ": "o"}';
+  latin TEXT := '';
+  pending_a BOOLEAN := FALSE;
+  ch TEXT;
+  w TEXT;
+  keys TEXT[] := '{}';
+BEGIN
+  IF p_text IS NULL THEN
+    RETURN '';
+  END IF;
+  IF p_text ~ '[ऀ-ॿ]' THEN
+    FOREACH ch IN ARRAY regexp_split_to_array(translate(p_text, '०१२३४५६७८९', '0123456789'), '') LOOP
+      CONTINUE WHEN ch = '़';
+      IF matras ? ch THEN
+        latin := latin || (matras ->> ch);
+        pending_a := FALSE;
+      ELSIF ch = '्' THEN
+        pending_a := FALSE;
+      ELSE
+        IF pending_a AND consonants ? ch THEN
+          latin := latin || 'a';
+        END IF;
+        pending_a := consonants ? ch;
+        latin := latin || COALESCE(consonants ->> ch, others ->> ch, ch);
+      END IF;
+    END LOOP;
+  ELSE
+    latin := p_text;
+  END IF;
+
+  FOREACH w IN ARRAY regexp_split_to_array(lower(latin), '[\s,.!?।]+') LOOP
+    w := regexp_replace(w, '[^a-z0-9]', '', 'g');
+    CONTINUE WHEN w = '';
+    w := replace(replace(replace(replace(replace(replace(replace(replace(
+         replace(replace(replace(replace(replace(replace(replace(replace(w,
+         'aa', 'a'), 'ee', 'i'), 'oo', 'u'), 'ph', 'f'), 'sh', 's'), 'kh', 'k'),
+         'gh', 'g'), 'bh', 'b'), 'dh', 'd'), 'th', 't'), 'ch', 'c'), 'jh', 'j'),
+         'w', 'v'), 'z', 'j'), 'q', 'k'), 'y', 'i');
+    w := regexp_replace(w, '([a-z])\1+', '\1', 'g');
+    w := regexp_replace(w, '(?<=[aeiou][^aeiou0-9])a(?=[^aeiou0-9][aeiou])', '', 'g');
+    keys := keys || w;
+  END LOOP;
+  RETURN array_to_string(keys, ' ');
+END;
+$$;
+
+CREATE TABLE entry_search (
+  entry_id UUID PRIMARY KEY,
+  user_id UUID NOT NULL,
+  source VARCHAR(10) NOT NULL,  -- 'expenses' | 'ledger'
+  date DATE NOT NULL,
+  created_at TIMESTAMPTZ,
+  search_key TEXT NOT NULL
+);
+
+CREATE INDEX idx_entry_search_key ON entry_search USING gin (search_key gin_trgm_ops);
+-- Newest first, for words common enough that scanning recent rows beats the trigram index
+CREATE INDEX idx_entry_search_user_date ON entry_search(user_id, date DESC, created_at DESC, entry_id DESC);
+
+CREATE OR REPLACE FUNCTION entry_search_trigger() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_OP = 'DELETE' THEN
+    DELETE FROM entry_search WHERE entry_id = OLD.id;
+  ELSIF TG_TABLE_NAME = 'expenses' THEN
+    IF TG_OP = 'UPDATE' AND (NEW.description, NEW.raw_voice_text, NEW.category_id, NEW.date)
+        IS NOT DISTINCT FROM (OLD.description, OLD.raw_voice_text, OLD.category_id, OLD.date) THEN
+      RETURN NULL;
+    END IF;
+    INSERT INTO entry_search (entry_id, user_id, source, date, created_at, search_key)
+    SELECT NEW.id, NEW.user_id, 'expenses', NEW.date, NEW.created_at,
+           hinglish_key(concat_ws(' ', NEW.description, NEW.raw_voice_text,
+                                  (SELECT c.name FROM expense_categories c WHERE c.id = NEW.category_id)))
+    ON CONFLICT (entry_id) DO UPDATE SET date = EXCLUDED.date, search_key = EXCLUDED.search_key;
+  ELSE
+    IF TG_OP = 'UPDATE' AND (NEW.description, NEW.item_name, NEW.raw_voice_text, NEW.party_id, NEW.date)
+        IS NOT DISTINCT FROM (OLD.description, OLD.item_name, OLD.raw_voice_text, OLD.party_id, OLD.date) THEN
+      RETURN NULL;
+    END IF;
+    INSERT INTO entry_search (entry_id, user_id, source, date, created_at, search_key)
+    SELECT NEW.id, NEW.user_id, 'ledger', NEW.date, NEW.created_at,
+           hinglish_key(concat_ws(' ', NEW.description, NEW.item_name, NEW.raw_voice_text,
+                                  (SELECT p.name FROM parties p WHERE p.id = NEW.party_id)))
+    ON CONFLICT (entry_id) DO UPDATE SET date = EXCLUDED.date, search_key = EXCLUDED.search_key;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Renaming a category / party re-keys its entries
+CREATE OR REPLACE FUNCTION entry_search_rename_trigger() RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF TG_TABLE_NAME = 'expense_categories' THEN
+    UPDATE entry_search s
+    SET search_key = hinglish_key(concat_ws(' ', e.description, e.raw_voice_text, NEW.name))
+    FROM expenses e
+    WHERE e.category_id = NEW.id AND s.entry_id = e.id;
+  ELSE
+    UPDATE entry_search s
+    SET search_key = hinglish_key(concat_ws(' ', l.description, l.item_name, l.raw_voice_text, NEW.name))
+    FROM ledger_entries l
+    WHERE l.party_id = NEW.id AND s.entry_id = l.id;
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+CREATE TRIGGER expenses_search AFTER INSERT OR UPDATE OR DELETE ON expenses
+  FOR EACH ROW EXECUTE FUNCTION entry_search_trigger();
+CREATE TRIGGER ledger_entries_search AFTER INSERT OR UPDATE OR DELETE ON ledger_entries
+  FOR EACH ROW EXECUTE FUNCTION entry_search_trigger();
+CREATE TRIGGER expense_categories_search AFTER UPDATE OF name ON expense_categories
+  FOR EACH ROW WHEN (NEW.name IS DISTINCT FROM OLD.name) EXECUTE FUNCTION entry_search_rename_trigger();
+CREATE TRIGGER parties_search AFTER UPDATE OF name ON parties
+  FOR EACH ROW WHEN (NEW.name IS DISTINCT FROM OLD.name) EXECUTE FUNCTION entry_search_rename_trigger();
+
+-- Recompute search keys from the raw rows (all users when p_user_id is NULL)
+CREATE OR REPLACE FUNCTION rebuild_entry_search(p_user_id UUID DEFAULT NULL)
+RETURNS VOID LANGUAGE sql AS $$
+  DELETE FROM entry_search WHERE p_user_id IS NULL OR user_id = p_user_id;
+  INSERT INTO entry_search (entry_id, user_id, source, date, created_at, search_key)
+  SELECT e.id, e.user_id, 'expenses', e.date, e.created_at,
+         hinglish_key(concat_ws(' ', e.description, e.raw_voice_text, c.name))
+  FROM expenses e LEFT JOIN expense_categories c ON c.id = e.category_id
+  WHERE p_user_id IS NULL OR e.user_id = p_user_id
+  UNION ALL
+  SELECT l.id, l.user_id, 'ledger', l.date, l.created_at,
+         hinglish_key(concat_ws(' ', l.description, l.item_name, l.raw_voice_text, p.name))
+  FROM ledger_entries l LEFT JOIN parties p ON p.id = l.party_id
+  WHERE p_user_id IS NULL OR l.user_id = p_user_id;
+$$;
+
+-- Ranked search. p_keys are the query's phonetic keys, longest first
+-- (voice_rules.search_keys); an entry matches when its key contains every
+-- one. The newest 1000 matches are ranked by trigram word similarity to the
+-- query (ties newest first), which bounds the work for common words; only
+-- the returned page is read from the entry tables.
+CREATE OR REPLACE FUNCTION search_entries(
+  p_user_id UUID, p_keys TEXT[], p_source TEXT DEFAULT NULL,
+  p_limit INTEGER DEFAULT 50, p_offset INTEGER DEFAULT 0
+)
+RETURNS TABLE (
+  source TEXT, id UUID, date DATE, created_at TIMESTAMPTZ, amount NUMERIC, entry_type TEXT,
+  item_name TEXT, quantity NUMERIC, unit TEXT, rate NUMERIC, description TEXT, raw_voice_text TEXT,
+  category_id UUID, party_id UUID, name TEXT, rank REAL
+) LANGUAGE sql STABLE AS $$
+  WITH hits AS (
+    SELECT s.entry_id, s.source, s.date, s.created_at, s.search_key
+    FROM entry_search s
+    WHERE s.user_id = p_user_id
+      AND s.search_key LIKE '%' || p_keys[1] || '%'
+      AND (p_source IS NULL OR s.source = p_source)
+      AND NOT EXISTS (SELECT 1 FROM unnest(p_keys[2:]) k WHERE strpos(s.search_key, k) = 0)
+    ORDER BY s.date DESC, s.created_at DESC, s.entry_id DESC
+    LIMIT 1000
+  ), page AS (
+    SELECT h.*, word_similarity(array_to_string(p_keys, ' '), h.search_key) AS rank
+    FROM hits h
+    ORDER BY rank DESC, h.date DESC, h.created_at DESC, h.entry_id DESC
+    LIMIT p_limit OFFSET p_offset
+  )
+  SELECT r.source::TEXT, r.entry_id, r.date, r.created_at, COALESCE(e.amount, l.amount),
+         l.entry_type::TEXT, l.item_name::TEXT, l.quantity, l.unit::TEXT, l.rate,
+         COALESCE(e.description, l.description), COALESCE(e.raw_voice_text, l.raw_voice_text),
+         e.category_id, l.party_id, COALESCE(c.name, p.name)::TEXT, r.rank
+  FROM page r
+  LEFT JOIN expenses e ON r.source = 'expenses' AND e.id = r.entry_id
+  LEFT JOIN expense_categories c ON c.id = e.category_id
+  LEFT JOIN ledger_entries l ON r.source = 'ledger' AND l.id = r.entry_id
+  LEFT JOIN parties p ON p.id = l.party_id
+  ORDER BY r.rank DESC, r.date DESC, r.created_at DESC, r.entry_id DESC;
+$$;
+
 -- You'll set the actual password via the app or update this hash
 INSERT INTO users (username, password_hash, display_name)
 VALUES ('admin', '$2a$12$GnN7spwpMhkuRDluqvDSEOQBD.OenUraAQwjWVtTrTQlER/GH7HEm', 'Admin');
@@ -0,0 +1,43 @@
+"""Run the app in-process against the in-memory Supabase and OpenAI fakes."""
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "benchmarks"))
+
+import fakes
+
+fakes.offline_env()
+
+import auth
+import main as server
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture
+def store():
+    return fakes.FakeSupabase()
+
+
+@pytest.fixture
+def client(store, tmp_path):
+    fakes.install(store, fakes.FakeOpenAI(whisper_latency=0.01, gpt_latency=0.01))
+    cwd = os.getcwd()
+    os.chdir(tmp_path)  # reports and other files the app writes
+    try:
+        with TestClient(server.app) as c:
+            yield c
+    finally:
+        os.chdir(cwd)
+
+
+@pytest.fixture
+def user(store):
+    u = fakes.seed(store, users=1, expenses=20, ledger=20, days=30)[0]
+    token = auth.create_access_token({"user_id": u["id"], "username": u["username"]})
+    u["headers"] = {"Authorization": f"Bearer {token}"}
+    return u
@@ -0,0 +1,15 @@
+import ai_parser
+
+
+def _key(text: str) -> str:
+    return ai_parser._parse_cache_key(text, ["Petrol"], ["Ramesh"])
+
+
+def test_cache_key_keeps_devanagari_vowel_signs():
+    assert _key("रमेश को पचास रुपये दिए") != _key("रमेश को पचीस रुपये दिए")
+    assert _key("लिया") != _key("लाया")
+
+
+def test_cache_key_ignores_case_and_punctuation():
+    assert _key("Ramesh ko 500 diye!") == _key("  ramesh ko, 500 diye ")
+    assert _key("रमेश को पचास रुपये दिए।") == _key("रमेश को पचास रुपये दिए")
@@ -0,0 +1,50 @@
+def _expense(user, ref, **fields):
+    return {"client_ref": ref, "category_id": user["category_ids"][0], "amount": 100,
+            "date": "2026-10-01", **fields}
+
+
+def _bulk(client, user, **body):
+    r = client.post("/api/expenses/bulk", json=body, headers=user["headers"])
+    assert r.status_code == 200
+    return r.json()
+
+
+def test_retried_create_is_reported_as_duplicate(client, user, store):
+    before = len(client.get("/api/expenses?limit=500", headers=user["headers"]).json()["items"])
+    first = _bulk(client, user, create=[_expense(user, "a1"), _expense(user, "a2")])
+    assert [c["status"] for c in first["create"]] == ["created", "created"]
+    again = _bulk(client, user, create=[_expense(user, "a1"), _expense(user, "a2")])
+    assert [c["status"] for c in again["create"]] == ["duplicate", "duplicate"]
+    assert [c["id"] for c in again["create"]] == [c["id"] for c in first["create"]]
+    after = len(client.get("/api/expenses?limit=500", headers=user["headers"]).json()["items"])
+    assert after == before + 2
+
+
+def test_repeated_client_ref_in_one_batch(client, user):
+    out = _bulk(client, user, create=[_expense(user, "b1"), _expense(user, "b1", amount=5)])
+    assert out["create"][0]["status"] == "created"
+    assert out["create"][1] == {"index": 1, "client_ref": "b1", "status": "error",
+                                "error": "Repeated client_ref in batch"}
+
+
+def test_partial_failure_only_fails_bad_items(client, user):
+    out = _bulk(client, user, create=[
+        _expense(user, "c1"),
+        _expense(user, "c2", amount="lots"),
+        _expense(user, "c3", category_id="00000000-0000-4000-8000-000000000000"),
+        _expense(user, "c4", date="yesterday"),
+    ])
+    assert [c["status"] for c in out["create"]] == ["created", "error", "error", "error"]
+    assert out["create"][2]["error"] == "Unknown category_id"
+
+
+def test_ids_match_in_any_uuid_spelling(client, user):
+    ids = [c["id"] for c in _bulk(client, user, create=[_expense(user, "d1"), _expense(user, "d2")])["create"]]
+    out = _bulk(client, user, update=[{"id": ids[0].upper(), "amount": 250}],
+                delete=["{" + ids[1] + "}"])
+    assert out["update"][0]["status"] == "updated"
+    assert out["delete"][0]["status"] == "deleted"
+    missing = "00000000-0000-4000-8000-000000000000"
+    out = _bulk(client, user, update=[{"id": missing, "amount": 1}], delete=[missing])
+    assert out["update"][0]["status"] == "not_found"
+    assert out["delete"][0]["status"] == "not_found"
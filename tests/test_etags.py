@@ -0,0 +1,29 @@
+import main as server
+
+
+def test_matching_etag_gets_304(client, user):
+    r = client.get("/api/categories", headers=user["headers"])
+    assert r.status_code == 200
+    etag = r.headers["etag"]
+    r = client.get("/api/categories", headers={**user["headers"], "If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.headers["etag"] == etag
+
+
+def test_write_changes_etag(client, user):
+    etag = client.get("/api/categories", headers=user["headers"]).headers["etag"]
+    r = client.post("/api/categories", json={"name": "Tiffin"}, headers=user["headers"])
+    assert r.status_code == 200
+    r = client.get("/api/categories", headers={**user["headers"], "If-None-Match": etag})
+    assert r.status_code == 200
+    assert r.headers["etag"] != etag
+    assert "Tiffin" in [c["name"] for c in r.json()]
+
+
+def test_no_etags_without_shared_versions(client, user, monkeypatch):
+    monkeypatch.setattr(server, "ETAGS_ENABLED", False)
+    r = client.get("/api/categories", headers=user["headers"])
+    assert r.status_code == 200
+    assert "etag" not in r.headers
+    r = client.get("/api/categories", headers={**user["headers"], "If-None-Match": '"x"'})
+    assert r.status_code == 200
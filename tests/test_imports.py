@@ -0,0 +1,43 @@
+import time
+
+import main as server
+
+
+def _import(client, user, csv_text: str, kind: str = "expenses") -> dict:
+    r = client.post("/api/imports", data={"kind": kind}, headers=user["headers"],
+                    files={"file": ("old.csv", csv_text.encode(), "text/csv")})
+    assert r.status_code == 200
+    job_id = r.json()["job_id"]
+    for _ in range(200):
+        job = client.get(f"/api/imports/{job_id}", headers=user["headers"]).json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("import did not finish")
+
+
+def test_deleted_category_is_reactivated(client, user, store):
+    h = user["headers"]
+    deleted = client.get("/api/categories", headers=h).json()[0]
+    assert client.delete(f"/api/categories/{deleted['id']}", headers=h).status_code == 200
+    assert deleted["id"] not in [c["id"] for c in client.get("/api/categories", headers=h).json()]
+
+    job = _import(client, user, f"date,amount,category\n2026-10-01,120,{deleted['name']}\n"
+                                f"2026-10-02,80,{deleted['name'].upper()}\n")
+    assert job["status"] == "done"
+    assert (job["inserted"], job["names_created"], job["names_reactivated"]) == (2, 0, 1)
+    assert deleted["id"] in [c["id"] for c in client.get("/api/categories", headers=h).json()]
+    imported = [e for e in store._by_id["expenses"].values() if (e.get("client_ref") or "").startswith("imp:")]
+    assert {e["category_id"] for e in imported} == {deleted["id"]}
+
+
+def test_oversized_import_rejected_before_parsing(client, user, monkeypatch):
+    saved = []
+    monkeypatch.setattr(server.imports, "IMPORT_MAX_MB", 0)
+    monkeypatch.setattr(server.imports, "save_upload", lambda *args: saved.append(args))
+    body = "date,amount,category\n" + "2026-10-01,120,Petrol\n" * 5000
+    r = client.post("/api/imports", data={"kind": "expenses"}, headers=user["headers"],
+                    files={"file": ("old.csv", body.encode(), "text/csv")})
+    assert r.status_code == 413
+    assert r.json()["detail"] == "Upload too large"
+    assert saved == []
@@ -0,0 +1,44 @@
+import uuid
+
+KEY = ("date", "created_at", "id")
+
+
+def _pages(client, user, limit: int) -> list:
+    pages, cursor = [], None
+    while True:
+        url = f"/api/expenses?limit={limit}" + (f"&cursor={cursor}" if cursor else "")
+        r = client.get(url, headers=user["headers"])
+        assert r.status_code == 200
+        pages.append(r.json())
+        cursor = pages[-1]["next_cursor"]
+        if not pages[-1]["has_more"]:
+            assert cursor is None
+            return pages
+
+
+def test_first_and_next_page(client, user):
+    pages = _pages(client, user, 7)
+    assert [len(p["items"]) for p in pages] == [7, 7, 6]
+    rows = [e for p in pages for e in p["items"]]
+    assert len({e["id"] for e in rows}) == 20
+    keys = [tuple(e[c] for c in KEY) for e in rows]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_bad_cursor_is_rejected(client, user):
+    for cursor in ("not-a-cursor", "WzEsMiwzXQ", "WyIyMDI2LTEwLTAxIl0"):  # [1,2,3] / one value
+        r = client.get(f"/api/expenses?cursor={cursor}", headers=user["headers"])
+        assert r.status_code == 400
+        assert r.json()["detail"] == "Invalid cursor"
+
+
+def test_created_at_ties_page_in_id_order(client, user, store):
+    ids = sorted((str(uuid.uuid4()) for _ in range(5)), reverse=True)
+    store.load("expenses", [
+        {"id": i, "user_id": user["id"], "category_id": user["category_ids"][0], "amount": 10,
+         "date": "2099-01-01", "created_at": "2099-01-01T00:00:00+00:00"} for i in ids
+    ])
+    pages = _pages(client, user, 2)
+    tied = [e["id"] for p in pages for e in p["items"] if e["date"] == "2099-01-01"]
+    assert tied == ids
+    assert len({e["id"] for p in pages for e in p["items"]}) == 25
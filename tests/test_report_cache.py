@@ -0,0 +1,30 @@
+import os
+import time
+
+import report_cache
+
+
+def _file(path, age_hours=0.0):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"x" * 1000)
+    mtime = time.time() - age_hours * 3600
+    os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_evict_leaves_reports_being_written(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_cache, "REPORTS_DIR", tmp_path)
+    monkeypatch.setattr(report_cache, "REPORT_CACHE_MAX_MB", 0)
+    done = _file(tmp_path / "u1" / "k1" / "expenses.xlsx")
+    writing = _file(tmp_path / "u1" / "k2" / "expenses.xlsxab12.part")
+    assert report_cache.evict() == 1
+    assert not done.exists()
+    assert writing.exists()
+
+
+def test_evict_removes_stale_part_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(report_cache, "REPORTS_DIR", tmp_path)
+    stale = _file(tmp_path / "u1" / "k1" / "expenses.xlsxab12.part",
+                  age_hours=report_cache.REPORT_CACHE_MAX_AGE_HOURS + 1)
+    report_cache.evict()
+    assert not stale.exists()
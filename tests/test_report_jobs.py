@@ -0,0 +1,53 @@
+from concurrent.futures import Future
+
+import pytest
+
+import report_jobs
+
+
+@pytest.fixture
+def shared(monkeypatch):
+    shared = {}
+    monkeypatch.setattr(report_jobs, "_shared", shared)
+    return shared
+
+
+def _job(monkeypatch, future) -> dict:
+    job = {"id": "j1", "user_id": "u1", "kind": "expenses", "status": "queued", "progress": 0,
+           "rows_total": 10, "filename": "f.xlsx", "path": "f.xlsx", "error": None, "future": future}
+    monkeypatch.setitem(report_jobs._jobs, "j1", job)
+    return job
+
+
+def test_cancel_drops_a_queued_job(shared, monkeypatch):
+    future = Future()
+    _job(monkeypatch, future)
+    assert report_jobs.cancel("j1", "u1")["status"] == "cancelled"
+    assert future.cancelled()
+    assert ("j1", "cancel") not in shared
+
+
+def test_cancel_flags_a_started_job_until_the_worker_exits(shared, monkeypatch):
+    future = Future()
+    future.set_running_or_notify_cancel()  # handed to a worker: cancel() can't stop it
+    job = _job(monkeypatch, future)
+    job["status"] = "running"
+    assert report_jobs.cancel("j1", "u1")["status"] == "running"
+    assert shared[("j1", "cancel")] is True
+
+    def build(spec, job_id):
+        assert shared[("j1", "cancel")] is True  # still visible while the build runs
+        raise report_jobs.JobCancelled()
+
+    monkeypatch.setattr(report_jobs, "build_report", build)
+    with pytest.raises(report_jobs.JobCancelled):
+        report_jobs._run_job({}, "j1")
+    assert ("j1", "cancel") not in shared
+
+
+def test_job_cancelled_in_the_call_queue_never_builds(shared, monkeypatch):
+    shared[("j1", "cancel")] = True
+    monkeypatch.setattr(report_jobs, "build_report", lambda spec, job_id: pytest.fail("built"))
+    with pytest.raises(report_jobs.JobCancelled):
+        report_jobs._run_job({}, "j1")
+    assert ("j1", "cancel") not in shared
@@ -0,0 +1,17 @@
+import threading
+
+import report_jobs
+
+
+def test_inline_report_builds_on_the_db_pool(client, user, monkeypatch):
+    threads = []
+
+    def build(spec):
+        threads.append(threading.current_thread().name)
+        return 0
+
+    monkeypatch.setattr(report_jobs, "build_report", build)
+    r = client.get("/api/reports/expenses", params={"date_from": "2026-10-01", "date_to": "2026-10-31"},
+                   headers=user["headers"])
+    assert r.status_code == 200
+    assert threads and threads[0].startswith("supabase")
@@ -0,0 +1,130 @@
+import asyncio
+import json
+import time
+
+import httpx
+
+import main as server
+
+
+def _clip(i: int) -> bytes:
+    return i.to_bytes(4, "big") * 64
+
+
+def test_batch_stream_reads_every_clip(client, user):
+    files = [("audios", (f"clip{i}.webm", _clip(i), "audio/webm")) for i in range(5)]
+    r = client.post("/api/voice/batch?stream=true", files=files, headers=user["headers"])
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    items = [json.loads(line) for line in r.text.splitlines()]
+    assert sorted(item["index"] for item in items) == list(range(5))
+    assert all(item["ok"] for item in items), items
+
+
+def test_batch_reports_short_clip_per_item(client, user):
+    files = [("audios", ("ok.webm", _clip(1), "audio/webm")),
+             ("audios", ("short.webm", b"x", "audio/webm"))]
+    r = client.post("/api/voice/batch", files=files, headers=user["headers"])
+    assert r.status_code == 200
+    ok, short = r.json()["results"]
+    assert ok["ok"] is True
+    assert short == {"index": 1, "filename": "short.webm", "ok": False, "error": "Audio too short"}
+
+
+def test_oversized_upload_rejected_before_parsing(client, monkeypatch):
+    monkeypatch.setattr(server, "MAX_AUDIO_BYTES", 1000)
+    files = {"audio": ("clip.webm", b"x" * 50_000, "audio/webm")}
+    # No credentials: a 413 rather than 401/403 means the body was never parsed
+    r = client.post("/api/voice/process", files=files)
+    assert r.status_code == 413
+
+
+def test_oversized_chunked_upload_rejected(client, user, monkeypatch):
+    monkeypatch.setattr(server, "MAX_AUDIO_BYTES", 1000)
+    monkeypatch.setattr(server, "VOICE_BATCH_MAX_BYTES", 2000)
+    monkeypatch.setattr(server, "VOICE_BATCH_MAX_FILES", 2)
+
+    def body():
+        for _ in range(10):
+            yield b"x" * 10_000
+
+    headers = {**user["headers"], "Content-Type": "multipart/form-data; boundary=b"}
+    r = client.post("/api/voice/batch", content=body(), headers=headers)
+    assert r.status_code == 413
+
+
+async def _stream(request: httpx.Request, disconnect_after: int = None):
+    """Run a request through the app over raw ASGI, timing each body chunk."""
+    url = request.url
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": request.method,
+        "scheme": "http", "path": url.path, "raw_path": url.raw_path.split(b"?")[0],
+        "query_string": url.query, "root_path": "", "server": ("test", 80), "client": ("test", 1),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in request.headers.items()],
+    }
+    messages = [{"type": "http.request", "body": request.read(), "more_body": False}]
+    start, chunks, response = time.perf_counter(), [], {}
+    disconnected = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response.update(message)
+        elif message.get("body"):
+            chunks.append((time.perf_counter() - start, message["body"]))
+            if len(chunks) == disconnect_after:
+                disconnected.set()
+
+    await server.app(scope, receive, send)
+    return response, chunks
+
+
+def _batch_request(user, clips: int) -> httpx.Request:
+    files = [("audios", (f"clip{i}.webm", _clip(i), "audio/webm")) for i in range(clips)]
+    return httpx.Request("POST", "http://test/api/voice/batch?stream=true", files=files,
+                         headers={**user["headers"], "Accept-Encoding": "gzip"})
+
+
+def test_batch_stream_is_not_buffered_by_gzip(client, user, monkeypatch):
+    monkeypatch.setattr(server, "VOICE_BATCH_CONCURRENCY", 1)
+    monkeypatch.setattr(server.ai_parser.client, "whisper_latency", 0.1)
+    response, chunks = asyncio.run(_stream(_batch_request(user, 4)))
+    assert response["status"] == 200
+    assert (b"content-encoding", b"gzip") not in response["headers"]
+    assert len(chunks) == 4
+    # First result arrives while the other clips are still being transcribed
+    assert chunks[0][0] < chunks[-1][0] - 0.2
+    assert all(json.loads(data)["ok"] for _, data in chunks)
+
+
+def test_batch_stream_disconnect_cancels_pending_clips(client, user, monkeypatch):
+    monkeypatch.setattr(server, "VOICE_BATCH_CONCURRENCY", 1)
+    monkeypatch.setattr(server.ai_parser.client, "whisper_latency", 0.1)
+    transcribed = []
+
+    async def transcribe(audio_bytes, *args):
+        text = await server.ai_parser.transcribe_audio(audio_bytes, *args)
+        transcribed.append(text)
+        return text
+
+    monkeypatch.setattr(server, "transcribe_audio", transcribe)
+
+    async def run():
+        await _stream(_batch_request(user, 6), disconnect_after=1)
+        await asyncio.sleep(0.5)  # long enough for the rest to finish if still running
+
+    asyncio.run(run())
+    assert len(transcribed) < 3
+
+
+def test_batch_total_size_capped(client, user, monkeypatch):
+    monkeypatch.setattr(server, "VOICE_BATCH_MAX_BYTES", 600)
+    files = [("audios", (f"clip{i}.webm", _clip(i), "audio/webm")) for i in range(3)]
+    r = client.post("/api/voice/batch", files=files, headers=user["headers"])
+    assert r.status_code == 413
+    assert r.json()["detail"] == "Batch too large"
@@ -0,0 +1,27 @@
+from ai_parser import LOCAL_PARSE_MIN_CONFIDENCE
+from voice_rules import parse_local
+
+CATEGORIES = ["Petrol", "Cement"]
+PARTIES = ["Ramesh Traders", "Sharma Ji"]
+
+
+def _parse(text):
+    return parse_local(text, CATEGORIES, PARTIES)
+
+
+def test_cancel_command_deletes_last_entry():
+    for text in ["pichla entry cancel karo", "पिछली एंट्री डिलीट करो", "last entry delete kar do",
+                 "pichli entry hata do"]:
+        assert _parse(text)["type"] == "delete_last", text
+
+
+def test_correction_is_not_a_delete():
+    r = _parse("500 galat hai, 600 likho")
+    assert r["type"] != "delete_last"
+    assert r["confidence"] < LOCAL_PARSE_MIN_CONFIDENCE
+
+
+def test_reported_cancellation_is_not_a_delete():
+    r = _parse("Ramesh ne order cancel kiya, 2000 wapas mile")
+    assert r["type"] != "delete_last"
+    assert r["confidence"] < LOCAL_PARSE_MIN_CONFIDENCE
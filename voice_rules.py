@@ -0,0 +1,280 @@
+"""Deterministic parser for simple voice commands.
+
+Handles the common short forms ("petrol 500", "Ramesh ko 2000 diye",
+"Sharma ji se 5000 mile", "pichla entry cancel karo") using the user's own
+category and party lists, following the same rules as the GPT prompt in
+ai_parser. Returns the parser's JSON schema with a confidence score;
+anything unusual (quantities, rates, corrections, unknown names) gets a
+low score so the caller falls back to GPT.
+"""
+import re
+from difflib import SequenceMatcher
+
+# ─── Devanagari → rough Latin ───
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n", "च": "ch", "छ": "chh", "ज": "j",
+    "झ": "jh", "ञ": "n", "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n", "त": "t",
+    "थ": "th", "द": "d", "ध": "dh", "न": "n", "प": "p", "फ": "ph", "ब": "b", "भ": "bh",
+    "म": "m", "य": "y", "र": "r", "ल": "l", "व": "v", "श": "sh", "ष": "sh", "स": "s",
+    "ह": "h", "क़": "q", "ख़": "kh", "ग़": "g", "ज़": "z", "ड़": "r", "ढ़": "rh", "फ़": "f",
+}
+_VOWELS = {
+    "अ": "a", "आ": "aa", "इ": "i", "ई": "ee", "उ": "u", "ऊ": "oo", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o",
+}
+_MATRAS = {
+    "ा": "aa", "ि": "i", "ी": "ee", "ु": "u", "ू": "oo", "ृ": "ri", "े": "e",
+    "ै": "ai", "ो": "o", "ौ": "au", "ॅ": "e", "ॉ": "o",
+}
+_VIRAMA = "्"
+_NUKTA = "़"
+_NASALS = {"ं": "n", "ँ": "n", "ः": "h"}
+_DIGITS = str.maketrans("०१२३४५६७८९", "0123456789")
+
+
+def transliterate(text: str) -> str:
+    """Romanize Devanagari the way Hinglish is usually typed (schwa dropped at word end)."""
+    out = []
+    pending_a = False
+    for ch in text.translate(_DIGITS):
+        if ch == _NUKTA:
+            continue
+        if ch in _MATRAS:
+            out.append(_MATRAS[ch])
+            pending_a = False
+            continue
+        if ch == _VIRAMA:
+            pending_a = False
+            continue
+        if pending_a and ch in _CONSONANTS:
+            out.append("a")
+        pending_a = False
+        if ch in _CONSONANTS:
+            out.append(_CONSONANTS[ch])
+            pending_a = True
+        elif ch in _VOWELS:
+            out.append(_VOWELS[ch])
+        elif ch in _NASALS:
+            out.append(_NASALS[ch])
+        else:
+            out.append(ch)
+    return "".join(out)
+
+
+# ─── Phonetic keys for fuzzy Hinglish matching ───
+_FOLDS = [
+    ("aa", "a"), ("ee", "i"), ("oo", "u"), ("ph", "f"), ("sh", "s"), ("kh", "k"),
+    ("gh", "g"), ("bh", "b"), ("dh", "d"), ("th", "t"), ("ch", "c"), ("jh", "j"),
+    ("w", "v"), ("z", "j"), ("q", "k"), ("y", "i"),
+]
+HONORIFICS = {"ji", "jee", "bhai", "bhaiya", "sahab", "sahib", "seth", "babu", "sir", "madam", "didi"}
+
+
+def phonetic_key(word: str) -> str:
+    """Spelling-insensitive key: "Sharmaji", "sharma jee" and "शर्मा जी" share one."""
+    w = transliterate(word).lower()
+    w = re.sub(r"[^a-z0-9]", "", w)
+    for a, b in _FOLDS:
+        w = w.replace(a, b)
+    w = re.sub(r"([a-z])\1+", r"\1", w)
+    # Medial schwa: "pichali" (from पिछली) and "pichli" should agree
+    return re.sub(r"(?<=[aeiou][^aeiou0-9])a(?=[^aeiou0-9][aeiou])", "", w)
+
+
+_HONORIFIC_KEYS = {phonetic_key(h) for h in HONORIFICS}
+
+
+def _strip_honorific(key: str) -> str:
+    for h in _HONORIFIC_KEYS:
+        if key.endswith(h) and len(key) > len(h) + 2:
+            return key[:-len(h)]
+    return key
+
+
+def _keys(text: str) -> list:
+    keys = (phonetic_key(t) for t in re.split(r"[\s,.!?।]+", text))
+    return [_strip_honorific(k) for k in keys if k]
+
+
+def _name_keys(name: str) -> list:
+    keys = _keys(name)
+    return [k for k in keys if k not in _HONORIFIC_KEYS] or keys
+
+
+def search_keys(text: str) -> list:
+    """Distinct keys of a search query, longest first (see hinglish_key in the schema)."""
+    return sorted(set(_name_keys(text)), key=lambda k: (-len(k), k))
+
+# Vocabulary, stored as phonetic keys
+_PAID = {phonetic_key(w) for w in ["diye", "diya", "de", "dediye", "dediya", "de diye", "chukaya", "chukaye"]}
+_RECEIVED = {phonetic_key(w) for w in ["mile", "mila", "mil", "liye", "liya", "le liye", "aaye", "aaya", "aa gaye", "aaya"]}
+_TO = {phonetic_key(w) for w in ["ko", "ku"]}
+_FROM = {phonetic_key(w) for w in ["se", "sai"]}
+_CANCEL = {phonetic_key(w) for w in ["cancel", "delete", "dilit", "hatao", "hata", "mitao"]}
+# Commands, not reports: "cancel karo" deletes, "order cancel kiya" doesn't
+_IMPERATIVE = {phonetic_key(w) for w in ["karo", "kardo", "hatao", "mitao"]}
+_DO = phonetic_key("do")
+_CORRECTION = {phonetic_key(w) for w in ["nahi", "nahin", "nhi", "nai"]}
+_MULTIPLIERS = {phonetic_key("sau"): 100, phonetic_key("hazaar"): 1000, phonetic_key("hajar"): 1000,
+                phonetic_key("thousand"): 1000, phonetic_key("lakh"): 100000, phonetic_key("lac"): 100000}
+_DATE_OFFSETS = {phonetic_key("aaj"): 0, phonetic_key("kal"): -1, phonetic_key("parso"): -2,
+                 phonetic_key("parson"): -2, phonetic_key("parason"): -2}
+_FILLER = {phonetic_key(w) for w in [
+    "rupay", "rupaye", "rupees", "rupee", "rupaya", "rs", "inr", "ka", "ke", "ki", "ne", "maine",
+    "humne", "hai", "he", "tha", "the", "thi", "kar", "karo", "kiya", "do", "wala",
+    "wali", "entry", "pichla", "pichli", "last", "aur", "bhi", "mein", "me", "par", "pe",
+    "kharcha", "kharch",
+]} | _HONORIFIC_KEYS
+
+LOCAL_MIN_RATIO = 0.8
+
+
+def _is_currency(key: str) -> bool:
+    return key.startswith("rup") or key in ("rs", "inr")
+
+
+def _best_match(tokens: list, names: list):
+    """Fuzzy-match a name against token windows. Returns (name, ratio, span).
+
+    Multi-word names also match on their first word alone ("Verma" for
+    "Verma Traders"), at a slightly discounted ratio.
+    """
+    best = (None, 0.0, None)
+    for name in names:
+        nkeys = _name_keys(name)
+        targets = [(nkeys, 1.0)]
+        if len(nkeys) > 1:
+            targets.append((nkeys[:1], 0.9))
+        for keys, weight in targets:
+            target = " ".join(keys)
+            n = len(keys)
+            for i in range(len(tokens) - n + 1):
+                window = " ".join(tokens[i:i + n])
+                ratio = SequenceMatcher(None, window, target).ratio() * weight
+                if ratio > best[1]:
+                    best = (name, ratio, (i, i + n))
+    return best
+
+
+def rank_names(text: str, names: list, limit: int) -> list:
+    """The ``limit`` names most likely to be mentioned in ``text`` (all of them if few)."""
+    if len(names) <= limit:
+        return list(names)
+    tokens = _keys(text)
+    scored = [(_best_match(tokens, [name])[1], name) for name in names]
+    scored.sort(key=lambda x: -x[0])
+    return [name for _, name in scored[:limit]]
+
+
+def _amounts(tokens: list) -> list:
+    """Numbers in the text, with 'sau' / 'hazaar' / 'lakh' multipliers and '2k' forms applied."""
+    values = []
+    for i, tok in enumerate(tokens):
+        m = re.fullmatch(r"(\d+(?:\.\d+)?)(k)?", tok)
+        if not m:
+            continue
+        value = float(m.group(1)) * (1000 if m.group(2) else 1)
+        if i + 1 < len(tokens) and tokens[i + 1] in _MULTIPLIERS:
+            value *= _MULTIPLIERS[tokens[i + 1]]
+        values.append((i, value))
+    return values
+
+
+def _result(text: str, **fields) -> dict:
+    result = {
+        "type": "unknown",
+        "category": "",
+        "category_match_found": False,
+        "party_name": "",
+        "party_match_found": False,
+        "entry_type": "",
+        "item_name": "",
+        "quantity": None,
+        "unit": None,
+        "rate": None,
+        "amount": 0,
+        "description": text.strip(),
+        "date_offset_days": 0,
+        "correction_details": "",
+        "confidence": 0.0,
+        "raw_text": text,
+        "parser": "local",
+    }
+    result.update(fields)
+    return result
+
+
+def parse_local(text: str, categories: list[str], parties: list[str]) -> dict:
+    """Parse a transcript without calling GPT. Low confidence means: ask GPT."""
+    # "2,000" → "2000", "500rs" → "500 rs" before tokenizing
+    clean = re.sub(r"(?<=\d),(?=\d)", "", transliterate(text))
+    clean = re.sub(r"(?<=\d)(?=[a-jl-z])|(?<=[a-z])(?=\d)", " ", clean.lower())
+    tokens = _keys(clean)
+    if not tokens:
+        return _result(text)
+
+    token_set = set(tokens)
+    amounts = _amounts(tokens)
+    if token_set & _CANCEL:
+        # "kar do" / "hata do" split into two tokens
+        imperative = bool(token_set & _IMPERATIVE) or any(
+            b == _DO and a in _CANCEL | {phonetic_key("kar")} for a, b in zip(tokens, tokens[1:]))
+        party, party_ratio, _ = _best_match(tokens, parties)
+        if imperative and not amounts and not (party and party_ratio >= LOCAL_MIN_RATIO):
+            return _result(text, type="delete_last", confidence=0.9)
+        return _result(text, amount=amounts[0][1] if amounts else 0, confidence=0.2)
+
+    if token_set & _CORRECTION or len(amounts) != 1:
+        # Corrections and quantity × rate entries need the full model
+        return _result(text, amount=amounts[0][1] if amounts else 0, confidence=0.2)
+    amount_idx, amount = amounts[0]
+
+    date_offset = 0
+    used = {amount_idx}
+    if amount_idx + 1 < len(tokens) and tokens[amount_idx + 1] in _MULTIPLIERS:
+        used.add(amount_idx + 1)
+    for i, tok in enumerate(tokens):
+        if tok in _DATE_OFFSETS:
+            date_offset = _DATE_OFFSETS[tok]
+            used.add(i)
+
+    party, party_ratio, party_span = _best_match(tokens, parties)
+    category, cat_ratio, cat_span = _best_match(tokens, categories)
+
+    def leftovers(span):
+        skip = set(used) | (set(range(*span)) if span else set())
+        return [t for i, t in enumerate(tokens)
+                if i not in skip and t not in _FILLER and not _is_currency(t)
+                and t not in _PAID and t not in _RECEIVED and t not in _TO and t not in _FROM]
+
+    # Ledger: a known party plus a payment verb
+    if party and party_ratio >= LOCAL_MIN_RATIO and (token_set & (_PAID | _RECEIVED)):
+        paid = bool(token_set & _PAID)
+        received = bool(token_set & _RECEIVED)
+        if paid == received:
+            return _result(text, amount=amount, confidence=0.3)
+        entry_type = "payment_made" if paid else "payment_received"
+        # "ko ... diye" / "se ... mile" agree with the verb; anything else is suspect
+        particle_ok = bool(token_set & (_TO if paid else _FROM))
+        extra = leftovers(party_span)
+        confidence = 0.55 + 0.35 * party_ratio + (0.1 if particle_ok else -0.2)
+        if extra:
+            # Probably goods ("bheja 50 kg donga"), not a plain payment
+            confidence -= 0.3
+        return _result(
+            text, type="ledger", party_name=party, party_match_found=True,
+            entry_type=entry_type, amount=amount, date_offset_days=date_offset,
+            confidence=round(max(0.0, min(confidence, 0.99)), 2),
+        )
+
+    # Expense: a known category and one amount, no party involved
+    if category and cat_ratio >= LOCAL_MIN_RATIO and not (party and party_ratio >= LOCAL_MIN_RATIO):
+        extra = leftovers(cat_span)
+        confidence = 0.6 + 0.35 * cat_ratio - 0.1 * len(extra)
+        return _result(
+            text, type="expense", category=category, category_match_found=True,
+            amount=amount, date_offset_days=date_offset,
+            confidence=round(max(0.0, min(confidence, 0.99)), 2),
+        )
+
+    return _result(text, amount=amount, confidence=0.1)